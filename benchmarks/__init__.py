@@ -0,0 +1,3 @@
+"""
+Benchmarks del CLI contra un servidor local (ver run.py).
+"""
@@ -0,0 +1,286 @@
+"""
+Servidor local que imita la API de banking de Prometeo, para medir
+el CLI sin depender del sandbox (ver benchmarks/run.py).
+
+Responde login/logout, providers, detalle de provider, cuentas,
+tarjetas y movimientos con datos generados (siempre los mismos para
+la misma seed), con latencia y errores configurables.
+
+Uso suelto (por ejemplo para probar con curl):
+
+    python3 -m benchmarks.mock_server --port 8000 --latency 0.05
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_KEY = 'benchmark'
+DATE_FORMAT = '%d/%m/%Y'
+COUNTRIES = ['UY', 'AR', 'BR', 'MX', 'PE']
+CURRENCIES = ['UYU', 'USD']
+DETAILS = ['SUPERMERCADO', 'UTE', 'ANTEL', 'OSE', 'FARMACIA', 'COMBUSTIBLE',
+           'RESTAURANTE', 'TRANSFERENCIA', 'SUELDO', 'ALQUILER']
+
+
+class MockPrometeo:
+    """
+    Servidor en un thread. Con port=0 se elige un puerto libre (ver url).
+
+    latency: segundos de espera por request (más un jitter aleatorio).
+    error_rate: proporción de requests GET que responden 500/502/503.
+    rate_limit_rate: proporción de requests GET que responden 429
+        (con Retry-After: retry_after).
+    etags: mandar ETag en las respuestas y responder 304 a los
+        requests con If-None-Match si no cambiaron.
+    accounts, cards, movements_per_day, providers: tamaño de los datos.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 0.05, etags: bool = False, accounts: int = 4, cards: int = 2, movements_per_day: int = 5, providers: int = 100, api_key: str = API_KEY, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.etags = etags
+        self.movements_per_day = movements_per_day
+        self.api_key = api_key
+        self.seed = seed
+        self._random = random.Random(seed)
+
+        self.providers = [{'code': f'bank{index}', 'country': COUNTRIES[index % len(COUNTRIES)],
+                           'name': f'Banco {DETAILS[index % len(DETAILS)].title()} {index}'}
+                          for index in range(providers)]
+        self.providers.append({'code': 'test', 'country': 'UY', 'name': 'Test Bank'})
+        self.accounts = [{'id': str(index), 'name': f'Cuenta {index}', 'number': f'001{index:05}',
+                          'branch': 'Centro', 'currency': CURRENCIES[index % len(CURRENCIES)],
+                          'balance': 1000.0 * (index + 1)} for index in range(accounts)]
+        self.cards = [{'id': str(index), 'name': 'Visa', 'number': f'4{index:015}',
+                       'close_date': '25/01/2022', 'due_date': '05/02/2022',
+                       'balance_local': 100.0 * index, 'balance_dollar': 10.0 * index}
+                      for index in range(cards)]
+
+        self.sessions = set()
+        # Requests recibidos, por path (sin ids).
+        self.requests = {}
+        self._lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self) -> 'MockPrometeo':
+        # Con un poll_interval corto, stop no tarda medio segundo.
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def request_count(self) -> int:
+        with self._lock:
+            return sum(self.requests.values())
+
+    def movements(self, account: str, start: datetime.date, end: datetime.date) -> list:
+        """
+        Movimientos de la cuenta en el intervalo. Cada día tiene siempre
+        los mismos, así que pedir en partes da lo mismo que todo junto.
+        """
+        movements = []
+        day = start
+        while day <= end:
+            generator = random.Random(f'{self.seed}-{account}-{day.toordinal()}')
+            for index in range(self.movements_per_day):
+                amount = round(generator.uniform(1, 5000), 2)
+                credit = generator.random() < 0.3
+                movements.append({
+                    'id': f'{account}-{day:%Y%m%d}-{index}',
+                    'reference': f'{generator.randrange(10 ** 6):06}',
+                    'date': day.strftime(DATE_FORMAT),
+                    'detail': generator.choice(DETAILS),
+                    'debit': '' if credit else amount,
+                    'credit': amount if credit else ''})
+            day += datetime.timedelta(days=1)
+        return movements
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Los headers y el body se escriben por separado: sin esto el
+            # cliente espera el ACK demorado (~40ms) en cada request.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, data: dict, status: int = 200, headers: dict = None) -> None:
+                body = json.dumps(data).encode()
+                if mock.etags and status == 200 and self.command == 'GET':
+                    etag = f'"{hashlib.md5(body).hexdigest()}"'
+                    headers = {**(headers or {}), 'ETag': etag}
+                    if self.headers.get('If-None-Match') == etag:
+                        status, body = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def prepare(self):
+                """
+                Contar el request y aplicar latencia. Devuelve
+                (path, query) o None si ya se respondió con un error.
+                """
+                url = urlparse(self.path)
+                path = url.path.rstrip('/')
+                name = path.split('/')[1] if '/' in path else path
+                with mock._lock:
+                    mock.requests[name] = mock.requests.get(name, 0) + 1
+                    chance = mock._random.random()
+                    jitter = mock._random.uniform(0, mock.jitter)
+
+                if mock.latency or jitter:
+                    time.sleep(mock.latency + jitter)
+
+                if self.headers.get('X-API-Key') != mock.api_key:
+                    self.send({'status': 'error', 'message': 'Unauthorized'}, 401)
+                    return None
+
+                if self.command == 'GET':
+                    if chance < mock.error_rate:
+                        self.send({'status': 'error', 'message': 'Internal error'},
+                                  mock._random.choice([500, 502, 503]))
+                        return None
+                    if chance < mock.error_rate + mock.rate_limit_rate:
+                        self.send({'status': 'error', 'message': 'Too many requests'}, 429,
+                                  {'Retry-After': str(mock.retry_after)})
+                        return None
+
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                return path, query
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = {key: values[0] for key, values in
+                        parse_qs(self.rfile.read(length).decode()).items()}
+                prepared = self.prepare()
+                if prepared is None:
+                    return
+
+                path, _ = prepared
+                if path != '/login':
+                    return self.send({'status': 'error', 'message': 'Not found'}, 404)
+                if not form.get('username') or form.get('password') == 'wrong':
+                    return self.send({'status': 'wrong_credentials'}, 403)
+
+                key = uuid.uuid4().hex
+                with mock._lock:
+                    mock.sessions.add(key)
+                self.send({'status': 'logged_in', 'key': key})
+
+            def do_GET(self):
+                prepared = self.prepare()
+                if prepared is None:
+                    return
+                path, query = prepared
+
+                if path == '/provider':
+                    return self.send({'status': 'success', 'providers': mock.providers})
+                if path.startswith('/provider/'):
+                    code = path.split('/')[2]
+                    provider = next((provider for provider in mock.providers
+                                     if provider['code'] == code), None)
+                    if provider is None:
+                        return self.send({'status': 'error', 'message': 'Provider not found'}, 404)
+                    return self.send({'status': 'success', 'provider': {
+                        'name': code, 'country': provider['country'],
+                        'auth_fields': [
+                            {'name': 'username', 'type': 'text', 'interactive': False, 'optional': False},
+                            {'name': 'password', 'type': 'password', 'interactive': False, 'optional': False}]}})
+
+                # El resto requiere una sesión.
+                with mock._lock:
+                    valid = query.get('key') in mock.sessions
+                    if path == '/logout':
+                        mock.sessions.discard(query.get('key'))
+                if not valid:
+                    return self.send({'status': 'error', 'message': 'Invalid key'})
+
+                if path == '/logout':
+                    return self.send({'status': 'logged_out'})
+                if path == '/client':
+                    return self.send({'status': 'success', 'clients': {}})
+                if path == '/account':
+                    return self.send({'status': 'success', 'accounts': mock.accounts})
+                if path == '/credit-card':
+                    return self.send({'status': 'success', 'credit_cards': mock.cards})
+
+                if path == '/movement' or (path.startswith('/credit-card/') and path.endswith('/movements')):
+                    account = query.get('account') or path.split('/')[2]
+                    try:
+                        start = datetime.datetime.strptime(query['date_start'], DATE_FORMAT).date()
+                        end = datetime.datetime.strptime(query['date_end'], DATE_FORMAT).date()
+                    except (KeyError, ValueError):
+                        return self.send({'status': 'error', 'message': 'Invalid dates'}, 400)
+                    return self.send({'status': 'success',
+                                      'movements': mock.movements(account, start, end)})
+
+                self.send({'status': 'error', 'message': 'Not found'}, 404)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Prometeo banking API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per request.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds per request.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of GET requests answered with 5xx.')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of GET requests answered with 429.')
+    parser.add_argument('--accounts', type=int, default=4)
+    parser.add_argument('--cards', type=int, default=2)
+    parser.add_argument('--movements-per-day', type=int, default=5)
+    parser.add_argument('--providers', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockPrometeo(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                          args.rate_limit_rate, accounts=args.accounts, cards=args.cards,
+                          movements_per_day=args.movements_per_day, providers=args.providers,
+                          seed=args.seed)
+    print(f'Serving at {server.url} (API key: {server.api_key}). Ctrl+C to stop.')
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
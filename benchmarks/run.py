@@ -0,0 +1,373 @@
+"""
+Benchmarks del CLI contra el servidor local (ver mock_server.py), así
+las mediciones no dependen de la latencia del sandbox.
+
+Cada benchmark usa PrometeoClient o el método de un plugin (el mismo
+camino que el CLI y el modo batch) y se reporta: tiempo por iteración,
+throughput, latencia de los requests HTTP (p50 y p99), requests por
+iteración y pico de memoria (tracemalloc).
+
+    python3 -m benchmarks.run
+    python3 -m benchmarks.run --latency 0.02 --days 365 --json baseline.json
+    python3 -m benchmarks.run --compare baseline.json
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+
+from benchmarks.mock_server import MockPrometeo
+from src.client import ExtendedBankingClient, PrometeoClient
+from src.output import Output
+from src.plugins import get_plugin
+from src.retry import RetryPolicy
+from src.store import MovementStore
+
+# Environment que apunta al servidor local (sin límites de RATE_LIMITS).
+ENVIRONMENT = 'benchmark'
+# Último día de los intervalos de movimientos, fijo para que los
+# resultados sean comparables entre ejecuciones.
+END_DATE = datetime.datetime(2022, 12, 31)
+SEARCHES = ['uy', 'banco', 'sueldo 1', 'farmacia 7', 'test', 'bnco', 'supermercdo']
+
+# name: nombre del benchmark, unit: qué cuenta el valor que devuelve func
+# (para el throughput), func(context) -> cantidad de unit procesadas,
+# options: argumentos extra para PrometeoClient, requires: módulo opcional.
+Benchmark = namedtuple('Benchmark', ['name', 'unit', 'func', 'options', 'requires'])
+BenchmarkResult = namedtuple('BenchmarkResult', [
+    'name', 'unit', 'iterations', 'seconds', 'items', 'requests',
+    'request_p50', 'request_p99', 'peak_memory'])
+
+BENCHMARKS = []
+
+
+def benchmark(name: str, unit: str, options: dict = None, requires: str = None):
+    """
+    Registrar un benchmark (ver Benchmark).
+    """
+    def register(func):
+        BENCHMARKS.append(Benchmark(name, unit, func, options or {}, requires))
+        return func
+    return register
+
+
+def percentile(values: list, percent: float):
+    """
+    Percentil por rango más cercano (None si no hay valores).
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+class Context:
+    """
+    Cliente (con sesión), plugins e intervalo de un benchmark.
+    """
+
+    def __init__(self, server: MockPrometeo, args, options: dict):
+        self.server = server
+        self.args = args
+        # Sin caches (salvo que el benchmark lo pida en options):
+        # cada iteración debe hacer los requests.
+        self.client = PrometeoClient(
+            server.api_key, ENVIRONMENT, retry_policy=RetryPolicy(attempts=args.retries + 1),
+            **{'cache_ttl': 0, **options})
+        self.client.provider_cache = None
+        self.start_date = END_DATE - datetime.timedelta(days=args.days - 1)
+        self.end_date = END_DATE
+        self._plugins = {}
+
+        self.request_times = []
+        self._lock = threading.Lock()
+        self._time_requests()
+
+        self.plugin('Sessions').login('test', 'benchmark', 'benchmark')
+        self.accounts = self.client.get_bank_accounts()
+
+    def _time_requests(self) -> None:
+        """
+        Medir cada request HTTP (incluyendo cada reintento).
+        """
+        request = self.client._http.request
+
+        def timed_request(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return request(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.request_times.append(elapsed)
+
+        self.client._http.request = timed_request
+
+    def plugin(self, name: str):
+        if name not in self._plugins:
+            self._plugins[name] = get_plugin(name)(self.client, Output(quiet=True))
+        return self._plugins[name]
+
+    def close(self) -> None:
+        self.client.close_sessions()
+
+
+# Benchmarks.
+
+@benchmark('login', 'logins')
+def login(context) -> int:
+    # Se cierran las sesiones para que el pool vuelva a hacer login.
+    context.client.sessions.close_all()
+    context.plugin('Sessions').login('test', 'benchmark', 'benchmark')
+    return 1
+
+
+@benchmark('providers', 'providers')
+def providers(context) -> int:
+    return len(context.client.get_providers())
+
+
+@benchmark('provider_details', 'providers')
+def provider_details(context) -> int:
+    codes = [provider.code for provider in context.client.get_providers()[:50]]
+    results = context.plugin('Meta').get_provider_details(codes)
+    return sum(1 for result in results if result.error is None)
+
+
+@benchmark('provider_search', 'searches')
+def provider_search(context) -> int:
+    # Sin el cache de providers cada búsqueda pediría la lista, así que
+    # se usa el índice directamente (un request por iteración).
+    index = context.client.get_provider_index()
+    for pattern in SEARCHES:
+        index.search(pattern)
+    return len(SEARCHES)
+
+
+@benchmark('accounts', 'accounts')
+def accounts(context) -> int:
+    return len(context.client.get_bank_accounts()) + len(context.client.get_credit_cards())
+
+
+@benchmark('accounts_cached', 'accounts', {'cache_ttl': 300})
+def accounts_cached(context) -> int:
+    # Como volver a entrar al plugin Transactions en la misma sesión.
+    return len(context.client.get_bank_accounts()) + len(context.client.get_credit_cards())
+
+
+@benchmark('movements', 'movements')
+def movements(context) -> int:
+    account = context.accounts[0]
+    return len(context.client.get_movements(
+        account.number, account.currency, context.start_date, context.end_date))
+
+
+def _fetch_all(context) -> int:
+    results = context.plugin('Transactions').fetch_all_movements(
+        context.start_date, context.end_date)
+    return sum(len(result.value) for result in results if result.error is None)
+
+
+@benchmark('all_movements', 'movements')
+def all_movements(context) -> int:
+    return _fetch_all(context)
+
+
+@benchmark('all_movements_compact', 'movements', {'compact_movements': True})
+def all_movements_compact(context) -> int:
+    return _fetch_all(context)
+
+
+@benchmark('all_movements_async', 'movements', {'use_async': True}, requires='httpx')
+def all_movements_async(context) -> int:
+    return _fetch_all(context)
+
+
+@benchmark('sync', 'movements')
+def sync(context) -> int:
+    transactions = context.plugin('Transactions')
+    # Un store nuevo cada vez, para sincronizar todo el intervalo.
+    with tempfile.TemporaryDirectory() as directory:
+        with MovementStore(os.path.join(directory, 'movements.db')) as store:
+            jobs = transactions.get_all_accounts()
+            for job in jobs:
+                store.set_last_date(transactions._store_key(job), context.start_date.date())
+            results = transactions.sync_movements(store, jobs, context.end_date)
+    return sum(result.value.fetched for result in results if result.error is None)
+
+
+@benchmark('analytics', 'movements')
+def analytics(context) -> int:
+    from src.analytics import REPORTS, MovementFrame
+    from src.export import movement_row
+
+    if not hasattr(context, 'movement_rows'):
+        # Los movimientos se piden una sola vez (no es lo que se mide).
+        results = context.plugin('Transactions').fetch_all_movements(
+            context.start_date, context.end_date)
+        context.movement_rows = [result.item[1:] + movement_row(movement)
+                                 for result in results if result.error is None
+                                 for movement in result.value]
+
+    frame = MovementFrame.from_rows(context.movement_rows)
+    for _, report in REPORTS.values():
+        report(frame, 10)
+    return len(frame)
+
+
+def run_benchmark(server: MockPrometeo, bench: Benchmark, args) -> BenchmarkResult:
+    context = Context(server, args, bench.options)
+    try:
+        # Una iteración para calentar (conexiones, imports, etc).
+        bench.func(context)
+
+        context.request_times.clear()
+        requests = server.request_count()
+        items = 0
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            items += bench.func(context)
+        seconds = time.perf_counter() - start
+        requests = server.request_count() - requests
+        request_times = list(context.request_times)
+
+        # La memoria se mide aparte porque tracemalloc hace todo más lento.
+        tracemalloc.start()
+        try:
+            bench.func(context)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        context.close()
+
+    return BenchmarkResult(
+        bench.name, bench.unit, args.repeat, seconds, items, requests,
+        percentile(request_times, 50), percentile(request_times, 99), peak_memory)
+
+
+def _ms(seconds) -> str:
+    return '-' if seconds is None else f'{seconds * 1000:.1f}'
+
+
+def show_results(out: Output, results: list, baseline: dict = None) -> None:
+    headers = ['Benchmark', 'Iter', 'ms/iter', 'Throughput', 'Req p50 ms',
+               'Req p99 ms', 'Req/iter', 'Peak MiB']
+    if baseline is not None:
+        headers.append('vs baseline')
+
+    rows = []
+    for result in results:
+        row = [result.name, result.iterations,
+               f'{result.seconds / result.iterations * 1000:.1f}',
+               f'{result.items / result.seconds:,.0f} {result.unit}/s',
+               _ms(result.request_p50), _ms(result.request_p99),
+               f'{result.requests / result.iterations:.1f}',
+               f'{result.peak_memory / 2 ** 20:.2f}']
+        if baseline is not None:
+            row.append(_change(result, baseline.get(result.name)))
+        rows.append(row)
+    out.table(rows, headers)
+
+
+def throughput(result) -> float:
+    return result['items'] / result['seconds']
+
+
+def _change(result: BenchmarkResult, previous: dict) -> str:
+    if previous is None:
+        return '-'
+    change = throughput(result._asdict()) / throughput(previous) - 1
+    return f'{change:+.0%}'
+
+
+def regressions(results: list, baseline: dict, threshold: float) -> list:
+    """
+    Benchmarks cuyo throughput bajó más de threshold (0 a 1) respecto al baseline.
+    """
+    return [result.name for result in results
+            if result.name in baseline
+            and throughput(result._asdict()) < throughput(baseline[result.name]) * (1 - threshold)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of the Prometeo CLI against a local mock server.')
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help=f'Benchmarks to run (default: all). Available: {", ".join(bench.name for bench in BENCHMARKS)}.')
+    parser.add_argument('--repeat', type=int, default=5, help='Measured iterations per benchmark (default: 5).')
+    parser.add_argument('--days', type=int, default=90, help='Days of movements to request (default: 90).')
+    parser.add_argument('--accounts', type=int, default=4, help='Bank accounts in the mock server (default: 4).')
+    parser.add_argument('--cards', type=int, default=2, help='Credit cards in the mock server (default: 2).')
+    parser.add_argument('--movements-per-day', type=int, default=5, help='Movements per day and account (default: 5).')
+    parser.add_argument('--providers', type=int, default=100, help='Providers in the mock server (default: 100).')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the mock server waits per request (default: 0).')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds per request (default: 0).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of GET requests that fail with 5xx (default: 0).')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of GET requests answered with 429 (default: 0).')
+    parser.add_argument('--retries', type=int, default=3, help='Retries of the client (default: 3).')
+    parser.add_argument('--json', help='Save the results to this file (to use with --compare).', dest='json_path')
+    parser.add_argument('--compare', help='Compare with the results saved in this file.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='With --compare, exit with 1 if a throughput is this much lower (default: 0.2).')
+    parser.add_argument('--no-color', action='store_false', dest='color')
+    args = parser.parse_args(argv)
+
+    out = Output(args.color)
+    names = [bench.name for bench in BENCHMARKS]
+    for name in args.benchmarks:
+        if name not in names:
+            parser.error(f'unknown benchmark: {name}')
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)['results']
+
+    server = MockPrometeo(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, accounts=args.accounts, cards=args.cards,
+        movements_per_day=args.movements_per_day, providers=args.providers)
+    ExtendedBankingClient.ENVIRONMENTS[ENVIRONMENT] = server.url
+
+    results = []
+    with server:
+        out.info(f'Mock server at {server.url}')
+        for bench in BENCHMARKS:
+            if args.benchmarks and bench.name not in args.benchmarks:
+                continue
+            if bench.requires and importlib.util.find_spec(bench.requires) is None:
+                out.warning(f'{bench.name}: skipped ({bench.requires} is not installed).')
+                continue
+            out.info(f'Running {bench.name}...')
+            results.append(run_benchmark(server, bench, args))
+
+    print('')
+    show_results(out, results, baseline)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump({'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'options': {key: value for key, value in vars(args).items()
+                                   if key not in ('json_path', 'compare', 'color')},
+                       'results': {result.name: result._asdict() for result in results}},
+                      file, indent=2)
+        out.success(f'Results saved in {args.json_path}.')
+
+    if baseline is not None:
+        slower = regressions(results, baseline, args.threshold)
+        if slower:
+            out.error(f'Slower than the baseline: {", ".join(slower)}.')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
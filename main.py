@@ -18,9 +18,18 @@ c. Meta (providers).
 7. La entrega debe ser en un repositorio de Git público.
 """
 import argparse
+import atexit
+import importlib.util
 
-from src.cli import CLI
-from src.output import Output
+import src.config as config
+from src.startup import profile
+
+# Los imports se miden para --profile-startup. Acá solo los livianos,
+# para armar el parser: el cliente (prometeo y requests), el modo
+# batch, el CLI interactivo y los plugins se importan recién cuando se usan.
+with profile.phase('imports'):
+    from src.commands import add_batch_commands
+    from src.output import Output
 
 
 def main():
@@ -35,18 +44,117 @@ def main():
     ### Crear argumentos ###
     log_options.add_argument(
         '--no-color', help='Do not use colors for console output.', action='store_false', dest='no_colors')
+    log_options.add_argument(
+        '--compact', help='Show lists (accounts, movements, etc) as compact tables.', action='store_true', dest='compact')
+    log_options.add_argument(
+        '--pager', help='Show long lists (movements, providers, etc) one page at a time.', action='store_true', dest='paged')
+    log_options.add_argument(
+        '--stats', help='Show HTTP connection stats (requests, connections opened and reused) before exiting.', action='store_true', dest='stats')
+    log_options.add_argument(
+        '--profile-startup', help='Show how long each startup phase (imports, plugin loading, etc) took before exiting.', action='store_true', dest='profile_startup')
+    log_options.add_argument(
+        '--trace', help='Save a trace of the run (plugins, API calls, HTTP requests, retries and prompts as nested spans) to FILE in Chrome\'s trace format, to open with https://ui.perfetto.dev or chrome://tracing.', metavar='FILE', dest='trace')
+    log_options.add_argument(
+        '--profile', help=f'Profile each plugin run (or batch command) with cProfile, save it in {config.PROFILE_DIR} and show the {config.PROFILE_TOP} functions with more own time.', action='store_true', dest='profile')
+    log_options.add_argument(
+        '--metrics-out', help='Save request metrics (calls, latency, errors, retries and bytes per endpoint) to FILE before exiting: JSON if FILE ends with .json, Prometheus text format otherwise.', metavar='FILE', dest='metrics_out')
     connection.add_argument(
         '-k', '--api-key', help='Your API key. NOT RECOMMENDED: this will save your key to your shell history file.', type=str, default='', dest='api_key')
+    connection.add_argument(
+        '-e', '--environment', help=f'Prometeo environment (default: {config.DEFAULT_ENVIRONMENT}).', choices=config.ENVIRONMENTS.keys(), default=config.DEFAULT_ENVIRONMENT, dest='environment')
+    connection.add_argument(
+        '--pool-size', help=f'Max open (keep-alive) connections to Prometeo (default: {config.HTTP_POOL_SIZE}).', type=int, default=config.HTTP_POOL_SIZE, dest='pool_size')
+    connection.add_argument(
+        '--timeout', help=f'Seconds to wait for a Prometeo response (default: {config.HTTP_READ_TIMEOUT}).', type=float, default=config.HTTP_READ_TIMEOUT, dest='timeout')
+    connection.add_argument(
+        '--rate', help='Max requests per second to Prometeo, 0 for no limit (default: depends on the environment, see RATE_LIMITS in src/config.py).', type=float, dest='rate')
+    connection.add_argument(
+        '--max-in-flight', help='Max requests to Prometeo in progress at the same time, 0 for no limit (default: depends on the environment).', type=int, dest='max_in_flight')
+    connection.add_argument(
+        '--async', help='Make parallel requests (e.g. movements --all, sync) with asyncio instead of threads. Requires httpx.', action='store_true', dest='use_async')
+    connection.add_argument(
+        '--remember-session', help=f'Save the session (encrypted with your API key) in {config.SESSION_CACHE_PATH} and reuse it in the next runs instead of logging in again. Requires cryptography.', action='store_true', dest='remember_session')
+    connection.add_argument(
+        '--compact-movements', help='Keep movements in a compact column-based list, which uses much less memory for long intervals and many accounts.', action='store_true', dest='compact_movements')
+    connection.add_argument(
+        '--cache-ttl', help=f'Seconds to keep accounts, credit cards and movements in memory, so repeating them in the same session does not make requests (default: {config.RESPONSE_CACHE_TTL}, 0 to disable).', type=float, default=config.RESPONSE_CACHE_TTL, dest='cache_ttl')
+    connection.add_argument(
+        '--retries', help=f'Times to retry a failed read request (server errors, rate limit, connection errors) with exponential backoff (default: {config.RETRY_ATTEMPTS - 1}, 0 to disable).', type=int, default=config.RETRY_ATTEMPTS - 1, dest='retries')
+
+    ### Comandos del modo batch (sin menú) ###
+    add_batch_commands(parser.add_subparsers(
+        title='Batch commands', description='Run a single action without the interactive menu.', dest='command'))
 
     ### Parse arguments ###
     args = parser.parse_args()
 
-    ### Run ###
-    out = Output(args.no_colors)
+    if args.profile_startup:
+        atexit.register(profile.report)
+
+    with profile.phase('client imports'):
+        from src.metrics import Metrics
+        from src.retry import RetryPolicy
+
+    # Compartidas por todos los clientes (ver src/metrics.py).
+    metrics = Metrics()
+    if args.metrics_out:
+        atexit.register(metrics.dump, args.metrics_out)
+
+    if args.trace:
+        from src.hooks import hooks
+        from src.tracing import ChromeTraceExporter, Tracer
+        tracer = Tracer(ChromeTraceExporter(args.trace))
+        hooks.add(tracer)
+        atexit.register(tracer.close)
+
+    profiler = None
+    if args.profile:
+        from src.hooks import hooks
+        from src.profiling import PluginProfiler
+        profiler = PluginProfiler()
+        hooks.add(profiler)
+
+    if args.use_async and importlib.util.find_spec('httpx') is None:
+        parser.error('--async requires httpx (pip install httpx).')
+    if args.remember_session and importlib.util.find_spec('cryptography') is None:
+        parser.error('--remember-session requires cryptography (pip install cryptography).')
 
+    ### Run ###
     api_key = args.api_key
-
-    cli = CLI(out, api_key)
+    # Solo los límites que se pasaron por parámetro,
+    # el resto depende del environment.
+    rate_limit = {}
+    if args.rate is not None:
+        rate_limit['rate'] = args.rate
+    if args.max_in_flight is not None:
+        rate_limit['max_in_flight'] = args.max_in_flight
+
+    client_options = {
+        'pool_size': args.pool_size,
+        'timeout': (config.HTTP_CONNECT_TIMEOUT, args.timeout),
+        'retry_policy': RetryPolicy(attempts=args.retries + 1),
+        'rate_limit': rate_limit,
+        'use_async': args.use_async,
+        'remember_session': args.remember_session,
+        'compact_movements': args.compact_movements,
+        'metrics': metrics,
+        'cache_ttl': args.cache_ttl
+    }
+
+    if args.command:
+        with profile.phase('batch mode'):
+            from src.batch import Batch
+        out = Output(args.no_colors, quiet=True)
+        batch = Batch(out, api_key, args.environment,
+                      client_options, args.stats)
+        exit(batch.run(args))
+
+    out = Output(args.no_colors, compact=args.compact, paged=args.paged)
+
+    with profile.phase('interactive CLI'):
+        from src.cli import CLI
+    cli = CLI(out, api_key, args.environment,
+              client_options, args.stats, profiler)
     print('')
     cli.run()
 
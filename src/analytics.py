@@ -0,0 +1,247 @@
+"""
+Resúmenes de movimientos: totales por cuenta, sumas por día y por mes,
+saldo acumulado y principales contrapartes.
+
+Los movimientos se cargan en columnas (un array por campo, ver
+MovementFrame). Todos los reportes se arman agrupando con
+MovementFrame._group, que usa NumPy si está instalado (si no, un loop
+de Python con los mismos resultados); lo demás recorre los grupos,
+que son muchos menos que los movimientos.
+"""
+import datetime
+from array import array
+from typing import Iterable, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.config import ANALYTICS_TOP
+
+# Campos de cada reporte, como en src/export.py.
+TOTALS_FIELDS = [('account', 'str'), ('currency', 'str'), ('movements', 'int'),
+                 ('debit', 'float'), ('credit', 'float'), ('net', 'float'),
+                 ('first_date', 'date'), ('last_date', 'date')]
+DAILY_FIELDS = [('account', 'str'), ('currency', 'str'), ('date', 'date'),
+                ('movements', 'int'), ('debit', 'float'), ('credit', 'float'),
+                ('net', 'float')]
+MONTHLY_FIELDS = [('account', 'str'), ('currency', 'str'), ('month', 'str'),
+                  ('movements', 'int'), ('debit', 'float'), ('credit', 'float'),
+                  ('net', 'float')]
+BALANCE_FIELDS = [('account', 'str'), ('currency', 'str'), ('date', 'date'),
+                  ('debit', 'float'), ('credit', 'float'), ('balance', 'float')]
+COUNTERPARTY_FIELDS = [('currency', 'str'), ('detail', 'str'), ('movements', 'int'),
+                       ('debit', 'float'), ('credit', 'float')]
+
+
+def _amount(value) -> float:
+    # Prometeo devuelve '' (o None en el store) cuando no hay débito/crédito.
+    return float(value) if value not in (None, '') else 0.0
+
+
+def _money(value) -> float:
+    return round(float(value), 2)
+
+
+class MovementFrame:
+    """
+    Movimientos de varias cuentas en columnas. Los textos que se
+    repiten (cuenta y detalle) se guardan una vez y cada movimiento
+    tiene el código (índice) del suyo:
+
+        accounts: [(account, currency)], account: código de cada movimiento.
+        details: [detail], detail: código de cada movimiento.
+        day: fecha (date.toordinal()), month: año * 12 + mes - 1.
+        debit, credit: importes (0 si no hay).
+    """
+
+    def __init__(self):
+        self.accounts = []
+        self.details = []
+        self.account = array('l')
+        self.detail = array('l')
+        self.day = array('l')
+        self.month = array('l')
+        self.debit = array('d')
+        self.credit = array('d')
+
+    def __len__(self):
+        return len(self.day)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> 'MovementFrame':
+        """
+        Cargar filas con los campos de export.ACCOUNT_MOVEMENT_FIELDS
+        (account, currency, id, reference, date, detail, debit, credit).
+        """
+        frame = cls()
+        account_codes = {}
+        detail_codes = {}
+        for account, currency, _, _, date, detail, debit, credit in rows:
+            code = account_codes.get((account, currency))
+            if code is None:
+                code = account_codes[(account, currency)] = len(frame.accounts)
+                frame.accounts.append((account, currency))
+            frame.account.append(code)
+
+            code = detail_codes.get(detail)
+            if code is None:
+                code = detail_codes[detail] = len(frame.details)
+                frame.details.append(detail)
+            frame.detail.append(code)
+
+            frame.day.append(date.toordinal())
+            frame.month.append(date.year * 12 + date.month - 1)
+            frame.debit.append(_amount(debit))
+            frame.credit.append(_amount(credit))
+        return frame
+
+    def _group(self, keys: List[array], values: List[array]):
+        """
+        Agrupar por las columnas keys (códigos enteros) y sumar values.
+        Devuelve (columnas de keys de cada grupo, cantidad de movimientos
+        de cada grupo, sumas de cada columna de values), ordenados por keys.
+        """
+        if np is None:
+            groups = {}
+            for index, key in enumerate(zip(*keys)):
+                sums = groups.get(key)
+                if sums is None:
+                    sums = groups[key] = [0] + [0.0] * len(values)
+                sums[0] += 1
+                for column, value in enumerate(values, 1):
+                    sums[column] += value[index]
+            ordered = sorted(groups)
+            key_columns = [list(column) for column in zip(*ordered)] or [[] for _ in keys]
+            sums = [[groups[key][column] for key in ordered]
+                    for column in range(len(values) + 1)]
+            return key_columns, sums[0], sums[1:]
+
+        # Las keys se combinan en un solo entero (como los dígitos de
+        # un número en base size) para agrupar con un solo np.unique.
+        keys = [np.frombuffer(column, dtype=column.typecode).astype(np.int64)
+                for column in keys]
+        offsets = [int(column.min()) if len(column) else 0 for column in keys]
+        sizes = [int(column.max()) - offset + 1 if len(column) else 1
+                 for column, offset in zip(keys, offsets)]
+        combined = np.zeros(len(self), dtype=np.int64)
+        for column, offset, size in zip(keys, offsets, sizes):
+            combined = combined * size + (column - offset)
+
+        unique, inverse = np.unique(combined, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(unique))
+        sums = [np.bincount(inverse, weights=np.frombuffer(column, dtype=np.float64),
+                            minlength=len(unique)) for column in values]
+
+        key_columns = []
+        for offset, size in reversed(list(zip(offsets, sizes))):
+            key_columns.append(unique % size + offset)
+            unique = unique // size
+        key_columns.reverse()
+        return ([column.tolist() for column in key_columns], counts.tolist(),
+                [column.tolist() for column in sums])
+
+    def totals(self) -> List[tuple]:
+        """
+        Una fila por cuenta (ver TOTALS_FIELDS).
+        """
+        (accounts,), counts, (debits, credits) = self._group(
+            [self.account], [self.debit, self.credit])
+
+        # Primer y último día de cada cuenta (los grupos vienen
+        # ordenados por cuenta y día).
+        (day_accounts, days), _, _ = self._group([self.account, self.day], [])
+        first, last = {}, {}
+        for account, day in zip(day_accounts, days):
+            first.setdefault(account, day)
+            last[account] = day
+
+        return [self.accounts[account] + (count, _money(debit), _money(credit),
+                                          _money(credit - debit),
+                                          datetime.date.fromordinal(first[account]),
+                                          datetime.date.fromordinal(last[account]))
+                for account, count, debit, credit in zip(accounts, counts, debits, credits)]
+
+    def daily(self) -> List[tuple]:
+        """
+        Una fila por cuenta y día con movimientos (ver DAILY_FIELDS).
+        """
+        (accounts, days), counts, (debits, credits) = self._group(
+            [self.account, self.day], [self.debit, self.credit])
+        return [self.accounts[account] + (datetime.date.fromordinal(day), count,
+                                          _money(debit), _money(credit), _money(credit - debit))
+                for account, day, count, debit, credit in zip(accounts, days, counts, debits, credits)]
+
+    def monthly(self) -> List[tuple]:
+        """
+        Una fila por cuenta y mes con movimientos (ver MONTHLY_FIELDS).
+        """
+        (accounts, months), counts, (debits, credits) = self._group(
+            [self.account, self.month], [self.debit, self.credit])
+        return [self.accounts[account] + (f'{month // 12}-{month % 12 + 1:02}', count,
+                                          _money(debit), _money(credit), _money(credit - debit))
+                for account, month, count, debit, credit in zip(accounts, months, counts, debits, credits)]
+
+    def balances(self) -> List[tuple]:
+        """
+        Saldo acumulado de cada cuenta al final de cada día con
+        movimientos (ver BALANCE_FIELDS). Prometeo no da el saldo al
+        principio del intervalo, así que empieza en 0.
+        """
+        (accounts, days), _, (debits, credits) = self._group(
+            [self.account, self.day], [self.debit, self.credit])
+
+        rows = []
+        balance = 0.0
+        for index, (account, day, debit, credit) in enumerate(zip(accounts, days, debits, credits)):
+            if index == 0 or account != accounts[index - 1]:
+                balance = 0.0
+            balance += credit - debit
+            rows.append(self.accounts[account] + (datetime.date.fromordinal(day), _money(debit),
+                                                  _money(credit), _money(balance)))
+        return rows
+
+    def counterparties(self, top: int = ANALYTICS_TOP) -> List[tuple]:
+        """
+        Los top detalles (contrapartes) con más volumen (débito +
+        crédito) de cada moneda (ver COUNTERPARTY_FIELDS).
+        """
+        (accounts, details), counts, (debits, credits) = self._group(
+            [self.account, self.detail], [self.debit, self.credit])
+
+        # Se juntan las cuentas de la misma moneda.
+        groups = {}
+        for account, detail, count, debit, credit in zip(accounts, details, counts, debits, credits):
+            key = (self.accounts[account][1], detail)
+            sums = groups.get(key)
+            if sums is None:
+                groups[key] = [count, debit, credit]
+            else:
+                sums[0] += count
+                sums[1] += debit
+                sums[2] += credit
+
+        # Por moneda, de más a menos volumen (a igual volumen, en el
+        # orden en que aparecieron los detalles).
+        order = sorted(groups, key=lambda key: (key[0], -(groups[key][1] + groups[key][2]), key[1]))
+
+        rows = []
+        taken = {}
+        for currency, detail in order:
+            if taken.get(currency, 0) >= top:
+                continue
+            taken[currency] = taken.get(currency, 0) + 1
+            count, debit, credit = groups[(currency, detail)]
+            rows.append((currency, self.details[detail], count, _money(debit), _money(credit)))
+        return rows
+
+
+# Reportes disponibles: nombre -> (campos, función).
+REPORTS = {
+    'totals': (TOTALS_FIELDS, lambda frame, top: frame.totals()),
+    'daily': (DAILY_FIELDS, lambda frame, top: frame.daily()),
+    'monthly': (MONTHLY_FIELDS, lambda frame, top: frame.monthly()),
+    'balance': (BALANCE_FIELDS, lambda frame, top: frame.balances()),
+    'counterparties': (COUNTERPARTY_FIELDS, lambda frame, top: frame.counterparties(top)),
+}
@@ -0,0 +1,349 @@
+"""
+Cliente async de Prometeo (requiere httpx).
+
+Tiene los mismos métodos que PrometeoClient pero con async/await,
+así un solo thread puede manejar cientos de sesiones y requests a la vez.
+"""
+import asyncio
+import datetime
+import itertools
+import time
+from typing import Awaitable, Callable, List
+
+from prometeo import exceptions
+from prometeo.banking.exceptions import BankingClientError
+from prometeo.banking.models import Account, CreditCard, Movement, Provider
+from requests.exceptions import ConnectionError as RequestsConnError
+from requests.exceptions import Timeout as RequestsTimeout
+
+from src.cache import ProviderCache, conditional_headers
+from src.client import ExtendedBankingClient, split_interval
+from src.concurrency import AsyncThrottle, Result, gather_concurrently
+from src.config import (HTTP_CONNECT_TIMEOUT, HTTP_POOL_SIZE,
+                        HTTP_READ_TIMEOUT, LOGGED_IN_STATUS, LOGGED_OUT_STATUS,
+                        MOVEMENT_WINDOW_DAYS, RATE_LIMITS)
+from src.exceptions import MissingDependency
+from src.hooks import hooks
+from src.metrics import endpoint_name
+from src.movements import MovementList, merge_windows
+from src.retry import IDEMPOTENT_METHODS, RetryPolicy, retry_reason
+
+DATE_FORMAT = '%d/%m/%Y'
+
+
+def _movement(data: dict) -> Movement:
+    return Movement(id=data['id'], reference=data['reference'],
+                    date=datetime.datetime.strptime(data['date'], DATE_FORMAT),
+                    detail=data['detail'], debit=data['debit'], credit=data['credit'])
+
+
+def _credit_card(data: dict) -> CreditCard:
+    return CreditCard(id=data['id'], name=data['name'], number=data['number'],
+                      close_date=datetime.datetime.strptime(
+                          data['close_date'], DATE_FORMAT),
+                      due_date=datetime.datetime.strptime(
+                          data['due_date'], DATE_FORMAT),
+                      balance_local=data['balance_local'],
+                      balance_dollar=data['balance_dollar'])
+
+
+class AsyncPrometeoClient:
+    """
+    Versión async de PrometeoClient. Usa los mismos límites (RATE_LIMITS),
+    reintentos y cache de providers, y levanta las mismas excepciones
+    (las de prometeo y, para errores de conexión, las de requests), así
+    que los plugins pueden manejar los errores igual que con el otro cliente.
+
+    Se usa como async context manager, para cerrar las conexiones:
+
+        async with AsyncPrometeoClient(api_key, 'sandbox') as client:
+            await client.login(provider, username, password)
+            accounts = await client.get_bank_accounts()
+
+    session_key permite usar una sesión abierta por otro cliente
+    (ver PrometeoClient.get_async_client). Con sessions (el SessionPool
+    de ese cliente), si Prometeo dice que la session key venció se
+    vuelve a hacer login y se repite el request, igual que en PrometeoClient.
+    """
+
+    def __init__(self, api_key: str, environment: str, pool_size: int = HTTP_POOL_SIZE, timeout: tuple = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), retry_policy: RetryPolicy = None, rate_limit: dict = None, session_key: str = None, provider: str = None):
+        try:
+            import httpx
+        except ImportError:
+            raise MissingDependency(
+                'httpx is required for the async client (pip3 install -r requirements-extras.txt)')
+        self._httpx = httpx
+
+        if environment not in ExtendedBankingClient.ENVIRONMENTS:
+            raise exceptions.ClientError(
+                f'Invalid environment "{environment}"')
+
+        self.api_key = api_key
+        self.environment = environment
+        self.status = LOGGED_IN_STATUS if session_key else LOGGED_OUT_STATUS
+        self.provider = provider
+        self.window_days = MOVEMENT_WINDOW_DAYS
+        self.provider_cache = ProviderCache()
+        # Ver PrometeoClient.compact_movements.
+        self.compact_movements = False
+        # Ver src/metrics.py (None para no registrarlas).
+        self.metrics = None
+        # Ver PrometeoClient.response_cache.
+        self.response_cache = None
+        # Pool para renovar la sesión cuando vence (None para no renovarla)
+        # y on_session_refresh(old_key, new_key), que se llama al renovar
+        # la sesión actual.
+        self.sessions = None
+        self.on_session_refresh = None
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.throttle = AsyncThrottle(
+            **{**RATE_LIMITS.get(environment, {}), **(rate_limit or {})})
+
+        connect_timeout, read_timeout = timeout
+        self._http = httpx.AsyncClient(
+            base_url=ExtendedBankingClient.ENVIRONMENTS[environment],
+            headers={'X-API-Key': api_key},
+            limits=httpx.Limits(max_connections=pool_size,
+                                max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+        self._session_key = session_key
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Cerrar las conexiones. No cierra la sesión de Prometeo (ver logout).
+        """
+        await self._http.aclose()
+
+    async def _request(self, method: str, url: str, attempt: int = 1, **kwargs):
+        async with self.throttle:
+            try:
+                with hooks.around('http.request', method=method, endpoint=endpoint_name(url),
+                                  attempt=attempt) as info:
+                    start = time.perf_counter()
+                    response = await self._http.request(method, url, **kwargs)
+                    info['status'] = response.status_code
+                    if self.metrics is not None:
+                        self.metrics.record_response(method, url, response, time.perf_counter() - start)
+                    return response
+            # Se traducen a las excepciones de requests, que son
+            # las que manejan los plugins y los reintentos.
+            except self._httpx.TimeoutException as e:
+                raise RequestsTimeout(str(e))
+            except self._httpx.TransportError as e:
+                raise RequestsConnError(str(e))
+
+    async def _call_api(self, method: str, url: str, **kwargs) -> dict:
+        with hooks.around('api.call', method=method, endpoint=endpoint_name(url)):
+            if self.metrics is None:
+                return await self._call(method, url, **kwargs)
+            with self.metrics.measure(method, url):
+                return await self._call(method, url, **kwargs)
+
+    async def _call(self, method: str, url: str, **kwargs) -> dict:
+        # Ver ExtendedBankingClient.make_request.
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.key(self.environment, method, url, kwargs.get('params'))
+        cached = self.response_cache.get(cache_key) if cache_key is not None else None
+
+        if cached is not None and cached[1]:
+            hooks.notify('cache.hit', method=method, endpoint=endpoint_name(url))
+            if self.metrics is not None:
+                self.metrics.record_cache_hit(method, url)
+            response = cached[0]
+        else:
+            if cached is not None:
+                kwargs['headers'] = conditional_headers(cached[0])
+            response = await self._send(method, url, **kwargs)
+            if cache_key is not None:
+                if response.status_code == 304 and cached is not None:
+                    self.response_cache.renew(cache_key)
+                    response = cached[0]
+                elif response.status_code == 200:
+                    self.response_cache.set(cache_key, response)
+
+        try:
+            return self._process(response)
+        except Exception:
+            # Un 200 con un error de Prometeo no debe quedar en cache.
+            if cache_key is not None:
+                self.response_cache.discard(cache_key)
+            raise
+
+    async def _send(self, method: str, url: str, **kwargs):
+        attempts = itertools.count(1)
+
+        def on_retry(attempt, delay, reason):
+            hooks.notify('retry', method=method, endpoint=endpoint_name(url),
+                         attempt=attempt, delay=delay, reason=retry_reason(reason))
+            if self.metrics is not None:
+                self.metrics.record_retry(method, url, reason)
+
+        if self.retry_policy is None or method.upper() not in IDEMPOTENT_METHODS:
+            return await self._request(method, url, **kwargs)
+        return await self.retry_policy.call_async(
+            lambda: self._request(method, url, next(attempts), **kwargs), on_retry)
+
+    def _process(self, response) -> dict:
+        """
+        Igual que BaseClient.call_api y BankingAPIClient.on_response
+        de la librería de prometeo.
+        """
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if response.status_code == 400:
+            raise exceptions.BadRequestError(data.get('message'))
+        elif response.status_code == 401:
+            raise exceptions.UnauthorizedError(data.get('message'))
+        elif response.status_code == 403 and data.get('status') != 'wrong_credentials':
+            raise exceptions.ForbiddenError(data.get('message'))
+        elif response.status_code == 404:
+            raise exceptions.NotFoundError(data.get('message'))
+        elif response.status_code == 500:
+            raise exceptions.InternalAPIError(
+                data.get('message', response.text))
+        elif response.status_code == 503:
+            raise exceptions.ProviderUnavailableError(data.get('message'))
+
+        if data.get('status') == 'error':
+            if data.get('message') == 'Invalid key':
+                raise exceptions.InvalidSessionKeyError(data['message'])
+            raise BankingClientError(data.get('message'))
+        return data
+
+    async def login(self, provider, username, password, **kwargs) -> None:
+        data = {'provider': provider, 'username': username,
+                'password': password, **kwargs}
+        response = await self._call_api('POST', '/login/', data=data)
+        if response['status'] == 'wrong_credentials':
+            raise exceptions.WrongCredentialsError(response.get('message'))
+        if response['status'] not in ('logged_in', 'select_client', 'interaction_required'):
+            raise BankingClientError(response.get('message'))
+        self._session_key = response['key']
+        self.provider = provider
+        self.status = LOGGED_IN_STATUS
+
+    async def logout(self) -> bool:
+        """
+        Invalidate Prometeo session key.
+        Returns True if logout was successful.
+        """
+        if self.status == LOGGED_IN_STATUS:
+            await self._call_api('GET', '/logout/', params={'key': self._session_key})
+            self.status = LOGGED_OUT_STATUS
+            self._session_key = None
+            self.provider = None
+            return True
+
+        return False
+
+    async def _cached(self, key: str, fetch: Callable[[], Awaitable], refresh: bool):
+        """
+        Como ProviderCache.fetch, pero si el valor venció se vuelve
+        a pedir en lugar de actualizarlo en background.
+        """
+        cached = None if refresh else self.provider_cache.get(self.environment, key)
+        if cached is not None and cached[1]:
+            return cached[0]
+        value = await fetch()
+        self.provider_cache.set(self.environment, key, value)
+        return value
+
+    async def get_providers(self, refresh: bool = False) -> List[Provider]:
+        async def fetch():
+            return (await self._call_api('GET', '/provider/'))['providers']
+
+        if self.provider_cache is None:
+            providers = await fetch()
+        else:
+            providers = await self._cached('providers', fetch, refresh)
+        return [Provider(**provider) for provider in providers]
+
+    async def get_provider_detail(self, provider_code, refresh: bool = False) -> dict:
+        def fetch():
+            return self._call_api('GET', f'/provider/{provider_code}/')
+
+        if self.provider_cache is None:
+            return await fetch()
+        return await self._cached(f'provider/{provider_code}', fetch, refresh)
+
+    async def get_provider_details(self, provider_codes) -> List[Result]:
+        return await gather_concurrently(self.get_provider_detail, provider_codes)
+
+    async def _call_with_session(self, func: Callable[[str], Awaitable]):
+        """
+        Ver PrometeoClient._call_with_session.
+        """
+        session_key = self.get_session_key()
+        try:
+            return await func(session_key)
+        except exceptions.InvalidSessionKeyError:
+            new_key = await self._refresh_session(session_key)
+            if new_key is None:
+                raise
+            return await func(new_key)
+
+    async def _refresh_session(self, session_key: str) -> str:
+        """
+        Renovar la sesión con sessions. Devuelve la nueva key, o None
+        si no se puede renovar.
+        """
+        if self.sessions is None:
+            return None
+        # El login del pool usa el cliente sync: se hace en un
+        # thread para no trabar el event loop.
+        new_key = await asyncio.to_thread(self.sessions.refresh, session_key)
+        if new_key is not None and self._session_key == session_key:
+            self._session_key = new_key
+            if self.on_session_refresh is not None:
+                self.on_session_refresh(session_key, new_key)
+        return new_key
+
+    async def get_bank_accounts(self) -> List[Account]:
+        data = await self._call_with_session(
+            lambda session_key: self._call_api('GET', '/account/', params={'key': session_key}))
+        return [Account(**account) for account in data['accounts']]
+
+    async def get_credit_cards(self) -> List[CreditCard]:
+        data = await self._call_with_session(
+            lambda session_key: self._call_api('GET', '/credit-card/', params={'key': session_key}))
+        return [_credit_card(card) for card in data['credit_cards']]
+
+    async def get_movements(self, account_number, currency_code, start, end) -> List[Movement]:
+        return await self._get_movements_by_window(
+            '/movement/', {'account': account_number}, currency_code, start, end)
+
+    async def get_credit_card_movements(self, account_number, currency_code, start, end) -> List[Movement]:
+        return await self._get_movements_by_window(
+            f'/credit-card/{account_number}/movements', {}, currency_code, start, end)
+
+    async def _get_movements_by_window(self, url: str, params: dict, currency_code, start, end) -> List[Movement]:
+        """
+        Ver PrometeoClient._get_movements_by_window.
+        """
+        async def fetch(window):
+            data = await self._call_with_session(
+                lambda session_key: self._call_api('GET', url, params={
+                    **params, 'key': session_key, 'currency': currency_code,
+                    'date_start': window[0].strftime(DATE_FORMAT),
+                    'date_end': window[1].strftime(DATE_FORMAT)}))
+            if self.compact_movements:
+                return MovementList.from_data(data['movements'])
+            return [_movement(movement) for movement in data['movements']]
+
+        windows = split_interval(start, end, self.window_days)
+        if len(windows) == 1:
+            return await fetch(windows[0])
+
+        return merge_windows(await gather_concurrently(fetch, windows))
+
+    def get_session_key(self) -> str:
+        return self._session_key
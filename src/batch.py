@@ -0,0 +1,504 @@
+"""
+Modo batch: ejecutar acciones de los plugins sin menú ni prompts.
+
+Pensado para cron jobs y pipelines. Los resultados se escriben
+en stdout (una fila por línea, separada por tabs) y los errores
+en stderr. El exit code indica el resultado (ver config.EXIT_*).
+"""
+import argparse
+import os
+import shlex
+import sys
+from os.path import exists
+
+import src.config as config
+import src.export as export
+from prometeo import exceptions as prometeo_exc
+from prometeo.banking.exceptions import BankingClientError
+from requests.exceptions import ConnectionError as RequestsConnError
+from requests.exceptions import Timeout as RequestsTimeout
+from src.client import PrometeoClient
+from src.commands import (API_KEY_ENV, PASSWORD_ENV, PROVIDER_ENV,
+                          USERNAME_ENV, add_batch_commands)
+from src.exceptions import MissingAPIKey, MissingDependency
+from src.hooks import hooks
+from src.plugins import get_plugin
+from src.startup import profile
+from src.store import AccountKey, MovementStore
+
+
+class Batch:
+    """
+    Non-interactive interface.
+    """
+
+    def __init__(self, out, api_key: str = '', environment: str = config.DEFAULT_ENVIRONMENT, client_options: dict = None, stats: bool = False):
+        self.out = out
+        self.api_key = api_key
+        self.environment = environment
+        # Argumentos extra para PrometeoClient (pool_size, timeout, etc).
+        self.client_options = client_options or {}
+        self.stats = stats
+        self.client = None
+        self.plugins = {}
+
+    def get_api_key(self) -> str:
+        """
+        Igual que CLI.get_api_key pero sin preguntarle al usuario.
+        """
+        api_key = self.api_key or os.environ.get(API_KEY_ENV, '')
+        if not api_key and exists(config.API_KEY_PATH):
+            with open(config.API_KEY_PATH, 'r') as file:
+                api_key = file.readline().strip()
+
+        if not api_key:
+            raise MissingAPIKey
+
+        return api_key
+
+    def get_plugin(self, plugin_name: str):
+        """
+        Instanciar (una sola vez) el plugin con ese nombre.
+        """
+        if plugin_name not in self.plugins:
+            self.plugins[plugin_name] = get_plugin(
+                plugin_name)(self.client, self.out)
+        return self.plugins[plugin_name]
+
+    def run(self, args) -> int:
+        """
+        Ejecutar el comando y devolver el exit code.
+        """
+        try:
+            with profile.phase('client'):
+                self.client = PrometeoClient(
+                    self.get_api_key(), self.environment, **self.client_options)
+        except MissingAPIKey as e:
+            self.out.error(
+                f'{e.message}. Use -k, {API_KEY_ENV} or save it using the interactive CLI.')
+            return config.EXIT_USAGE
+
+        try:
+            return self.execute(args)
+        except BrokenPipeError:
+            # stdout se cerró antes de tiempo (ej: `| head`).
+            # Ver https://docs.python.org/3/library/signal.html#note-on-sigpipe
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return config.EXIT_OK
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for plugin in self.plugins.values():
+            try:
+                with hooks.around('plugin.close', plugin=plugin.plugin_name):
+                    plugin.close()
+            except Exception:
+                self.out.warning(
+                    f'<{plugin.plugin_name}> did not close properly.')
+
+        if self.stats:
+            stats = self.client.connection_stats()
+            print(f'Connections: {stats.requests} requests, {stats.connections} opened, {stats.reused} reused.',
+                  file=sys.stderr)
+
+    def execute(self, args) -> int:
+        """
+        Ejecutar un comando, traduciendo las excepciones a exit codes.
+        """
+        try:
+            with hooks.around('command', command=args.handler):
+                return getattr(self, args.handler)(args)
+
+        except prometeo_exc.UnauthorizedError:
+            self.out.error(
+                'Invalid API key. Are you in the correct environment?')
+            return config.EXIT_AUTH_ERROR
+
+        except prometeo_exc.WrongCredentialsError:
+            self.out.error('Wrong or missing credentials.')
+            self.client.status = config.WRONG_CREDENTIALS_STATUS
+            return config.EXIT_AUTH_ERROR
+
+        except BankingClientError as e:
+            self.out.error(f'Prometeo error: {e.message}')
+            return config.EXIT_NOT_FOUND
+
+        except prometeo_exc.PrometeoError as e:
+            self.out.error(f'Internal Prometeo error: {e.message}')
+            self.client.status = config.PROMETEO_ERROR_STATUS
+            return config.EXIT_ERROR
+
+        except RequestsConnError:
+            self.out.error('No internet connection.')
+            return config.EXIT_CONNECTION_ERROR
+
+        except RequestsTimeout:
+            self.out.error('Prometeo took too long to respond.')
+            return config.EXIT_CONNECTION_ERROR
+
+        except MissingDependency as e:
+            self.out.error(f'{e.message}.')
+            return config.EXIT_ERROR
+
+        except BrokenPipeError:
+            # Se maneja en run().
+            raise
+
+        except OSError as e:
+            # Ej: no se puede escribir el archivo de --output.
+            self.out.error(f'{e.filename}: {e.strerror}.')
+            return config.EXIT_ERROR
+
+    def write_rows(self, args, rows, fields) -> int:
+        """
+        Escribir las filas (un iterable, que se consume de a una) en
+        el formato y archivo pedidos con --format y --output.
+        """
+        format = getattr(args, 'format', export.DEFAULT_FORMAT)
+        output = getattr(args, 'output', None)
+
+        if output is None:
+            if format == 'parquet':
+                sys.stdout.flush()
+                return export.export(rows, fields, format, sys.stdout.buffer)
+            return export.export(rows, fields, format, sys.stdout)
+
+        if format == 'parquet':
+            with open(output, 'wb') as stream:
+                return export.export(rows, fields, format, stream)
+        with open(output, 'w', newline='', encoding='utf-8') as stream:
+            return export.export(rows, fields, format, stream)
+
+    def credentials(self, args) -> dict:
+        """
+        Credenciales de los argumentos, las variables de entorno
+        o las de sandbox (en ese orden).
+        """
+        credentials = {
+            'provider': getattr(args, 'provider', None) or os.environ.get(PROVIDER_ENV),
+            'username': getattr(args, 'username', None) or os.environ.get(USERNAME_ENV),
+            'password': getattr(args, 'password', None) or os.environ.get(PASSWORD_ENV)
+        }
+        if self.client.environment == 'sandbox':
+            for key, value in config.SANDBOX_CREDENTIALS.items():
+                credentials[key] = credentials[key] or value
+        return credentials
+
+    def login(self, args) -> None:
+        """
+        Usar la sesión de las credenciales del comando. Solo se hace
+        login si no hay una abierta (ver SessionPool), así que cada línea
+        de un script puede usar credenciales distintas sin pagar un
+        login por línea.
+        """
+        credentials = self.credentials(args)
+        if not all(credentials.values()):
+            raise prometeo_exc.WrongCredentialsError('Missing credentials')
+
+        try:
+            self.get_plugin('Sessions').login(**credentials)
+        except KeyError:
+            # Ver SessionPlugin.run: la librería de Prometeo a veces
+            # da KeyError en lugar de WrongCredentialsError.
+            raise prometeo_exc.WrongCredentialsError('Wrong credentials')
+
+    # Comandos.
+
+    def list_accounts(self, args) -> int:
+        self.login(args)
+        self.write_rows(args, self.client.get_bank_accounts(), export.ACCOUNT_FIELDS)
+        return config.EXIT_OK
+
+    def list_cards(self, args) -> int:
+        self.login(args)
+        self.write_rows(args, self.client.get_credit_cards(), export.CREDIT_CARD_FIELDS)
+        return config.EXIT_OK
+
+    def movement_interval(self, args):
+        """
+        Intervalo de --from y --to (o el por defecto), o None si no es válido.
+        """
+        default_start, default_end = self.get_plugin('Transactions').default_interval()
+        start_date = args.start_date or default_start
+        end_date = args.end_date or default_end
+        if start_date > end_date:
+            self.out.error('Invalid date interval.')
+            return None
+        self.client.window_days = args.window
+        return start_date, end_date
+
+    def report_errors(self, results) -> int:
+        """
+        Mostrar los errores de fetch_all_movements y devolver el exit code.
+        """
+        exit_code = config.EXIT_OK
+        for result in results:
+            option, account_number, currency = result.item
+
+            if isinstance(result.error, BankingClientError):
+                # Ej: la tarjeta no tiene movimientos en esa moneda.
+                self.out.warning(
+                    f'{account_number} ({currency}): {result.error.message}')
+            elif result.error is not None:
+                self.out.error(
+                    f'{account_number} ({currency}): {result.error!r}')
+                exit_code = config.EXIT_ERROR
+        return exit_code
+
+    def stored_keys(self, args, store: MovementStore):
+        """
+        Cuentas del store pedidas con --all o --account y --currency,
+        o None si faltan argumentos.
+        """
+        provider = self.credentials(args)['provider']
+        if not provider:
+            self.out.error('--provider is required with --from-store.')
+            return None
+
+        if args.all:
+            return store.get_accounts(self.client.environment, provider)
+        if args.account and args.currency:
+            return [AccountKey(self.client.environment,
+                               provider, args.account, args.currency)]
+        self.out.error('--account and --currency are required (or use --all).')
+        return None
+
+    def movements(self, args) -> int:
+        transactions = self.get_plugin('Transactions')
+
+        interval = self.movement_interval(args)
+        if interval is None:
+            return config.EXIT_USAGE
+        start_date, end_date = interval
+
+        if args.from_store:
+            return self.stored_movements(args, start_date, end_date)
+
+        self.login(args)
+
+        if args.all:
+            return self.all_movements(args, start_date, end_date)
+
+        if not args.account or not args.currency:
+            self.out.error('--account and --currency are required (or use --all).')
+            return config.EXIT_USAGE
+
+        option = transactions.CREDIT_CARD if args.card else transactions.BANK_ACCOUNT
+        movements = transactions.fetch_movements(
+            option, args.account, args.currency, start_date, end_date)
+        self.write_rows(
+            args, map(export.movement_row, movements), export.MOVEMENT_FIELDS)
+        return config.EXIT_OK
+
+    def all_movements(self, args, start_date, end_date) -> int:
+        """
+        Movimientos de todas las cuentas y tarjetas. Cada fila empieza
+        con el número de cuenta y la moneda.
+        """
+        transactions = self.get_plugin('Transactions')
+        results = transactions.fetch_all_movements(
+            start_date, end_date, args.workers)
+
+        # Primero se reportan los errores y después se escriben
+        # todas las filas juntas (para que el archivo tenga un solo header).
+        exit_code = self.report_errors(results)
+
+        self.write_rows(args, (
+            result.item[1:] + export.movement_row(movement)
+            for result in results if result.error is None
+            for movement in result.value), export.ACCOUNT_MOVEMENT_FIELDS)
+
+        return exit_code
+
+    def stored_movements(self, args, start_date, end_date) -> int:
+        """
+        Movimientos del store local (ver sync), sin hacer requests.
+        Se leen de a partes, así que sirve para exportar muchos movimientos.
+        """
+        with MovementStore(args.store) as store:
+            keys = self.stored_keys(args, store)
+            if keys is None:
+                return config.EXIT_USAGE
+
+            count = self.write_rows(args, (
+                (key.account, key.currency) + export.movement_row(movement)
+                for key in keys
+                for movement in store.iter_movements(key, start_date, end_date)),
+                export.ACCOUNT_MOVEMENT_FIELDS)
+
+        return config.EXIT_OK if count else config.EXIT_NOT_FOUND
+
+    def analytics(self, args) -> int:
+        """
+        Resumen de los movimientos (ver src/analytics.py), pedidos a
+        Prometeo o leídos del store como en movements.
+        """
+        # Se importa acá porque carga NumPy (si está instalado).
+        from src.analytics import REPORTS, MovementFrame
+
+        interval = self.movement_interval(args)
+        if interval is None:
+            return config.EXIT_USAGE
+        start_date, end_date = interval
+
+        exit_code = config.EXIT_OK
+        if args.from_store:
+            with MovementStore(args.store) as store:
+                keys = self.stored_keys(args, store)
+                if keys is None:
+                    return config.EXIT_USAGE
+                frame = MovementFrame.from_rows(
+                    (key.account, key.currency) + export.movement_row(movement)
+                    for key in keys
+                    for movement in store.iter_movements(key, start_date, end_date))
+        else:
+            self.login(args)
+            transactions = self.get_plugin('Transactions')
+            if args.all:
+                results = transactions.fetch_all_movements(
+                    start_date, end_date, args.workers)
+                exit_code = self.report_errors(results)
+                rows = (result.item[1:] + export.movement_row(movement)
+                        for result in results if result.error is None
+                        for movement in result.value)
+            elif args.account and args.currency:
+                option = transactions.CREDIT_CARD if args.card else transactions.BANK_ACCOUNT
+                rows = ((args.account, args.currency) + export.movement_row(movement)
+                        for movement in transactions.fetch_movements(
+                            option, args.account, args.currency, start_date, end_date))
+            else:
+                self.out.error('--account and --currency are required (or use --all).')
+                return config.EXIT_USAGE
+            frame = MovementFrame.from_rows(rows)
+
+        if not len(frame):
+            self.out.warning('No movements found.')
+            return config.EXIT_NOT_FOUND
+
+        fields, report = REPORTS[args.report]
+        self.write_rows(args, report(frame, args.top), fields)
+        return exit_code
+
+    def sync(self, args) -> int:
+        """
+        Sincronización incremental. Una fila por cuenta con el intervalo
+        pedido, la cantidad de movimientos recibidos y los nuevos.
+        """
+        self.login(args)
+        transactions = self.get_plugin('Transactions')
+
+        if args.account:
+            if not args.currency:
+                self.out.error('--currency is required with --account.')
+                return config.EXIT_USAGE
+            option = transactions.CREDIT_CARD if args.card else transactions.BANK_ACCOUNT
+            jobs = [(option, args.account, args.currency)]
+        else:
+            jobs = transactions.get_all_accounts(args.workers)
+
+        with MovementStore(args.store) as store:
+            results = transactions.sync_movements(
+                store, jobs, args.end_date, args.workers)
+
+        exit_code = config.EXIT_OK
+        for result in results:
+            _, account_number, currency = result.item
+            if result.error is not None:
+                self.out.error(
+                    f'{account_number} ({currency}): {result.error!r}')
+                exit_code = config.EXIT_ERROR
+
+        self.write_rows(args, (
+            result.item[1:] + tuple(result.value)
+            for result in results if result.error is None), export.SYNC_FIELDS)
+
+        return exit_code
+
+    def list_providers(self, args) -> int:
+        return self.write_providers(args, None)
+
+    def search_providers(self, args) -> int:
+        return self.write_providers(args, args.pattern)
+
+    def write_providers(self, args, pattern) -> int:
+        meta = self.get_plugin('Meta')
+        results = meta.search(pattern)
+        if len(results) == 0:
+            self.out.warning(f'Did not find a match for {pattern}.')
+            return config.EXIT_NOT_FOUND
+
+        self.write_rows(args, results, export.PROVIDER_FIELDS)
+        return config.EXIT_OK
+
+    def refresh_providers(self, args) -> int:
+        providers = self.client.refresh_providers()
+        self.out.success(f'{len(providers)} providers updated.')
+        return config.EXIT_OK
+
+    def provider_detail(self, args) -> int:
+        meta = self.get_plugin('Meta')
+        results = meta.get_provider_details(args.codes)
+
+        # Si todos fallaron por el mismo motivo (ej: API key inválida),
+        # se trata como un error del comando.
+        errors = [result.error for result in results if result.error is not None]
+        if len(errors) == len(results):
+            raise errors[0]
+
+        exit_code = config.EXIT_OK
+        for result in results:
+            if result.error is not None:
+                self.out.error(
+                    f'{result.item}: could not get details ({result.error!r}).')
+                exit_code = config.EXIT_ERROR
+
+        self.write_rows(args, (
+            (result.item, result.value['country'], field['name'], field['type'],
+             field['interactive'], field['optional'])
+            for result in results if result.error is None
+            for field in result.value['auth_fields']), export.AUTH_FIELD_FIELDS)
+        return exit_code
+
+    def script(self, args) -> int:
+        """
+        Ejecutar un comando por línea, compartiendo cliente y sesiones.
+        Las líneas vacías y las que empiezan con '#' se ignoran.
+        Devuelve el exit code del primer comando que falle.
+        """
+        parser = argparse.ArgumentParser(prog='script', add_help=False)
+        add_batch_commands(parser.add_subparsers(
+            dest='command', required=True), script=False)
+
+        if args.file == '-':
+            return self.run_script(parser, sys.stdin, args.stop_on_error)
+
+        try:
+            with open(args.file, 'r') as file:
+                return self.run_script(parser, file, args.stop_on_error)
+        except OSError as e:
+            self.out.error(f'Could not read script: {e.strerror}.')
+            return config.EXIT_USAGE
+
+    def run_script(self, parser, lines, stop_on_error: bool = False) -> int:
+        exit_code = config.EXIT_OK
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            try:
+                command_args = parser.parse_args(shlex.split(line))
+                code = self.execute(command_args)
+            except (SystemExit, ValueError):
+                # argparse hace exit ante errores de uso,
+                # shlex da ValueError (ej: comillas sin cerrar).
+                code = config.EXIT_USAGE
+
+            if code != config.EXIT_OK:
+                self.out.error(f'Line {line_number} failed: {line}')
+                exit_code = exit_code or code
+                if stop_on_error:
+                    break
+
+        return exit_code
@@ -0,0 +1,202 @@
+"""
+Caches de respuestas de Prometeo.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from src.config import (PROVIDER_CACHE_PATH, PROVIDER_CACHE_TTL,
+                        RESPONSE_CACHE_ENDPOINTS, RESPONSE_CACHE_SIZE,
+                        RESPONSE_CACHE_TTL)
+from src.metrics import endpoint_name
+
+
+class ProviderCache:
+    """
+    Cache en disco (JSON) de la lista de providers y sus detalles.
+    Los datos se guardan por environment, con la hora en que se
+    obtuvieron para saber si ya vencieron (ttl en segundos).
+
+    Formato del archivo:
+        {environment: {key: [timestamp, value]}}
+    """
+
+    def __init__(self, path: str = PROVIDER_CACHE_PATH, ttl: float = PROVIDER_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._data = self._load()
+        # Keys que se están actualizando en background.
+        self._revalidating = set()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            # No existe o está corrupto: empezar de cero.
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self) -> None:
+        # Se escribe en un archivo temporal y después se reemplaza,
+        # para no dejar el cache corrupto si se corta a la mitad.
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(self._data, file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # El cache es opcional, no debe romper el CLI.
+            pass
+
+    def get(self, environment: str, key: str):
+        """
+        Devuelve (value, fresh) o None si no está en cache.
+        """
+        with self._lock:
+            entry = self._data.get(environment, {}).get(key)
+        if entry is None:
+            return None
+        timestamp, value = entry
+        return value, time.time() - timestamp < self.ttl
+
+    def set(self, environment: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._data.setdefault(environment, {})[key] = [time.time(), value]
+            self._save()
+
+    def clear(self, environment: str, prefix: str = '') -> None:
+        """
+        Borrar las entradas del environment cuya key empiece con prefix.
+        """
+        with self._lock:
+            entries = self._data.get(environment, {})
+            for key in [key for key in entries if key.startswith(prefix)]:
+                del entries[key]
+            self._save()
+
+    def fetch(self, environment: str, key: str, fetch: Callable, refresh: bool = False) -> Any:
+        """
+        Obtener un valor usando el cache (stale-while-revalidate):
+         - Si está vigente, se devuelve sin hacer requests.
+         - Si venció, se devuelve igual y se actualiza en background.
+         - Si no está (o refresh es True), se pide con fetch().
+        """
+        cached = None if refresh else self.get(environment, key)
+
+        if cached is None:
+            value = fetch()
+            self.set(environment, key, value)
+            return value
+
+        value, fresh = cached
+        if not fresh:
+            self._revalidate(environment, key, fetch)
+        return value
+
+    def _revalidate(self, environment: str, key: str, fetch: Callable) -> None:
+        with self._lock:
+            if (environment, key) in self._revalidating:
+                return
+            self._revalidating.add((environment, key))
+
+        def task():
+            try:
+                self.set(environment, key, fetch())
+            except Exception:
+                # Sin conexión, etc: se sigue usando el valor viejo.
+                pass
+            finally:
+                with self._lock:
+                    self._revalidating.discard((environment, key))
+
+        threading.Thread(target=task, daemon=True).start()
+
+
+def conditional_headers(response) -> dict:
+    """
+    Headers para preguntar si una respuesta cambió (304 si no cambió).
+    """
+    headers = {}
+    if response.headers.get('ETag'):
+        headers['If-None-Match'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        headers['If-Modified-Since'] = response.headers['Last-Modified']
+    return headers
+
+
+class ResponseCache:
+    """
+    Cache en memoria de las respuestas HTTP (de requests o httpx) de los
+    GET que solo leen datos (endpoints), por environment, URL y parámetros.
+    Los parámetros incluyen la session key, así que cada sesión tiene
+    sus propias entradas.
+
+    Las entradas vencen a los ttl segundos y, si hay más de size, se
+    descarta la que se usó hace más tiempo (LRU). Si la respuesta trajo
+    ETag o Last-Modified, al vencer no se borra: se pregunta si cambió
+    (ver conditional_headers) y, si Prometeo responde 304, se renueva.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, size: int = RESPONSE_CACHE_SIZE, endpoints: tuple = RESPONSE_CACHE_ENDPOINTS):
+        self.ttl = ttl
+        self.size = size
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+        # key -> [vencimiento (time.monotonic), respuesta]
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, environment: str, method: str, url: str, params: dict = None):
+        """
+        Key del request, o None si no se debe guardar en cache.
+        """
+        if method.upper() != 'GET' or endpoint_name(url) not in self.endpoints:
+            return None
+        return environment, url.strip('/'), tuple(sorted((params or {}).items()))
+
+    def get(self, key):
+        """
+        Devuelve (respuesta, fresh) o None si no está en cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response = entry
+            fresh = time.monotonic() < expires
+            if not fresh and not conditional_headers(response):
+                # No hay forma de validarla, se vuelve a pedir.
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response, fresh
+
+    def set(self, key, response) -> None:
+        with self._lock:
+            self._entries[key] = [time.monotonic() + self.ttl, response]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def renew(self, key) -> None:
+        """
+        La respuesta no cambió (304): vuelve a estar vigente ttl segundos.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries[key][0] = time.monotonic() + self.ttl
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -4,7 +4,9 @@ from typing import List
 import src.config as config
 from src.client import ExtendedBankingClient, PrometeoClient
 from src.exceptions import MissingAPIKey
-from src.plugins import BasePlugin
+from src.hooks import hooks
+from src.plugins import BasePlugin, PluginInfo, discover_plugins, load_plugin
+from src.startup import profile
 from src.utils import Utils
 
 
@@ -13,12 +15,20 @@ class CLI:
     CLI main interface.
     """
 
-    def __init__(self, out, api_key: str = ''):
+    def __init__(self, out, api_key: str = '', environment: str = config.DEFAULT_ENVIRONMENT, client_options: dict = None, stats: bool = False, profiler=None):
         self.api_key = api_key
-        self.environment = config.DEFAULT_ENVIRONMENT
+        self.environment = environment
+        # Argumentos extra para PrometeoClient (pool_size, timeout, etc).
+        self.client_options = client_options or {}
+        self.stats = stats
+        # PluginProfiler activo (ver --profile y toggle_profiler).
+        self.profiler = profiler
         self.env_list = [
             key for key in ExtendedBankingClient.ENVIRONMENTS.keys()]
+        # Plugins disponibles (PluginInfo) y los ya cargados (por nombre).
+        # Cada plugin se importa recién cuando se elige en el menú.
         self.plugins = []
+        self.loaded_plugins = {}
 
         self.out = out
         self.client = None
@@ -70,23 +80,31 @@ class CLI:
 
         return api_key
 
-    def get_plugins(self) -> List[BasePlugin]:
+    def get_plugins(self) -> List[PluginInfo]:
         """
-        Get list of plugins.
+        Get list of plugins (without importing them).
         """
         plugins = []
-        for plugin in BasePlugin.plugin_list:
-            try:
-                instance = plugin(self.client, self.out)
-                self.out.success(f'<{plugin.plugin_name}> loaded.')
-            except Exception:
-                self.out.warning(
-                    f'Could not import <{plugin.plugin_name}> plugin.')
-            else:
-                plugins.append(instance)
+        for info in discover_plugins():
+            plugins.append(info)
+            self.out.success(f'<{info.name}> found.')
 
         return plugins
 
+    def load_plugin(self, info: PluginInfo) -> BasePlugin:
+        """
+        Importar e instanciar (una sola vez) el plugin.
+        Devuelve None si no se pudo cargar.
+        """
+        if info.name not in self.loaded_plugins:
+            try:
+                self.loaded_plugins[info.name] = load_plugin(
+                    info)(self.client, self.out)
+            except Exception:
+                self.out.warning(f'Could not import <{info.name}> plugin.')
+                return None
+        return self.loaded_plugins[info.name]
+
     def set_env(self) -> None:
         """
         Change Prometeo environment.
@@ -104,6 +122,24 @@ class CLI:
 
         self.environment = self.client.environment = self.env_list[option-1]
 
+    def show_stats(self) -> None:
+        stats = self.client.connection_stats()
+        self.out.info(
+            f'Connections: {stats.requests} requests, {stats.connections} opened, {stats.reused} reused.')
+
+    def toggle_profiler(self) -> None:
+        if self.profiler is None:
+            # Se importa acá porque solo se usa al perfilar.
+            from src.profiling import PluginProfiler
+            self.profiler = PluginProfiler()
+            hooks.add(self.profiler)
+            self.out.info(
+                f'Profiling enabled. Each plugin run is saved in {self.profiler.directory}.')
+        else:
+            hooks.remove(self.profiler)
+            self.profiler = None
+            self.out.info('Profiling disabled.')
+
     def menu(self):
         # Mostrar banner (antes limpia la pantalla).
         self.banner()
@@ -114,6 +150,10 @@ Options:
     => 'd' to get a description of all the plugins available.
     => 'c' to change the current environment.
     => 'k' to change your api_key.
+    => 's' to show connection stats.
+    => 't' to toggle compact tables.
+    => 'p' to toggle the pager for long lists.
+    => 'f' to toggle profiling of plugin runs.
     => 'quit' to exit.
         ''')
 
@@ -142,10 +182,10 @@ Options:
 
         # Mostrar plugins.
         for index, plugin in enumerate(self.plugins):
-            self.out.yellow(f' >> {[index + 1]} {plugin.plugin_name}')
+            self.out.yellow(f' >> {[index + 1]} {plugin.name}')
 
         if len(self.plugins) == 0:
-            self.out.yellow('0 plugins loaded')
+            self.out.yellow('0 plugins found')
 
         print('')
 
@@ -156,27 +196,51 @@ Options:
         # Terminar ejecución.
         if choice in ('exit', 'quit', 'e', 'q'):
             self.out.info('Closing plugins...')
-            for plugin in self.plugins:
+            for plugin in self.loaded_plugins.values():
                 try:
-                    plugin.close()
+                    with hooks.around('plugin.close', plugin=plugin.plugin_name):
+                        plugin.close()
                     self.out.success(
                         f'<{plugin.plugin_name}> closed successfully.')
                 except Exception:
                     self.out.warning(
                         f'<{plugin.plugin_name}> did not close properly.')
 
+            if self.stats:
+                self.show_stats()
+
             print('\nSee you! :)\n')
             exit(0)
 
         # Mostrar descripciones para los plugins cargados.
         elif choice == 'd':
             for plugin in self.plugins:
-                print(f'{plugin.plugin_name}: {plugin.plugin_description}\n')
+                print(f'{plugin.name}: {plugin.description}\n')
 
         # Cambiar de environment
         elif choice == 'c':
             self.set_env()
 
+        # Estadísticas de conexiones.
+        elif choice == 's':
+            self.show_stats()
+
+        # Mostrar las listas como tablas (o no).
+        elif choice == 't':
+            self.out.compact = not self.out.compact
+            self.out.info(
+                f'Compact tables {"enabled" if self.out.compact else "disabled"}.')
+
+        # Mostrar las listas de a una página (o no).
+        elif choice == 'p':
+            self.out.paged = not self.out.paged
+            self.out.info(
+                f'Pager {"enabled" if self.out.paged else "disabled"}.')
+
+        # Perfilar los plugins (o no).
+        elif choice == 'f':
+            self.toggle_profiler()
+
         # Cambiar api key.
         elif choice == 'k':
             self.api_key = self.client.api_key = self.get_api_key(
@@ -199,8 +263,11 @@ Options:
             # Los plugins manipulan el objeto client (sí, suena feo).
             # Le agregar o modifican datos.
             # Esto se deja fuera del try para evitar
-            # tomar los IndexError y ValueError de los plugins.
-            self.plugins[index].run()
+            # tomar los IndexError y ValueError de los plugins.
+            plugin = self.load_plugin(self.plugins[index])
+            if plugin is not None:
+                with hooks.around('plugin.run', plugin=plugin.plugin_name):
+                    plugin.run()
 
     def run(self):
         # Pedir api_key al usuario
@@ -209,15 +276,21 @@ Options:
         if not self.api_key:
             # (si no se agregó -k)
             self.api_key = self.get_api_key()
-        self.client = PrometeoClient(self.api_key, self.environment)
+        with profile.phase('client'):
+            self.client = PrometeoClient(
+                self.api_key, self.environment, **self.client_options)
         self.out.success(f'Created API client with {self.environment} scope.')
+        if self.client.restore_session():
+            self.out.success(
+                f'Restored previous session ({self.client.provider}).')
 
         # Obtener plugins.
-        self.out.info('Loading plugins...')
+        self.out.info('Looking for plugins...')
         self.plugins = self.get_plugins()
 
         while True:
             # Pausar para que el usuario vea los resultados
             # antes de limpiar la pantalla de la consola.
-            input('\nPress enter to continue...')
+            with hooks.around('prompt'):
+                input('\nPress enter to continue...')
             self.menu()
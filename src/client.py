@@ -1,21 +1,129 @@
-from typing import List
+import datetime
+import itertools
+import time
+from typing import Callable, List
+from urllib.parse import urljoin
 
 from prometeo.banking.client import BankingAPIClient
-from prometeo.banking.models import Account, Movement
+from prometeo.banking.models import Account, Movement, Provider
+from prometeo.exceptions import InvalidSessionKeyError, PrometeoError
+from requests.exceptions import ConnectionError as RequestsConnError
+from requests.exceptions import Timeout as RequestsTimeout
 
-from src.config import LOGGED_IN_STATUS, LOGGED_OUT_STATUS
-
-SANDBOX_URL = 'https://banking.sandbox.prometeoapi.com/'
-TESTING_URL = 'https://test.prometeo.qualia.uy'
-PRODUCTION_URL = 'https://prometeo.qualia.uy'
+from src.cache import ProviderCache, ResponseCache, conditional_headers
+from src.concurrency import Result, Throttle, map_concurrently
+from src.config import (ENVIRONMENTS, HTTP_CONNECT_TIMEOUT,
+                        HTTP_POOL_SIZE, HTTP_READ_TIMEOUT, LOGGED_IN_STATUS,
+                        LOGGED_OUT_STATUS, MAX_WORKERS, MOVEMENT_WINDOW_DAYS,
+                        RATE_LIMITS, RESPONSE_CACHE_TTL)
+from src.hooks import hooks
+from src.metrics import Metrics, endpoint_name
+from src.movements import MovementList, merge_windows
+from src.retry import IDEMPOTENT_METHODS, RetryPolicy, retry_reason
+from src.search import ProviderIndex
+from src.sessions import SessionPool
+from src.transport import ConnectionStats, PooledSession
 
 
 class ExtendedBankingClient(BankingAPIClient):
-    ENVIRONMENTS = {
-        'sandbox': SANDBOX_URL,
-        'testing': TESTING_URL,
-        'production': PRODUCTION_URL
-    }
+    ENVIRONMENTS = ENVIRONMENTS
+
+    # Reintentos de los requests idempotentes (None para no reintentar).
+    retry_policy = None
+    # Límite de requests por segundo y en curso (None para no limitar).
+    throttle = None
+    # Devolver los movimientos en una MovementList en lugar de una lista.
+    compact_movements = False
+    # Métricas de los requests (None para no registrarlas).
+    metrics = None
+    # Cache de respuestas (None para no usarlo).
+    response_cache = None
+
+    def call_api(self, method, url, *args, **kwargs):
+        with hooks.around('api.call', method=method, endpoint=endpoint_name(url)):
+            try:
+                if self.metrics is None:
+                    return super().call_api(method, url, *args, **kwargs)
+                with self.metrics.measure(method, url):
+                    return super().call_api(method, url, *args, **kwargs)
+            except Exception:
+                # Un 200 con un error de Prometeo (ej: 'Invalid key') no debe quedar en cache.
+                cache_key = self._cache_key(method, url, kwargs)
+                if cache_key is not None:
+                    self.response_cache.discard(cache_key)
+                raise
+
+    def _cache_key(self, method, url, kwargs):
+        if self.response_cache is None:
+            return None
+        return self.response_cache.key(self._environment, method, url, kwargs.get('params'))
+
+    def make_request(self, method, url, *args, **kwargs):
+        """
+        Se sobreescribe para limitar los requests (throttle) y reintentar
+        los GET que fallan por errores transitorios (5xx, 429, conexión
+        cortada, etc). Cada reintento pasa de nuevo por el throttle.
+        Las respuestas vigentes en response_cache se devuelven sin
+        hacer el request (las vencidas se validan, ver ResponseCache).
+        """
+        cache_key = self._cache_key(method, url, kwargs)
+        cached = self.response_cache.get(cache_key) if cache_key is not None else None
+        headers = {}
+        if cached is not None:
+            response, fresh = cached
+            if fresh:
+                hooks.notify('cache.hit', method=method, endpoint=endpoint_name(url))
+                if self.metrics is not None:
+                    self.metrics.record_cache_hit(method, url)
+                return response
+            headers = conditional_headers(response)
+
+        attempts = itertools.count(1)
+
+        def send():
+            with hooks.around('http.request', method=method, endpoint=endpoint_name(url),
+                              attempt=next(attempts)) as info:
+                start = time.perf_counter()
+                response = self._send(method, url, headers, *args, **kwargs)
+                info['status'] = response.status_code
+                if self.metrics is not None:
+                    self.metrics.record_response(method, url, response, time.perf_counter() - start)
+                return response
+
+        def request():
+            if self.throttle is None:
+                return send()
+            with self.throttle:
+                return send()
+
+        def on_retry(attempt, delay, reason):
+            hooks.notify('retry', method=method, endpoint=endpoint_name(url),
+                         attempt=attempt, delay=delay, reason=retry_reason(reason))
+            if self.metrics is not None:
+                self.metrics.record_retry(method, url, reason)
+
+        if self.retry_policy is None or method.upper() not in IDEMPOTENT_METHODS:
+            response = request()
+        else:
+            response = self.retry_policy.call(request, on_retry)
+
+        if cache_key is not None:
+            if response.status_code == 304 and cached is not None:
+                self.response_cache.renew(cache_key)
+                return cached[0]
+            if response.status_code == 200:
+                self.response_cache.set(cache_key, response)
+        return response
+
+    def _send(self, method, url, headers: dict, *args, **kwargs):
+        """
+        BaseClient.make_request, con headers extra (ej: If-None-Match).
+        """
+        if not headers:
+            return super().make_request(method, url, *args, **kwargs)
+        return self._client_session.request(
+            method, urljoin(self.ENVIRONMENTS[self._environment], url),
+            *args, headers={'X-API-Key': self._api_key, **headers}, **kwargs)
 
     def get_provider_detail(self, provider_code):
         """
@@ -25,6 +133,33 @@ class ExtendedBankingClient(BankingAPIClient):
         data = self.call_api('GET', '/provider/{}/'.format(provider_code))
         return data
 
+    def get_movements(self, session_key, account_number, currency_code, date_start, date_end):
+        if not self.compact_movements:
+            return super().get_movements(
+                session_key, account_number, currency_code, date_start, date_end)
+
+        data = self.call_api('GET', '/movement/', params={
+            'key': session_key,
+            'account': account_number,
+            'currency': currency_code,
+            'date_start': date_start.strftime('%d/%m/%Y'),
+            'date_end': date_end.strftime('%d/%m/%Y'),
+        })
+        return MovementList.from_data(data['movements'])
+
+    def get_credit_card_movements(self, session_key, card_number, currency_code, date_start, date_end):
+        if not self.compact_movements:
+            return super().get_credit_card_movements(
+                session_key, card_number, currency_code, date_start, date_end)
+
+        data = self.call_api('GET', '/credit-card/{}/movements'.format(card_number), params={
+            'key': session_key,
+            'currency': currency_code,
+            'date_start': date_start.strftime('%d/%m/%Y'),
+            'date_end': date_end.strftime('%d/%m/%Y'),
+        })
+        return MovementList.from_data(data['movements'])
+
 
 class PrometeoClient:
     """
@@ -32,20 +167,76 @@ class PrometeoClient:
     todo lo demás de la clase prometeo.Client se omite.
 
     Acerca del uso de properties:
-    La idea es que cada vez que se modifica la API key
-    o el environment, se cierre la sesión y se cambien
-    los campos correspondientes en cliente de banking.
+    La idea es que cada vez que se modifica la API key se cierren
+    las sesiones y se cambien los campos correspondientes en los
+    clientes de banking. Al cambiar el environment se deja de usar
+    la sesión actual, pero queda abierta en el pool de sesiones.
+
+    Acerca de las sesiones:
+    Las sesiones se guardan en un SessionPool (self.sessions), así que
+    hacer login con credenciales que ya tienen una sesión abierta no
+    hace ningún request. La sesión del último login es la "actual";
+    los métodos que reciben session_key permiten usar otra del pool.
+    Si Prometeo dice que la session key venció, se vuelve a hacer
+    login y se repite el request.
     """
 
-    def __init__(self, api_key: str, environment: str):
-        # Usados en los plugins:
+    def __init__(self, api_key: str, environment: str, pool_size: int = HTTP_POOL_SIZE, timeout: tuple = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), retry_policy: RetryPolicy = None, rate_limit: dict = None, use_async: bool = False, remember_session: bool = False, compact_movements: bool = False, metrics: Metrics = None, cache_ttl: float = RESPONSE_CACHE_TTL):
+        # Usados en los plugins:
         self._api_key = api_key
         self._environment = environment
         self.status = LOGGED_OUT_STATUS
+        # Provider de la sesión actual.
+        self.provider = None
+
+        # Los intervalos de más de window_days días se piden
+        # en partes, con hasta max_workers requests en paralelo.
+        self.window_days = MOVEMENT_WINDOW_DAYS
+        self.max_workers = MAX_WORKERS
+
+        # Cache en disco de providers (None para desactivarlo).
+        self.provider_cache = ProviderCache()
+        # Cache en memoria de cuentas, tarjetas y movimientos, por
+        # sesión (None para desactivarlo). Se vacía al hacer logout
+        # o cambiar el environment o la API key.
+        self._response_cache = ResponseCache(cache_ttl) if cache_ttl > 0 else None
+        # Índice para buscar providers, por environment (ver get_provider_index).
+        self._provider_indexes = {}
+
+        # Los plugins que lo soportan hacen los requests en paralelo
+        # con asyncio (ver get_async_client) en lugar de threads.
+        self.use_async = use_async
 
-        # Se manejan internamente:
-        self._banking = self._get_banking_client()
-        self._session = None
+        # Los movimientos se devuelven en una MovementList (ver
+        # src/movements.py), que usa mucha menos memoria que una lista.
+        self.compact_movements = compact_movements
+
+        # Llamadas, latencia, errores, reintentos y bytes de los
+        # requests, por endpoint (ver src/metrics.py).
+        self.metrics = metrics if metrics is not None else Metrics()
+
+        # Se manejan internamente:
+        # Sesión HTTP (pool de conexiones keep-alive) compartida
+        # por todos los requests, para no abrir una conexión por request.
+        self._http = PooledSession(pool_size, timeout)
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # Límites de requests que reemplazan a los de RATE_LIMITS
+        # (por ejemplo {'rate': 2}), para cualquier environment.
+        self.rate_limit = rate_limit or {}
+        # Un cliente de banking por environment (cada uno con su Throttle),
+        # para poder cerrar sesiones de otros environments.
+        self._bankings = {}
+        self.sessions = SessionPool(self._get_banking)
+        self._session_key = None
+        # Guardar la sesión actual (encriptada) para la próxima
+        # ejecución, ver restore_session. Requiere cryptography.
+        self.session_cache = None
+        if remember_session:
+            # Se importa acá porque cryptography es opcional.
+            from src.session_cache import SessionCache
+            self.session_cache = SessionCache(api_key)
 
     @property
     def environment(self):
@@ -53,9 +244,9 @@ class PrometeoClient:
 
     @environment.setter
     def environment(self, env):
-        self.logout()
+        self._select_session(None)
+        self._clear_response_cache()
         self._environment = env
-        self._banking._environment = env
 
     @property
     def api_key(self):
@@ -63,19 +254,118 @@ class PrometeoClient:
 
     @api_key.setter
     def api_key(self, api_key):
-        self.logout()
+        # Las sesiones son de la API key anterior.
+        self._select_session(None)
+        self.sessions.close_all()
+        self._clear_response_cache()
         self._api_key = api_key
-        self._banking._api_key = api_key
+        for banking in self._bankings.values():
+            banking._api_key = api_key
+        if self.session_cache is not None:
+            self.session_cache.api_key = api_key
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        return self._response_cache
+
+    @response_cache.setter
+    def response_cache(self, cache: ResponseCache):
+        self._response_cache = cache
+        for banking in self._bankings.values():
+            banking.response_cache = cache
+
+    def _clear_response_cache(self) -> None:
+        if self._response_cache is not None:
+            self._response_cache.clear()
+
+    @property
+    def _banking(self) -> ExtendedBankingClient:
+        return self._get_banking(self.environment)
+
+    @property
+    def throttle(self) -> Throttle:
+        """
+        Límite de requests del environment actual.
+        """
+        return self._banking.throttle
 
-    def _get_banking_client(self) -> ExtendedBankingClient:
+    def _get_throttle(self, environment: str) -> Throttle:
+        return Throttle(**{**RATE_LIMITS.get(environment, {}), **self.rate_limit})
+
+    def _get_banking(self, environment: str) -> ExtendedBankingClient:
+        if environment not in self._bankings:
+            self._bankings[environment] = self._get_banking_client(environment)
+        return self._bankings[environment]
+
+    def _get_banking_client(self, environment: str) -> ExtendedBankingClient:
         banking = ExtendedBankingClient(
-            self.api_key, self.environment
+            self.api_key, environment
         )
+        # BankingAPIClient crea su propia requests.Session,
+        # se reemplaza por la compartida.
+        banking._client_session = self._http
+        banking.retry_policy = self.retry_policy
+        banking.throttle = self._get_throttle(environment)
+        banking.compact_movements = self.compact_movements
+        banking.metrics = self.metrics
+        banking.response_cache = self.response_cache
         return banking
 
+    def _select_session(self, session_key: str, provider: str = None) -> None:
+        """
+        Cambiar la sesión actual (None para ninguna).
+        """
+        self._session_key = session_key
+        self.provider = provider
+        if session_key is None:
+            self.status = LOGGED_OUT_STATUS
+
     def login(self, provider, username, password, **kwargs) -> None:
-        self._session = self._banking.login(
-            provider, username, password, **kwargs)
+        """
+        Usar la sesión de esas credenciales, haciendo login
+        solo si no hay una abierta en el pool (o guardada, si
+        session_cache está activo).
+        """
+        if self.status != LOGGED_IN_STATUS:
+            self.restore_session(provider, username)
+
+        session_key = self.sessions.acquire(
+            self.environment, provider, username, password, **kwargs)
+        self._select_session(session_key, provider)
+
+        if self.session_cache is not None:
+            self.session_cache.set(
+                self.environment, provider, username, session_key)
+
+    def restore_session(self, provider: str = None, username: str = None) -> bool:
+        """
+        Usar la sesión guardada en session_cache (si es de ese provider
+        y username, cuando se pasan), si Prometeo dice que sigue vigente.
+        Devuelve True si se restauró.
+        """
+        if self.session_cache is None:
+            return False
+        saved = self.session_cache.get(self.environment)
+        if saved is None:
+            return False
+        if provider is not None and (saved['provider'], saved['username']) != (provider, username):
+            return False
+
+        # Listar los clientes es el request más liviano que usa la session key.
+        try:
+            self._banking.get_clients(saved['key'])
+        except (RequestsConnError, RequestsTimeout):
+            # No se sabe si sigue vigente: se deja guardada para la próxima.
+            return False
+        except (PrometeoError, KeyError):
+            self.session_cache.clear(self.environment)
+            return False
+
+        self.sessions.adopt(self.environment, saved['provider'],
+                            saved['username'], saved['key'])
+        self._select_session(saved['key'], saved['provider'])
+        self.status = LOGGED_IN_STATUS
+        return True
 
     def logout(self) -> bool:
         """
@@ -84,41 +374,184 @@ class PrometeoClient:
         """
         # No intentar logout si el usuario no hizo login primero.
         if self.status == LOGGED_IN_STATUS:
-            self._banking.logout(self._session.get_session_key())
-            self.status = LOGGED_OUT_STATUS
-            self._session = None
+            self.sessions.release(self._session_key)
+            self._select_session(None)
+            self._clear_response_cache()
+            if self.session_cache is not None:
+                self.session_cache.clear(self.environment)
             return True
 
         return False
 
-    def get_providers(self) -> List[tuple]:
-        return self._banking.get_providers()
+    def close_sessions(self) -> int:
+        """
+        Logout de todas las sesiones del pool, menos la actual si
+        está activo session_cache (para usarla en la próxima ejecución).
+        Devuelve la cantidad de sesiones cerradas.
+        """
+        keep = self._session_key if self.session_cache is not None else None
+        self._select_session(None)
+        self._clear_response_cache()
+        return self.sessions.close_all(keep=keep)
+
+    def _call_with_session(self, func: Callable, session_key: str = None, *args):
+        """
+        func(session_key, *args) con la sesión pedida (o la actual).
+        Si la session key venció, se renueva y se vuelve a intentar.
+        """
+        session_key = session_key or self.get_session_key()
+        try:
+            return func(session_key, *args)
+        except InvalidSessionKeyError:
+            new_key = self.sessions.refresh(session_key)
+            if new_key is None:
+                raise
+            self._session_refreshed(session_key, new_key)
+            return func(new_key, *args)
+
+    def _session_refreshed(self, old_key: str, new_key: str) -> None:
+        """
+        Si la sesión renovada era la actual, se sigue con la nueva key.
+        """
+        if self._session_key == old_key:
+            self._session_key = new_key
+
+    def get_providers(self, refresh: bool = False) -> List[Provider]:
+        """
+        Lista de providers, usando el cache si está activo.
+        refresh: ignorar el cache y volver a pedirla.
+        """
+        if self.provider_cache is None:
+            return self._banking.get_providers()
+
+        providers = self.provider_cache.fetch(
+            self.environment, 'providers',
+            lambda: [provider._asdict()
+                     for provider in self._banking.get_providers()],
+            refresh)
+        return [Provider(**provider) for provider in providers]
+
+    def get_provider_index(self, refresh: bool = False) -> ProviderIndex:
+        """
+        Índice de búsqueda de los providers (ver src/search.py). Se
+        vuelve a armar solo si la lista de providers cambió.
+        """
+        providers = self.get_providers(refresh)
+        index = self._provider_indexes.get(self.environment)
+        if index is None or index.providers != providers:
+            index = self._provider_indexes[self.environment] = ProviderIndex(
+                providers)
+        return index
+
+    def get_provider_detail(self, provider_code, refresh: bool = False) -> dict:
+        if self.provider_cache is None:
+            return self._banking.get_provider_detail(provider_code)
+
+        return self.provider_cache.fetch(
+            self.environment, f'provider/{provider_code}',
+            lambda: self._banking.get_provider_detail(provider_code),
+            refresh)
+
+    def get_provider_details(self, provider_codes) -> List[Result]:
+        """
+        Detalles de varios providers, pedidos en paralelo.
+        Ver concurrency.map_concurrently.
+        """
+        return map_concurrently(
+            self.get_provider_detail, provider_codes, self.max_workers)
+
+    def refresh_providers(self) -> List[Provider]:
+        """
+        Borrar los detalles guardados y volver a pedir la lista.
+        """
+        if self.provider_cache is not None:
+            self.provider_cache.clear(self.environment, 'provider/')
+        return self.get_providers(refresh=True)
 
-    def get_bank_accounts(self) -> List[Account]:
+    def get_bank_accounts(self, session_key: str = None) -> List[Account]:
         """
         'Wrapper' para que el usuario no tenga que pasarle
-        la session key.
+        la session key (por defecto se usa la actual).
         """
-        session_key = self.get_session_key()
-        return self._banking.get_accounts(session_key)
+        return self._call_with_session(self._banking.get_accounts, session_key)
 
-    def get_credit_cards(self) -> List[Account]:
+    def get_credit_cards(self, session_key: str = None) -> List[Account]:
         """
         'Wrapper' para que el usuario no tenga que pasarle
-        la session key.
+        la session key (por defecto se usa la actual).
+        """
+        return self._call_with_session(self._banking.get_credit_cards, session_key)
+
+    def get_movements(self, account_number, currency_code, start, end, session_key: str = None) -> List[Movement]:
+        return self._get_movements_by_window(
+            self._banking.get_movements, session_key, account_number, currency_code, start, end)
+
+    def get_credit_card_movements(self, account_number, currency_code, start, end, session_key: str = None) -> List[Movement]:
+        return self._get_movements_by_window(
+            self._banking.get_credit_card_movements, session_key, account_number, currency_code, start, end)
+
+    def _get_movements_by_window(self, fetch: Callable, session_key, account_number, currency_code, start, end) -> List[Movement]:
         """
-        session_key = self.get_session_key()
-        return self._banking.get_credit_cards(session_key)
+        Pedir el intervalo en ventanas de window_days días en paralelo,
+        para no mandar un solo request gigante a Prometeo.
+        Los movimientos se unen sin repetidos (por id) y ordenados por fecha.
+        """
+        windows = split_interval(start, end, self.window_days)
+        if len(windows) == 1:
+            return self._call_with_session(
+                fetch, session_key, account_number, currency_code, start, end)
 
-    def get_movements(self, account_number, currency_code, start, end) -> List[Movement]:
-        session_key = self.get_session_key()
-        return self._banking.get_movements(session_key, account_number, currency_code, start, end)
+        results = map_concurrently(
+            lambda window: self._call_with_session(
+                fetch, session_key, account_number, currency_code, *window),
+            windows, self.max_workers)
 
-    def get_credit_card_movements(self, account_number, currency_code, start, end) -> List[Movement]:
-        session_key = self.get_session_key()
-        return self._banking.get_credit_card_movements(session_key, account_number, currency_code, start, end)
+        return merge_windows(results)
+
+    def get_async_client(self):
+        """
+        AsyncPrometeoClient con la misma configuración y sesión
+        que este cliente (requiere httpx). Se debe usar dentro de
+        un event loop y cerrar con aclose (o async with).
+        """
+        # Se importa acá porque httpx es opcional.
+        from src.async_client import AsyncPrometeoClient
+
+        client = AsyncPrometeoClient(
+            self.api_key, self.environment, self._pool_size, self._timeout,
+            self.retry_policy, self.rate_limit, self.get_session_key(), self.provider)
+        client.window_days = self.window_days
+        client.provider_cache = self.provider_cache
+        client.compact_movements = self.compact_movements
+        client.metrics = self.metrics
+        client.response_cache = self.response_cache
+        client.sessions = self.sessions
+        client.on_session_refresh = self._session_refreshed
+        return client
+
+    def connection_stats(self) -> ConnectionStats:
+        """
+        Requests enviados, conexiones abiertas y requests que reusaron una conexión.
+        """
+        return self._http.connection_stats()
 
     def get_session_key(self) -> str:
-        if self._session:
-            return self._session._session_key
-        return None
+        return self._session_key
+
+
+def split_interval(start, end, days: int) -> List[tuple]:
+    """
+    Dividir [start, end] (ambas fechas incluidas) en ventanas
+    consecutivas de a lo sumo days días.
+    """
+    if not days or days < 1:
+        return [(start, end)]
+
+    windows = []
+    window_start = start
+    while window_start <= end:
+        window_end = min(window_start + datetime.timedelta(days=days - 1), end)
+        windows.append((window_start, window_end))
+        window_start = window_end + datetime.timedelta(days=1)
+
+    return windows
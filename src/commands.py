@@ -0,0 +1,142 @@
+"""
+Parser de los comandos del modo batch (ver src/batch.py).
+
+Está separado de src/batch.py para que main.py pueda armar el parser
+(y mostrar --help) sin importar el cliente de Prometeo.
+"""
+import argparse
+import datetime
+
+import src.config as config
+import src.export as export
+
+# Se toman de estas variables de entorno si no se pasan como argumento.
+API_KEY_ENV = 'PROMETEO_API_KEY'
+PROVIDER_ENV = 'PROMETEO_PROVIDER'
+USERNAME_ENV = 'PROMETEO_USERNAME'
+PASSWORD_ENV = 'PROMETEO_PASSWORD'
+
+
+def _date(string: str) -> datetime.datetime:
+    try:
+        return datetime.datetime.strptime(string, '%d/%m/%Y')
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'invalid date: {string} (expected dd/mm/yyyy)')
+
+
+def add_batch_commands(subparsers, script: bool = True) -> None:
+    """
+    Agregar los comandos del modo batch a un objeto de subparsers.
+    Se usa desde main.py y para parsear cada línea de un script.
+    """
+    # Argumentos de sesión, para los comandos que requieren login.
+    session = argparse.ArgumentParser(add_help=False)
+    session_args = session.add_argument_group(title='Session arguments')
+    session_args.add_argument(
+        '--provider', help=f'Provider code (or {PROVIDER_ENV}).', dest='provider')
+    session_args.add_argument(
+        '--username', help=f'Username (or {USERNAME_ENV}).', dest='username')
+    session_args.add_argument(
+        '--password', help=f'Password (or {PASSWORD_ENV}). NOT RECOMMENDED: use the environment variable instead.', dest='password')
+
+    # Formato de salida, para los comandos que devuelven filas.
+    output = argparse.ArgumentParser(add_help=False)
+    output_args = output.add_argument_group(title='Output arguments')
+    output_args.add_argument(
+        '-f', '--format', help=f'Output format (default: {export.DEFAULT_FORMAT}). Parquet requires pyarrow.', choices=export.FORMATS, default=export.DEFAULT_FORMAT)
+    output_args.add_argument(
+        '-o', '--output', help='Write to this file instead of stdout.')
+
+    # accounts / cards.
+    accounts = subparsers.add_parser(
+        'accounts', parents=[session, output], help='List bank accounts.')
+    accounts.add_argument('action', choices=['list'])
+    accounts.set_defaults(handler='list_accounts')
+
+    cards = subparsers.add_parser(
+        'cards', parents=[session, output], help='List credit cards.')
+    cards.add_argument('action', choices=['list'])
+    cards.set_defaults(handler='list_cards')
+
+    # Qué movimientos pedir, para movements y analytics.
+    source = argparse.ArgumentParser(add_help=False)
+    source_args = source.add_argument_group(title='Movement arguments')
+    source_args.add_argument(
+        '-a', '--account', help='Account or credit card number.')
+    source_args.add_argument(
+        '-c', '--currency', help='Currency code (e.g. UYU, USD).', type=str.upper)
+    source_args.add_argument(
+        '--from', help='Start date (dd/mm/yyyy).', type=_date, dest='start_date')
+    source_args.add_argument(
+        '--to', help='End date (dd/mm/yyyy).', type=_date, dest='end_date')
+    source_args.add_argument(
+        '--card', help='The account is a credit card.', action='store_true')
+    source_args.add_argument(
+        '--all', help='Get movements of every account and credit card (in parallel).', action='store_true')
+    source_args.add_argument(
+        '--window', help=f'Split the interval in windows of this many days, requested in parallel, 0 to disable (default: {config.MOVEMENT_WINDOW_DAYS}).', type=int, default=config.MOVEMENT_WINDOW_DAYS)
+    source_args.add_argument(
+        '--workers', help=f'Max parallel requests for --all (default: {config.MAX_WORKERS}).', type=int, default=config.MAX_WORKERS)
+    source_args.add_argument(
+        '--from-store', help='Read the movements from the local store (see sync) instead of Prometeo.', action='store_true')
+    source_args.add_argument(
+        '--store', help=f'SQLite file for --from-store (default: {config.MOVEMENT_STORE_PATH}).', default=config.MOVEMENT_STORE_PATH)
+
+    # movements.
+    movements = subparsers.add_parser(
+        'movements', parents=[session, source, output], help='Get bank account or credit card movements.')
+    movements.set_defaults(handler='movements')
+
+    # analytics.
+    analytics = subparsers.add_parser(
+        'analytics', parents=[session, source, output], help='Summarize movements (totals, daily and monthly sums, balances, counterparties).')
+    analytics.add_argument(
+        'report', choices=['totals', 'daily', 'monthly', 'balance', 'counterparties'])
+    analytics.add_argument(
+        '--top', help=f'Counterparties per currency (default: {config.ANALYTICS_TOP}).', type=int, default=config.ANALYTICS_TOP)
+    analytics.set_defaults(handler='analytics')
+
+    # sync.
+    sync = subparsers.add_parser(
+        'sync', parents=[session, output], help='Download only new movements to the local store.')
+    sync.add_argument(
+        '-a', '--account', help='Account or credit card number (default: all of them).')
+    sync.add_argument(
+        '-c', '--currency', help='Currency code (required with --account).', type=str.upper)
+    sync.add_argument(
+        '--card', help='The account is a credit card.', action='store_true')
+    sync.add_argument(
+        '--to', help='Sync up to this date (dd/mm/yyyy, default: today).', type=_date, dest='end_date')
+    sync.add_argument(
+        '--store', help=f'SQLite file (default: {config.MOVEMENT_STORE_PATH}).', default=config.MOVEMENT_STORE_PATH)
+    sync.add_argument(
+        '--workers', help=f'Max parallel requests (default: {config.MAX_WORKERS}).', type=int, default=config.MAX_WORKERS)
+    sync.set_defaults(handler='sync')
+
+    # providers.
+    providers = subparsers.add_parser('providers', help='Provider information.')
+    providers_actions = providers.add_subparsers(
+        title='Actions', dest='action', required=True)
+    providers_actions.add_parser(
+        'list', parents=[output], help='List all providers.').set_defaults(handler='list_providers')
+    search = providers_actions.add_parser(
+        'search', parents=[output], help='Search providers.')
+    search.add_argument('pattern')
+    search.set_defaults(handler='search_providers')
+    detail = providers_actions.add_parser(
+        'detail', parents=[output], help='Show provider details.')
+    detail.add_argument('codes', nargs='+', metavar='code')
+    detail.set_defaults(handler='provider_detail')
+    providers_actions.add_parser(
+        'refresh', help='Update the cached provider list.').set_defaults(handler='refresh_providers')
+
+    # script.
+    if script:
+        script_parser = subparsers.add_parser(
+            'script', help='Run batch commands from a file (one per line) or stdin.')
+        script_parser.add_argument(
+            'file', nargs='?', default='-', help="Script file ('-' for stdin).")
+        script_parser.add_argument(
+            '--stop-on-error', help='Stop at the first failing command.', action='store_true')
+        script_parser.set_defaults(handler='script')
@@ -0,0 +1,155 @@
+"""
+Utilidades para hacer requests en paralelo sin sobrecargar a Prometeo.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List
+
+# Resultado de cada tarea: si falló, value es None y error la excepción.
+Result = namedtuple('Result', ['item', 'value', 'error'])
+
+
+class TokenBucket:
+    """
+    Token bucket: se pueden hacer hasta burst llamadas de golpe y
+    después rate llamadas por segundo. Puede compartirse entre threads.
+    """
+
+    def __init__(self, rate: float = None, burst: int = None):
+        # rate en llamadas por segundo (None o 0 para no limitar).
+        self.rate = rate or 0
+        self.capacity = max(1, burst or 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Reservar un token. Devuelve los segundos a esperar antes de usarlo.
+        """
+        if not self.rate:
+            return 0
+
+        # Los tokens pueden quedar negativos: es la "deuda"
+        # de los que están esperando.
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0
+
+    def acquire(self) -> None:
+        """
+        Bloquear hasta que haya un token disponible.
+        El token se reserva con el lock tomado, pero se duerme fuera de él.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Throttle:
+    """
+    Limita los requests con un TokenBucket y, además, la cantidad
+    de requests en curso a la vez (max_in_flight, None para no limitar).
+    Se usa como context manager alrededor de cada request:
+
+        with throttle:
+            response = session.get(...)
+    """
+
+    def __init__(self, rate: float = None, burst: int = None, max_in_flight: int = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(
+            max_in_flight) if max_in_flight else None
+
+    def __enter__(self):
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            self.bucket.acquire()
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+        return self
+
+    def __exit__(self, *args):
+        if self._slots is not None:
+            self._slots.release()
+
+
+class AsyncThrottle:
+    """
+    Igual que Throttle, para requests async (async with throttle).
+    Solo debe usarse desde un event loop.
+    """
+
+    def __init__(self, rate: float = None, burst: int = None, max_in_flight: int = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max_in_flight
+        self._slots = asyncio.Semaphore(
+            max_in_flight) if max_in_flight else None
+
+    async def __aenter__(self):
+        if self._slots is not None:
+            await self._slots.acquire()
+        try:
+            delay = self.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+        return self
+
+    async def __aexit__(self, *args):
+        if self._slots is not None:
+            self._slots.release()
+
+
+def map_concurrently(func: Callable, items: Iterable, max_workers: int) -> List[Result]:
+    """
+    Ejecutar func(item) para cada item usando como máximo max_workers threads.
+    Los resultados se devuelven en el mismo orden que items. Las excepciones
+    no se propagan, quedan en Result.error.
+    El límite de requests por segundo lo aplica PrometeoClient (ver Throttle).
+    """
+    def task(item):
+        try:
+            return Result(item, func(item), None)
+        except Exception as e:
+            return Result(item, None, e)
+
+    items = list(items)
+    if not items:
+        return []
+
+    # Cada thread usa una copia del contexto (contextvars) de quien
+    # llama, así los spans de tracing quedan dentro del span actual.
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        return list(executor.map(lambda context, item: context.run(task, item), contexts, items))
+
+
+async def gather_concurrently(func: Callable, items: Iterable) -> List[Result]:
+    """
+    Versión async de map_concurrently: await func(item) para cada item,
+    todos a la vez en el mismo thread. El límite de requests en curso
+    lo aplica AsyncPrometeoClient.
+    """
+    async def task(item):
+        try:
+            return Result(item, await func(item), None)
+        except Exception as e:
+            return Result(item, None, e)
+
+    return list(await asyncio.gather(*(task(item) for item in items)))
@@ -14,6 +14,13 @@ DEFAULT_INPUT_PREFIX = '--> '
 
 DEFAULT_ENVIRONMENT = 'sandbox'
 
+# URL de la API de banking de cada environment (ver ExtendedBankingClient).
+ENVIRONMENTS = {
+    'sandbox': 'https://banking.sandbox.prometeoapi.com/',
+    'testing': 'https://test.prometeo.qualia.uy',
+    'production': 'https://prometeo.qualia.uy'
+}
+
 PROMETEO_SANDBOX_URL = 'https://test.prometeo.qualia.uy/'
 
 SANDBOX_CREDENTIALS = {
@@ -29,3 +36,92 @@ LOGGED_IN_STATUS = 'logged_in'
 # Esto no viene de Prometeo:
 LOGGED_OUT_STATUS = 'logged_out'
 PROMETEO_ERROR_STATUS = 'prometeo_error'
+
+# Exit codes del modo batch.
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # Igual que argparse.
+EXIT_AUTH_ERROR = 3
+EXIT_CONNECTION_ERROR = 4
+EXIT_NOT_FOUND = 5
+
+# Requests en paralelo (ver src/concurrency.py).
+MAX_WORKERS = 8
+
+# Límite de requests a Prometeo de cada environment (ver Throttle en
+# src/concurrency.py), para no pasarse de lo contratado:
+# rate: requests por segundo, burst: requests que se pueden hacer de golpe,
+# max_in_flight: requests en curso a la vez. None para no limitar.
+RATE_LIMITS = {
+    'sandbox': {'rate': 5, 'burst': 10, 'max_in_flight': 8},
+    'testing': {'rate': 10, 'burst': 20, 'max_in_flight': 8},
+    'production': {'rate': 20, 'burst': 40, 'max_in_flight': 16}
+}
+
+# Los intervalos de movimientos más largos se piden en partes.
+MOVEMENT_WINDOW_DAYS = 30
+
+# Cache de providers (ver src/cache.py). TTL en segundos.
+PROVIDER_CACHE_PATH = join(CLI_ROOT_DIR, '.provider_cache.json')
+PROVIDER_CACHE_TTL = 24 * 60 * 60
+
+# Cache en memoria de las respuestas de los endpoints que solo
+# leen datos (ver ResponseCache en src/cache.py). TTL en segundos,
+# size en cantidad de respuestas.
+RESPONSE_CACHE_TTL = 5 * 60
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_ENDPOINTS = ('/account', '/credit-card', '/client', '/movement',
+                            '/credit-card/{number}/movements')
+
+# Búsqueda de providers (ver src/search.py): parecido mínimo (0 a 1)
+# para las coincidencias aproximadas.
+SEARCH_FUZZY_CUTOFF = 0.75
+
+# Sincronización incremental de movimientos (ver src/store.py).
+MOVEMENT_STORE_PATH = join(CLI_ROOT_DIR, '.movements.db')
+# Días a pedir la primera vez que se sincroniza una cuenta.
+SYNC_INITIAL_DAYS = 90
+# Días antes de la última sincronización que se vuelven a pedir,
+# por movimientos que el banco registra con atraso.
+SYNC_OVERLAP_DAYS = 3
+
+# Contrapartes por moneda en el reporte de analytics (ver src/analytics.py).
+ANALYTICS_TOP = 10
+
+# Metadatos de los plugins, para no leer los archivos
+# que no cambiaron (ver src/plugins/__init__.py).
+PLUGIN_MANIFEST_PATH = join(CLI_ROOT_DIR, '.plugin_manifest.json')
+
+# Sesiones de Prometeo abiertas a la vez (ver src/sessions.py).
+SESSION_POOL_SIZE = 50
+
+# Sesión guardada encriptada para no hacer login en cada ejecución
+# (ver src/session_cache.py). Edad máxima en segundos.
+SESSION_CACHE_PATH = join(CLI_ROOT_DIR, '.session')
+SESSION_CACHE_MAX_AGE = 60 * 60
+SESSION_CACHE_ITERATIONS = 200000
+
+# Salida por consola (ver src/output.py). Tamaño en caracteres.
+OUTPUT_BUFFER_SIZE = 64 * 1024
+# Filas usadas para calcular el ancho de las columnas de una tabla.
+TABLE_SAMPLE_ROWS = 100
+
+# Conexiones HTTP (ver src/transport.py). Timeouts en segundos.
+HTTP_POOL_SIZE = 10
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 120
+
+# Reintentos de requests GET (ver src/retry.py). Esperas en segundos.
+RETRY_ATTEMPTS = 4
+RETRY_BACKOFF = 0.5
+RETRY_MAX_DELAY = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Perfiles de los plugins (ver src/profiling.py): carpeta de los
+# archivos .prof y funciones a mostrar en el resumen.
+PROFILE_DIR = join(CLI_ROOT_DIR, '.profiles')
+PROFILE_TOP = 15
+
+# Límites (en segundos) de los buckets de los histogramas
+# de latencia de los requests (ver src/metrics.py).
+METRICS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
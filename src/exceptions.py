@@ -12,3 +12,8 @@ class UnavailableType(Exception):
 class ValidationError(Exception):
     def __init__(self, message: str = ''):
         self.message = message
+
+
+class MissingDependency(Exception):
+    def __init__(self, message: str = 'Missing optional dependency'):
+        self.message = message
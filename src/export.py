@@ -0,0 +1,175 @@
+"""
+Exportar resultados (movimientos, cuentas, etc) como un stream de filas.
+
+Las filas se consumen de a una desde un iterable (por ejemplo un
+generador), así que la memoria usada no depende de la cantidad de filas.
+"""
+import csv
+import datetime
+import json
+from typing import Iterable, List
+
+from src.exceptions import MissingDependency
+
+FORMATS = ['tsv', 'csv', 'jsonl', 'parquet']
+DEFAULT_FORMAT = 'tsv'
+
+# Campos de cada tipo de fila: (nombre, tipo). El tipo se usa
+# para el schema de Parquet: 'str', 'int', 'float' o 'date'.
+MOVEMENT_FIELDS = [('id', 'str'), ('reference', 'str'), ('date', 'date'),
+                   ('detail', 'str'), ('debit', 'float'), ('credit', 'float')]
+ACCOUNT_FIELDS = [('id', 'str'), ('name', 'str'), ('number', 'str'),
+                  ('branch', 'str'), ('currency', 'str'), ('balance', 'float')]
+CREDIT_CARD_FIELDS = [('id', 'str'), ('name', 'str'), ('number', 'str'),
+                      ('close_date', 'date'), ('due_date', 'date'),
+                      ('balance_local', 'float'), ('balance_dollar', 'float')]
+PROVIDER_FIELDS = [('code', 'str'), ('country', 'str'), ('name', 'str')]
+AUTH_FIELD_FIELDS = [('provider', 'str'), ('country', 'str'), ('name', 'str'),
+                     ('type', 'str'), ('interactive', 'str'), ('optional', 'str')]
+# Para movimientos de varias cuentas.
+ACCOUNT_MOVEMENT_FIELDS = [('account', 'str'),
+                           ('currency', 'str')] + MOVEMENT_FIELDS
+SYNC_FIELDS = [('account', 'str'), ('currency', 'str'), ('start', 'date'),
+               ('end', 'date'), ('fetched', 'int'), ('new', 'int')]
+
+# Filas por row group de Parquet.
+PARQUET_BATCH_SIZE = 10000
+
+
+def movement_row(movement) -> tuple:
+    # Prometeo devuelve '' cuando no hay débito/crédito.
+    return (movement.id, movement.reference, movement.date, movement.detail,
+            movement.debit if movement.debit != '' else None,
+            movement.credit if movement.credit != '' else None)
+
+
+def _to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime.date):
+        return _to_date(value).isoformat()
+    return str(value)
+
+
+# Escapes de TSV (como el COPY de PostgreSQL), para que un tab o un
+# salto de línea en un valor (ej: el detalle) no corra ni corte la fila.
+TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _tsv_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, datetime.date):
+        return value.strftime('%d/%m/%Y')
+    return str(value).translate(TSV_ESCAPES)
+
+
+def write_tsv(rows: Iterable[tuple], fields: List[tuple], stream) -> int:
+    """
+    Una fila por línea, separada por tabs y sin encabezado.
+    Las fechas van en formato dd/mm/yyyy, como en el resto del CLI.
+    Los tabs, saltos de línea y backslashes de los valores se escapan
+    como \\t, \\n, \\r y \\\\.
+    """
+    count = 0
+    write = stream.write
+    for row in rows:
+        write('\t'.join(map(_tsv_value, row)) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[tuple], fields: List[tuple], stream) -> int:
+    """
+    CSV con encabezado. Fechas en formato ISO (yyyy-mm-dd).
+    """
+    writer = csv.writer(stream)
+    writer.writerow([name for name, _ in fields])
+
+    count = 0
+    for row in rows:
+        writer.writerow([_to_date(value) for value in row])
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterable[tuple], fields: List[tuple], stream) -> int:
+    """
+    Un objeto JSON por línea. Fechas en formato ISO (yyyy-mm-dd).
+    """
+    names = [name for name, _ in fields]
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_json_default)
+
+    count = 0
+    write = stream.write
+    for row in rows:
+        write(encoder.encode(dict(zip(names, row))) + '\n')
+        count += 1
+    return count
+
+
+def write_parquet(rows: Iterable[tuple], fields: List[tuple], stream) -> int:
+    """
+    Parquet (requiere pyarrow), escrito en row groups de
+    PARQUET_BATCH_SIZE filas.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise MissingDependency(
+            'pyarrow is required to export to Parquet (pip3 install -r requirements-extras.txt)')
+
+    types = {'str': pa.string(), 'int': pa.int64(),
+             'float': pa.float64(), 'date': pa.date32()}
+    converters = {'str': lambda value: None if value is None else str(value),
+                  'int': lambda value: None if value in (None, '') else int(value),
+                  'float': lambda value: None if value in (None, '') else float(value),
+                  'date': _to_date}
+    schema = pa.schema([(name, types[type]) for name, type in fields])
+    convert = [converters[type] for _, type in fields]
+
+    def write_batch(writer, batch):
+        columns = [[convert[index](row[index]) for row in batch]
+                   for index in range(len(fields))]
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema))
+
+    count = 0
+    with pq.ParquetWriter(stream, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == PARQUET_BATCH_SIZE:
+                write_batch(writer, batch)
+                count += len(batch)
+                batch = []
+        # Siempre se escribe al menos un batch, para que el
+        # archivo tenga el schema aunque no haya filas.
+        if batch or count == 0:
+            write_batch(writer, batch)
+            count += len(batch)
+
+    return count
+
+
+WRITERS = {
+    'tsv': write_tsv,
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'parquet': write_parquet
+}
+
+
+def export(rows: Iterable[tuple], fields: List[tuple], format: str, stream) -> int:
+    """
+    Escribir rows en stream con el formato pedido.
+    Parquet requiere un stream binario, el resto uno de texto.
+    Devuelve la cantidad de filas escritas.
+    """
+    return WRITERS[format](rows, fields, stream)
@@ -0,0 +1,81 @@
+"""
+Hooks antes y después de la ejecución de los plugins y de las llamadas
+del cliente, para observarlas (ej: src/tracing.py) sin modificar el
+código que las hace.
+
+Eventos (y datos que reciben los observers):
+- plugin.run, plugin.close: plugin.
+- command: un comando del modo batch (command).
+- api.call: una llamada a la API, con sus reintentos (method, endpoint).
+- http.request: cada intento de una llamada (method, endpoint, attempt, status).
+- retry: antes de esperar para reintentar (method, endpoint, attempt, delay, reason).
+- cache.hit: una llamada respondida por el cache de respuestas (method, endpoint).
+  retry y cache.hit son instantáneos, se avisan con notify.
+- prompt: esperando que el usuario escriba algo.
+"""
+import contextlib
+import threading
+
+
+class Observer:
+    """
+    Se pueden sobreescribir solo los métodos que se necesiten.
+    Lo que devuelve before lo recibe after, para el mismo evento.
+    """
+
+    def before(self, event: str, info: dict):
+        return None
+
+    def after(self, event: str, state, error: BaseException = None) -> None:
+        pass
+
+    def notify(self, event: str, info: dict) -> None:
+        pass
+
+
+class Hooks:
+
+    def __init__(self):
+        # Tupla para poder recorrerla sin el lock mientras otro thread agrega.
+        self._observers = ()
+        self._lock = threading.Lock()
+
+    def add(self, observer: Observer) -> None:
+        with self._lock:
+            self._observers += (observer,)
+
+    def remove(self, observer: Observer) -> None:
+        with self._lock:
+            self._observers = tuple(
+                other for other in self._observers if other is not observer)
+
+    @contextlib.contextmanager
+    def around(self, event: str, **info):
+        """
+        Avisar a los observers antes y después del bloque del with.
+        El bloque recibe info, para agregar datos que se conocen
+        recién al final (ej: el status de una respuesta).
+        """
+        observers = self._observers
+        if not observers:
+            yield info
+            return
+
+        states = [observer.before(event, info) for observer in observers]
+        error = None
+        try:
+            yield info
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            for observer, state in zip(reversed(observers), reversed(states)):
+                observer.after(event, state, error)
+
+    def notify(self, event: str, **info) -> None:
+        for observer in self._observers:
+            observer.notify(event, info)
+
+
+# Compartido por el CLI, el modo batch, los plugins y los clientes.
+hooks = Hooks()
@@ -0,0 +1,327 @@
+"""
+Métricas de los requests a Prometeo, por endpoint: llamadas, errores,
+latencia, bytes y reintentos (ver --metrics-out y el plugin Metrics).
+"""
+import bisect
+import contextlib
+import datetime
+import json
+import threading
+import time
+
+from src.config import METRICS_BUCKETS
+from src.retry import retry_reason
+
+# Segmentos del path que son ids, para agrupar por endpoint
+# ('/provider/test/' y '/provider/bank/' son el mismo).
+ENDPOINT_IDS = {'provider': '{code}', 'credit-card': '{number}'}
+
+PROMETHEUS_PREFIX = 'prometeo_cli'
+
+
+def endpoint_name(url: str) -> str:
+    """
+    '/credit-card/4111/movements' -> '/credit-card/{number}/movements'.
+    """
+    parts = [part for part in url.split('?')[0].split('/') if part]
+    if len(parts) > 1 and parts[0] in ENDPOINT_IDS:
+        parts[1] = ENDPOINT_IDS[parts[0]]
+    return '/' + '/'.join(parts)
+
+
+def body_size(body) -> int:
+    if body is None:
+        return 0
+    return len(body.encode() if isinstance(body, str) else body)
+
+
+class Histogram:
+    """
+    Cantidad de valores en cada bucket (valor <= límite del bucket,
+    el último es +Inf), como los histogramas de Prometheus.
+    También guarda el mínimo y el máximo, para acotar los cuantiles.
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'min', 'max')
+
+    def __init__(self, buckets: tuple = METRICS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+
+    def copy(self) -> 'Histogram':
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum, histogram.count = self.sum, self.count
+        histogram.min, histogram.max = self.min, self.max
+        return histogram
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimación del cuantil q (entre 0 y 1), interpolando dentro
+        del bucket (igual que histogram_quantile de Prometheus).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                # En +Inf no hay límite, se usa el máximo.
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                value = lower + (upper - lower) * (rank - cumulative) / count
+                return min(max(value, self.min), self.max)
+            cumulative += count
+        return self.max
+
+    def cumulative(self) -> list:
+        """
+        [(límite, cantidad de valores <= límite)], con +Inf al final.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class EndpointMetrics:
+    """
+    calls: llamadas a la API (call_api), cada una con sus reintentos.
+    duration: duración de cada llamada, con las esperas del rate
+    limit y de los reintentos.
+    http_duration: duración de cada request HTTP (intento).
+    errors: excepción con la que terminó cada llamada que falló.
+    statuses: status de las respuestas HTTP.
+    retries: motivo de cada reintento (status o excepción).
+    cache_hits: llamadas respondidas por el cache, sin request HTTP.
+    """
+
+    __slots__ = ('calls', 'cache_hits', 'duration', 'http_duration', 'errors',
+                 'statuses', 'retries', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, buckets: tuple):
+        self.calls = 0
+        self.cache_hits = 0
+        self.duration = Histogram(buckets)
+        self.http_duration = Histogram(buckets)
+        self.errors = {}
+        self.statuses = {}
+        self.retries = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class Metrics:
+    """
+    Registro de métricas compartido por los clientes (es thread-safe).
+    Los clientes llaman a measure (por cada llamada a la API),
+    record_response (por cada respuesta HTTP) y record_retry.
+    """
+
+    def __init__(self, buckets: tuple = METRICS_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = datetime.datetime.now()
+            self._endpoints = {}
+
+    def _get(self, method: str, url: str) -> EndpointMetrics:
+        # Se llama con el lock tomado.
+        key = (method.upper(), endpoint_name(url))
+        if key not in self._endpoints:
+            self._endpoints[key] = EndpointMetrics(self.buckets)
+        return self._endpoints[key]
+
+    @contextlib.contextmanager
+    def measure(self, method: str, url: str):
+        """
+        Medir una llamada a la API (el bloque del with).
+        Si levanta una excepción se cuenta como error.
+        """
+        error = None
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                endpoint = self._get(method, url)
+                endpoint.calls += 1
+                endpoint.duration.observe(seconds)
+                if error is not None:
+                    endpoint.errors[error] = endpoint.errors.get(error, 0) + 1
+
+    def record_response(self, method: str, url: str, response, seconds: float) -> None:
+        """
+        Respuesta HTTP (de requests o httpx) que tardó seconds.
+        """
+        # requests guarda el body enviado en request.body, httpx en request.content.
+        request = response.request
+        sent = body_size(request.body if hasattr(request, 'body') else request.content)
+        received = len(response.content)
+        with self._lock:
+            endpoint = self._get(method, url)
+            endpoint.http_duration.observe(seconds)
+            status = str(response.status_code)
+            endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+            endpoint.bytes_sent += sent
+            endpoint.bytes_received += received
+
+    def record_retry(self, method: str, url: str, reason) -> None:
+        """
+        reason: la respuesta o la excepción por la que se reintenta
+        (como lo recibe on_retry de RetryPolicy.call).
+        """
+        reason = retry_reason(reason)
+        with self._lock:
+            endpoint = self._get(method, url)
+            endpoint.retries[reason] = endpoint.retries.get(reason, 0) + 1
+
+    def record_cache_hit(self, method: str, url: str) -> None:
+        with self._lock:
+            self._get(method, url).cache_hits += 1
+
+    def snapshot(self) -> list:
+        """
+        Una copia de las métricas de cada endpoint:
+        [((método, endpoint), EndpointMetrics)], ordenada por endpoint.
+        """
+        with self._lock:
+            result = []
+            for key in sorted(self._endpoints, key=lambda key: (key[1], key[0])):
+                endpoint = self._endpoints[key]
+                copy = EndpointMetrics(self.buckets)
+                for name in EndpointMetrics.__slots__:
+                    value = getattr(endpoint, name)
+                    if isinstance(value, (Histogram, dict)):
+                        value = value.copy()
+                    setattr(copy, name, value)
+                result.append((key, copy))
+            return result
+
+    def to_dict(self) -> dict:
+        def histogram(value: Histogram) -> dict:
+            return {'count': value.count, 'sum': round(value.sum, 6),
+                    'min': round(value.min, 6), 'max': round(value.max, 6),
+                    'p50': round(value.quantile(0.5), 6),
+                    'p90': round(value.quantile(0.9), 6),
+                    'p99': round(value.quantile(0.99), 6),
+                    'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                                for bound, count in value.cumulative()}}
+
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'endpoints': [{
+                'method': method, 'endpoint': name, 'calls': endpoint.calls,
+                'cache_hits': endpoint.cache_hits,
+                'errors': endpoint.errors, 'statuses': endpoint.statuses,
+                'retries': endpoint.retries, 'bytes_sent': endpoint.bytes_sent,
+                'bytes_received': endpoint.bytes_received,
+                'duration_seconds': histogram(endpoint.duration),
+                'http_duration_seconds': histogram(endpoint.http_duration)}
+                for (method, name), endpoint in self.snapshot()]
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Formato de texto de Prometheus (para node_exporter
+        --collector.textfile o un Pushgateway).
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help: str, samples) -> None:
+            name = f'{PROMETHEUS_PREFIX}_{name}'
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                labels = ','.join(f'{label}="{_escape(str(text))}"' for label, text in labels)
+                lines.append(f'{name}{suffix}{{{labels}}} {_number(value)}')
+
+        def labels(key, **extra) -> list:
+            return [('method', key[0]), ('endpoint', key[1])] + list(extra.items())
+
+        def counter(attribute: str, label: str):
+            for key, endpoint in snapshot:
+                for value, count in sorted(getattr(endpoint, attribute).items()):
+                    yield '', labels(key, **{label: value}), count
+
+        def histogram(attribute: str):
+            for key, endpoint in snapshot:
+                value = getattr(endpoint, attribute)
+                for bound, count in value.cumulative():
+                    yield '_bucket', labels(key, le='+Inf' if bound == float('inf') else bound), count
+                yield '_sum', labels(key), value.sum
+                yield '_count', labels(key), value.count
+
+        metric('calls_total', 'counter', 'Calls to the Prometeo API, retries included in each call.',
+               (('', labels(key), endpoint.calls) for key, endpoint in snapshot))
+        metric('cache_hits_total', 'counter', 'Calls answered from the response cache, without an HTTP request.',
+               (('', labels(key), endpoint.cache_hits) for key, endpoint in snapshot))
+        metric('call_errors_total', 'counter', 'Calls that failed, by exception class.',
+               counter('errors', 'error'))
+        metric('call_duration_seconds', 'histogram',
+               'Duration of each call, including rate limit and retry waits.', histogram('duration'))
+        metric('http_responses_total', 'counter', 'HTTP responses by status code.',
+               counter('statuses', 'status'))
+        metric('http_request_duration_seconds', 'histogram',
+               'Duration of each HTTP request (one per attempt).', histogram('http_duration'))
+        metric('retries_total', 'counter', 'Retried requests, by status code or exception class.',
+               counter('retries', 'reason'))
+        metric('request_bytes_total', 'counter', 'Request body bytes sent.',
+               (('', labels(key), endpoint.bytes_sent) for key, endpoint in snapshot))
+        metric('response_bytes_total', 'counter', 'Response body bytes received.',
+               (('', labels(key), endpoint.bytes_received) for key, endpoint in snapshot))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str, format: str = None) -> None:
+        """
+        Guardar en path, en format ('json' o 'prometheus'). Sin format:
+        JSON si path termina en .json, si no en el formato de Prometheus.
+        """
+        if format is None:
+            format = dump_format(path)
+        text = self.to_json() if format == 'json' else self.to_prometheus()
+        with open(path, 'w') as file:
+            file.write(text)
+
+
+def dump_format(path: str) -> str:
+    """
+    Formato que corresponde a la extensión de path (ver Metrics.dump).
+    """
+    return 'json' if path.lower().endswith('.json') else 'prometheus'
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
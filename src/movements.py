@@ -0,0 +1,245 @@
+"""
+Lista compacta de movimientos, para intervalos largos de muchas cuentas.
+"""
+import datetime
+import math
+from array import array
+from collections.abc import Sequence
+from typing import Iterable
+
+from prometeo.banking.models import Movement
+
+# Importe vacío ('' en las respuestas de Prometeo).
+EMPTY = math.nan
+
+
+def _parse_date(string: str) -> int:
+    """
+    'dd/mm/yyyy' -> date.toordinal(), sin pasar por strptime.
+    """
+    day, month, year = string.split('/')
+    return datetime.date(int(year), int(month), int(day)).toordinal()
+
+
+class MovementList(Sequence):
+    """
+    Se usa como una lista de Movement (len, índices, iterar, append,
+    sort) pero guarda los movimientos en columnas, en lugar de un
+    objeto por movimiento:
+
+    - date: array con date.toordinal() (los Movement tienen un datetime).
+    - debit, credit: arrays de floats ('' se guarda como NaN, y los
+      int como float).
+    - reference, detail: índices en una lista de textos sin repetir
+      (se repiten mucho: el nombre del comercio, 'COMPRA', etc).
+    - id: lista de textos.
+
+    Los valores que no entran en las columnas (ej: un importe que no
+    es un número, una fecha con hora o extra_data) se guardan aparte,
+    por posición. Cada Movement se crea recién cuando se pide.
+    """
+
+    __slots__ = ('_ids', '_references', '_details', '_dates', '_debits',
+                 '_credits', '_strings', '_string_codes', '_other')
+
+    def __init__(self, movements: Iterable[Movement] = ()):
+        self._ids = []
+        self._references = array('l')
+        self._details = array('l')
+        self._dates = array('l')
+        self._debits = array('d')
+        self._credits = array('d')
+        self._strings = []
+        self._string_codes = {}
+        # (posición, campo) -> valor.
+        self._other = {}
+        self.extend(movements)
+
+    @classmethod
+    def from_data(cls, movements: Iterable[dict]) -> 'MovementList':
+        """
+        Desde los movimientos de una respuesta de Prometeo (JSON),
+        sin crear un Movement por cada uno.
+        """
+        result = cls()
+        for data in movements:
+            result._append(data['id'], data['reference'], _parse_date(data['date']),
+                           data['detail'], data['debit'], data['credit'])
+        return result
+
+    @classmethod
+    def merge(cls, lists: Iterable['MovementList']) -> 'MovementList':
+        """
+        Unir varias listas sin repetidos (por id) y ordenadas por fecha
+        (manteniendo el orden de cada día), como se hace con los
+        movimientos pedidos en ventanas, sin crear los Movement.
+        """
+        rows = []
+        seen_ids = set()
+        for movements in lists:
+            for index, id in enumerate(movements._ids):
+                # Sin id no hay forma de saber si está repetido.
+                if id:
+                    if id in seen_ids:
+                        continue
+                    seen_ids.add(id)
+                rows.append((movements._dates[index], movements, index))
+
+        # sort es estable: el orden de cada día no cambia.
+        rows.sort(key=lambda row: row[0])
+        result = cls()
+        for _, movements, index in rows:
+            result._copy(movements, index)
+        return result
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return f'<MovementList of {len(self)} movements>'
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('MovementList index out of range')
+
+        debit = self._debits[index]
+        credit = self._credits[index]
+        movement = Movement(
+            self._ids[index], self._strings[self._references[index]],
+            datetime.datetime.fromordinal(self._dates[index]),
+            self._strings[self._details[index]],
+            '' if debit != debit else debit, '' if credit != credit else credit)
+        return self._restore(index, movement) if self._other else movement
+
+    def __iter__(self):
+        strings = self._strings
+        fromordinal = datetime.datetime.fromordinal
+        columns = zip(self._ids, self._references, self._dates,
+                      self._details, self._debits, self._credits)
+        for index, (id, reference, date, detail, debit, credit) in enumerate(columns):
+            movement = Movement(id, strings[reference], fromordinal(date), strings[detail],
+                                '' if debit != debit else debit,
+                                '' if credit != credit else credit)
+            yield self._restore(index, movement) if self._other else movement
+
+    def _restore(self, index: int, movement: Movement) -> Movement:
+        """
+        Poner los valores guardados aparte.
+        """
+        values = {field: self._other[(index, field)] for field in Movement._fields
+                  if (index, field) in self._other}
+        return movement._replace(**values) if values else movement
+
+    def _code(self, string) -> int:
+        code = self._string_codes.get(string)
+        if code is None:
+            code = self._string_codes[string] = len(self._strings)
+            self._strings.append(string)
+        return code
+
+    def _amount(self, position: int, field: str, value) -> float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value:
+            return float(value)
+        if value != '':
+            self._other[(position, field)] = value
+        return EMPTY
+
+    def _append(self, id, reference, date, detail, debit, credit, extra_data=None) -> None:
+        """
+        date puede ser un datetime (sin hora) o un ordinal.
+        """
+        position = len(self._ids)
+        self._ids.append(id)
+        self._references.append(self._code(reference))
+        self._details.append(self._code(detail))
+
+        if type(date) is int:
+            self._dates.append(date)
+        elif type(date) is datetime.datetime and date == datetime.datetime.combine(date, datetime.time()):
+            self._dates.append(date.toordinal())
+        else:
+            # El día igual se guarda, para ordenar (ver merge).
+            self._dates.append(date.toordinal() if hasattr(date, 'toordinal') else 1)
+            self._other[(position, 'date')] = date
+
+        self._debits.append(self._amount(position, 'debit', debit))
+        self._credits.append(self._amount(position, 'credit', credit))
+        if extra_data is not None:
+            self._other[(position, 'extra_data')] = extra_data
+
+    def _copy(self, movements: 'MovementList', index: int) -> None:
+        """
+        Agregar el movimiento index de otra lista, sin crear el Movement.
+        """
+        position = len(self._ids)
+        self._ids.append(movements._ids[index])
+        self._references.append(self._code(movements._strings[movements._references[index]]))
+        self._details.append(self._code(movements._strings[movements._details[index]]))
+        self._dates.append(movements._dates[index])
+        self._debits.append(movements._debits[index])
+        self._credits.append(movements._credits[index])
+        if movements._other:
+            for field in Movement._fields:
+                if (index, field) in movements._other:
+                    self._other[(position, field)] = movements._other[(index, field)]
+
+    def append(self, movement: Movement) -> None:
+        self._append(*movement)
+
+    def extend(self, movements: Iterable[Movement]) -> None:
+        for movement in movements:
+            self._append(*movement)
+
+    def sort(self, key=None, reverse: bool = False) -> None:
+        """
+        Igual que list.sort (estable), key recibe cada Movement.
+        """
+        if key is None:
+            order = sorted(range(len(self)), key=self.__getitem__, reverse=reverse)
+        else:
+            order = sorted(range(len(self)), key=lambda index: key(self[index]),
+                           reverse=reverse)
+
+        self._ids = [self._ids[index] for index in order]
+        for name in ('_references', '_details', '_dates', '_debits', '_credits'):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[index] for index in order]))
+
+        if self._other:
+            positions = {old: new for new, old in enumerate(order)}
+            self._other = {(positions[index], field): value
+                           for (index, field), value in self._other.items()}
+
+
+def merge_windows(results: list):
+    """
+    Unir los movimientos de un intervalo pedido en ventanas (un Result
+    de src/concurrency.py por ventana, en orden) sin repetidos (por id)
+    y ordenados por fecha. Si alguna ventana falló se levanta su error.
+    Si las ventanas son MovementList se unen con MovementList.merge.
+    """
+    for result in results:
+        if result.error is not None:
+            raise result.error
+    lists = [result.value for result in results]
+    if lists and all(isinstance(movements, MovementList) for movements in lists):
+        return MovementList.merge(lists)
+
+    merged = []
+    seen_ids = set()
+    for movements in lists:
+        for movement in movements:
+            # Sin id no hay forma de saber si está repetido.
+            if movement.id:
+                if movement.id in seen_ids:
+                    continue
+                seen_ids.add(movement.id)
+            merged.append(movement)
+
+    # sort es estable: se mantiene el orden de Prometeo en cada día.
+    merged.sort(key=lambda movement: movement.date)
+    return merged
@@ -1,63 +1,187 @@
 import os
+import sys
+from typing import Iterable, List
 
-from colorama import Fore, init
+from colorama import Fore, just_fix_windows_console
+
+from src.config import OUTPUT_BUFFER_SIZE, TABLE_SAMPLE_ROWS
 
 
 class Output:
     """
     Agregar prefijos y colores.
+
+    Los mensajes se escriben directo en el stream, con un solo write
+    cada uno. Para muchas líneas (ej: movimientos) usar lines o table,
+    que juntan las escrituras en bloques de OUTPUT_BUFFER_SIZE caracteres.
     """
 
-    def __init__(self, color: bool = True):
-        if color:
-            init(autoreset=True)
+    def __init__(self, color: bool = True, quiet: bool = False, compact: bool = False, paged: bool = False, stream=None):
+        # En modo quiet (batch) se omiten info y success, y los
+        # warnings y errores van a stderr para no ensuciar stdout.
+        self.quiet = quiet
+        # Los plugins muestran las listas como tablas (ver table).
+        self.compact = compact
+        # Los plugins muestran las listas de a una página (ver src.pager).
+        self.paged = paged
+        self.stream = stream or sys.stdout
+        self.log_stream = sys.stderr if quiet else self.stream
+
+        # Sin colores si la salida no es una terminal (ej: un pipe o archivo).
+        if color and self._isatty(self.stream):
+            # En Windows se necesita colorama para los códigos ANSI,
+            # en el resto no hace nada.
+            just_fix_windows_console()
             self.colors = {
                 'red': Fore.LIGHTRED_EX,
                 'green': Fore.LIGHTGREEN_EX,
                 'yellow': Fore.LIGHTYELLOW_EX,
-                'blue': Fore.LIGHTBLUE_EX
+                'blue': Fore.LIGHTBLUE_EX,
+                'reset': Fore.RESET
             }
         else:
             self.colors = {
                 'red': '',
                 'green': '',
                 'yellow': '',
-                'blue': ''
+                'blue': '',
+                'reset': ''
             }
-        self.colors.update({'reset': Fore.RESET})
+
+    @staticmethod
+    def _isatty(stream) -> bool:
+        try:
+            return stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def _write(self, msg: str, color: str = None, stream=None) -> None:
+        stream = stream or self.stream
+        if color and self.colors[color]:
+            msg = self.colors[color] + msg + self.colors['reset']
+        if stream is not self.stream:
+            # Que no se mezclen con lo que quedó en el buffer del stream.
+            self.stream.flush()
+        stream.write(msg + '\n')
+
+    def flush(self) -> None:
+        self.stream.flush()
 
     # Log messages.
 
     def info(self, msg: str) -> None:
-        print('INFO => ' + msg)
+        if not self.quiet:
+            self._write('INFO => ' + msg)
 
     def success(self, msg: str) -> None:
-        print(self.colors['green'] + 'OK => ' + self.colors['reset'] + msg)
+        if not self.quiet:
+            self._write(self.colors['green'] + 'OK => ' + self.colors['reset'] + msg)
 
     def warning(self, msg: str) -> None:
-        print(self.colors['yellow'] + 'WARNING => ' +
-              self.colors['reset'] + msg)
+        self._write(self.colors['yellow'] + 'WARNING => ' +
+                    self.colors['reset'] + msg, stream=self.log_stream)
 
     def error(self, msg: str) -> None:
-        print(self.colors['red'] + 'ERROR => ' + self.colors['reset'] + msg)
+        self._write(self.colors['red'] + 'ERROR => ' +
+                    self.colors['reset'] + msg, stream=self.log_stream)
 
     # Just colored output.
     def red(self, msg: str) -> None:
-        print(self.colors['red'] + msg)
+        self._write(msg, 'red')
 
     def yellow(self, msg: str) -> None:
-        print(self.colors['yellow'] + msg)
+        self._write(msg, 'yellow')
 
     def blue(self, msg: str) -> None:
-        print(self.colors['blue'] + msg)
+        self._write(msg, 'blue')
 
     def green(self, msg: str) -> None:
-        print(self.colors['green'] + msg)
+        self._write(msg, 'green')
+
+    # Bulk output.
+
+    def lines(self, lines: Iterable[str], color: str = None) -> int:
+        """
+        Escribir muchas líneas (un iterable, que se consume de a una)
+        en bloques de OUTPUT_BUFFER_SIZE caracteres.
+        Devuelve la cantidad de líneas escritas.
+        """
+        start = self.colors[color] if color else ''
+        end = self.colors['reset'] if start else ''
+        write = self.stream.write
+
+        count = 0
+        buffer = []
+        size = 0
+        for line in lines:
+            buffer.append(line)
+            size += len(line) + 1
+            count += 1
+            if size >= OUTPUT_BUFFER_SIZE:
+                write(start + '\n'.join(buffer) + end + '\n')
+                buffer = []
+                size = 0
+        if buffer:
+            write(start + '\n'.join(buffer) + end + '\n')
+
+        self.stream.flush()
+        return count
+
+    def table(self, rows: Iterable[tuple], headers: List[str], color: str = None) -> int:
+        """
+        Tabla compacta: una fila por línea, con columnas de ancho fijo.
+        El ancho se calcula con las primeras TABLE_SAMPLE_ROWS filas
+        (los valores más largos se cortan), así no hay que tener todas
+        las filas en memoria.
+        Devuelve la cantidad de filas escritas.
+        """
+        rows = iter(rows)
+        sample = []
+        for row in rows:
+            sample.append(row)
+            if len(sample) == TABLE_SAMPLE_ROWS:
+                break
+
+        format_row, header = self.table_format(headers, sample)
+
+        def formatted():
+            yield from header
+            for row in sample:
+                yield format_row(row)
+            for row in rows:
+                yield format_row(row)
+
+        # El encabezado y el separador no cuentan como filas.
+        return self.lines(formatted(), color) - len(header)
+
+    @staticmethod
+    def table_format(headers: List[str], sample: List[tuple]):
+        """
+        Función para formatear cada fila de una tabla con el ancho de
+        columnas de sample, y las líneas del encabezado.
+        """
+        def cells(row) -> List[str]:
+            return ['' if value is None else str(value) for value in row]
+
+        sample = [cells(row) for row in sample]
+        widths = [max([len(header)] + [len(row[index]) for row in sample])
+                  for index, header in enumerate(headers)]
+
+        # Cada columna se rellena y se corta en su ancho: '{:10.10}'.
+        row_format = '  '.join(f'{{:{width}.{width}}}' for width in widths)
+
+        def format_row(row) -> str:
+            return row_format.format(*cells(row)).rstrip()
+
+        header = [row_format.format(*headers).rstrip(),
+                  '  '.join('-' * width for width in widths)]
+        return format_row, header
 
     def clear(self) -> None:
         """
         Clear console screen.
         """
+        self.flush()
         if os.name == 'nt':
             os.system('cls')
         else:
@@ -0,0 +1,161 @@
+"""
+Mostrar listas largas (movimientos, providers, etc) de a una página.
+"""
+import shutil
+from typing import Any, Callable, Iterable, List
+
+from src.utils import Utils
+
+PROMPT = '[enter] next, [p] previous, [number] go to page, [/text] search, [q] quit --> '
+
+
+class Pager:
+    """
+    Muestra los items de un iterable de a una página. Los items se
+    piden al iterable recién cuando hacen falta y solo se formatean
+    los de la página que se muestra.
+
+    format_item(item) devuelve el texto de un item (puede tener varias
+    líneas, ver lines_per_item). Si out.compact está activo y se pasan
+    row(item) y headers, se muestra como tabla (una línea por item).
+    search_text(item) es el texto donde se busca (por defecto format_item).
+    """
+
+    def __init__(self, out, format_item: Callable[[Any], str], lines_per_item: int = 1, row: Callable[[Any], tuple] = None, headers: List[str] = None, search_text: Callable[[Any], str] = None, color: str = None, page_size: int = None):
+        self.out = out
+        self.utils = Utils(out)
+        self.color = color
+        self.search_text = search_text or format_item
+
+        self.format_item = format_item
+        self.row = row
+        self.headers = headers
+        self.table = bool(out.compact and row and headers)
+        if self.table:
+            lines_per_item = 1
+
+        if page_size is None:
+            # Lo que entra en la terminal, dejando lugar para el prompt
+            # (y el encabezado si es una tabla).
+            page_size = (shutil.get_terminal_size().lines -
+                         (6 if self.table else 4)) // lines_per_item
+        self.page_size = max(1, page_size)
+
+        self._items = []
+        self._source = None
+        self._exhausted = False
+
+    def _fill(self, count: int) -> None:
+        """
+        Pedir items al iterable hasta tener count (o que se termine).
+        """
+        while not self._exhausted and len(self._items) < count:
+            try:
+                self._items.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+
+    def _last_page(self) -> int:
+        return max(0, (len(self._items) - 1) // self.page_size)
+
+    def _show(self, page: int) -> None:
+        start = page * self.page_size
+        self._fill(start + self.page_size + 1)
+        items = self._items[start:start + self.page_size]
+
+        if self.table:
+            # El ancho de las columnas sale de las filas de la página.
+            rows = [self.row(item) for item in items]
+            format_row, header = self.out.table_format(self.headers, rows)
+            lines = header + [format_row(row) for row in rows]
+        else:
+            lines = [self.format_item(item) for item in items]
+        self.out.lines(lines, self.color)
+
+        total = f'/{self._last_page() + 1}' if self._exhausted else ''
+        self.out.info(
+            f'Page {page + 1}{total} (items {start + 1}-{start + len(items)}).')
+
+    def _search(self, text: str, start: int):
+        """
+        Índice del primer item desde start que contiene text, o None.
+        """
+        text = text.lower()
+        index = start
+        while True:
+            self._fill(index + 1)
+            if index >= len(self._items):
+                return None
+            if text in self.search_text(self._items[index]).lower():
+                return index
+            index += 1
+
+    def run(self, items: Iterable) -> None:
+        self._source = iter(items)
+        self._fill(self.page_size + 1)
+        if not self._items:
+            self.out.warning('Nothing to show.')
+            return
+
+        page = 0
+        last_search = None
+        while True:
+            self._show(page)
+
+            # Una sola página: no hay nada para navegar.
+            if self._exhausted and self._last_page() == 0:
+                return
+
+            command = self.utils.get_option(
+                'str', required=False, input_prefix=PROMPT)
+            command = (command or 'n').strip()
+
+            if command.lower() == 'q':
+                return
+
+            if command.lower() == 'n':
+                self._fill((page + 2) * self.page_size + 1)
+                if page == self._last_page():
+                    return
+                page += 1
+
+            elif command.lower() == 'p':
+                page = max(0, page - 1)
+
+            elif command.isdigit():
+                target = max(0, int(command) - 1)
+                self._fill((target + 1) * self.page_size + 1)
+                if target > self._last_page():
+                    self.out.yellow(
+                        f'There are only {self._last_page() + 1} pages.')
+                    target = self._last_page()
+                page = target
+
+            elif command.startswith('/'):
+                last_search = command[1:] or last_search
+                if not last_search:
+                    continue
+                # Se busca desde la página siguiente a la actual.
+                index = self._search(last_search, (page + 1) * self.page_size)
+                if index is None:
+                    self.out.yellow(f'"{last_search}" not found.')
+                else:
+                    page = index // self.page_size
+
+            else:
+                self.out.yellow('Invalid option.')
+
+
+def show_items(out, items: Iterable, format_item: Callable[[Any], str], lines_per_item: int = 1, row: Callable[[Any], tuple] = None, headers: List[str] = None, search_text: Callable[[Any], str] = None, color: str = None) -> None:
+    """
+    Mostrar items según la configuración de out: de a una página
+    (out.paged), como tabla (out.compact, si se pasan row y headers)
+    o todos seguidos.
+    """
+    if out.paged:
+        Pager(out, format_item, lines_per_item, row, headers,
+              search_text, color).run(items)
+    elif out.compact and row and headers:
+        out.table(map(row, items), headers, color)
+    else:
+        out.lines(map(format_item, items), color)
@@ -1,11 +1,22 @@
 import abc
+import ast
+import hashlib
+import json
 import os
+from collections import namedtuple
 from importlib import util
+from typing import List
 
 import src.exceptions as exceptions
-from src.client import PrometeoClient
+from src.config import PLUGIN_MANIFEST_PATH
+from src.hooks import hooks
+from src.startup import profile
 from src.utils import Utils
 
+# Datos de un plugin, leídos sin ejecutar su módulo (ver discover_plugins).
+PluginInfo = namedtuple(
+    'PluginInfo', ['name', 'description', 'path', 'class_name'])
+
 
 class BasePlugin(metaclass=abc.ABCMeta):
     """
@@ -16,6 +27,9 @@ class BasePlugin(metaclass=abc.ABCMeta):
     plugin_description: str = 'No description.'
     # Para usar en funciones de validación:
     ValidationError = exceptions.ValidationError
+    # Para observar los plugins y los requests (ver src/hooks.py),
+    # ej: self.hooks.add(observer) o with self.hooks.around('evento').
+    hooks = hooks
 
     def __init_subclass__(cls):
         """
@@ -52,6 +66,144 @@ def load_module(path):
 path = os.path.abspath(__file__)
 dirpath = os.path.dirname(path)
 
-for file_name in os.listdir(dirpath):
-    if file_name.endswith('_plugin.py'):
-        load_module(os.path.join(dirpath, file_name))
+# Módulos de plugins ya cargados, por path.
+_loaded_modules = {}
+
+
+def read_plugin_info(path: str, source: bytes = None) -> List[PluginInfo]:
+    """
+    Leer plugin_name y plugin_description de las clases que heredan
+    de BasePlugin, analizando el código (ast) sin ejecutarlo.
+    Solo se tienen en cuenta valores que sean strings literales.
+    """
+    if source is None:
+        with open(path, 'rb') as file:
+            source = file.read()
+    tree = ast.parse(source, path)
+
+    infos = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        # BasePlugin o plugins.BasePlugin.
+        base_names = [base.attr if isinstance(base, ast.Attribute) else getattr(base, 'id', None)
+                      for base in node.bases]
+        if 'BasePlugin' not in base_names:
+            continue
+
+        attributes = {'plugin_name': BasePlugin.plugin_name,
+                      'plugin_description': BasePlugin.plugin_description}
+        for statement in node.body:
+            if (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                    and isinstance(statement.targets[0], ast.Name)
+                    and statement.targets[0].id in attributes
+                    and isinstance(statement.value, ast.Constant)
+                    and isinstance(statement.value.value, str)):
+                attributes[statement.targets[0].id] = statement.value.value
+
+        infos.append(PluginInfo(
+            attributes['plugin_name'], attributes['plugin_description'], path, node.name))
+    return infos
+
+
+class PluginManifest:
+    """
+    Metadatos de los plugins guardados en un JSON, para no volver a
+    leer y analizar los archivos que no cambiaron. Un archivo se vuelve
+    a analizar si cambió su mtime o tamaño y además su hash (sha256).
+
+    Formato del archivo:
+        {path: {mtime, size, hash, plugins: [[name, description, class_name]]}}
+    """
+
+    def __init__(self, path: str = PLUGIN_MANIFEST_PATH):
+        self.path = path
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, data: dict) -> None:
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(data, file, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # El manifest es opcional, no debe romper el CLI.
+            pass
+
+    def discover(self, directory: str) -> List[PluginInfo]:
+        """
+        Plugins de los archivos *_plugin.py de directory, sin importarlos.
+        Actualiza el manifest si algún archivo cambió.
+        """
+        manifest = self._load()
+        updated = {}
+        infos = []
+
+        for entry in os.scandir(directory):
+            if not entry.name.endswith('_plugin.py'):
+                continue
+
+            stat = entry.stat()
+            cached = manifest.get(entry.path)
+            if not (cached and cached.get('mtime') == stat.st_mtime_ns and cached.get('size') == stat.st_size):
+                cached = self._read(entry.path, stat, cached)
+            updated[entry.path] = cached
+            infos += [PluginInfo(name, description, entry.path, class_name)
+                      for name, description, class_name in cached['plugins']]
+
+        # Solo se escribe si algo cambió (incluye archivos borrados).
+        if updated != manifest:
+            self._save(updated)
+        return infos
+
+    def _read(self, path: str, stat, cached: dict) -> dict:
+        with open(path, 'rb') as file:
+            source = file.read()
+        digest = hashlib.sha256(source).hexdigest()
+
+        if cached and cached.get('hash') == digest:
+            # Solo cambió el mtime (ej: git checkout).
+            plugins = cached['plugins']
+        else:
+            plugins = [[info.name, info.description, info.class_name]
+                       for info in read_plugin_info(path, source)]
+
+        return {'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+                'hash': digest, 'plugins': plugins}
+
+
+def discover_plugins(directory: str = dirpath) -> List[PluginInfo]:
+    """
+    Plugins de los archivos *_plugin.py, sin importarlos (ver PluginManifest).
+    """
+    return PluginManifest().discover(directory)
+
+
+def load_plugin(info: PluginInfo):
+    """
+    Importar (una sola vez) el módulo del plugin y devolver su clase.
+    """
+    if info.path not in _loaded_modules:
+        with profile.phase(f'plugin {info.name}'):
+            _loaded_modules[info.path] = load_module(info.path)
+    return getattr(_loaded_modules[info.path], info.class_name)
+
+
+def get_plugin(plugin_name: str):
+    """
+    Get a plugin class by its plugin_name, loading it if needed.
+    """
+    for plugin in BasePlugin.plugin_list:
+        if plugin.plugin_name == plugin_name:
+            return plugin
+    for info in discover_plugins():
+        if info.name == plugin_name:
+            return load_plugin(info)
+    raise KeyError(plugin_name)
@@ -0,0 +1,73 @@
+import datetime
+
+import src.plugins as plugins
+from src.config import ANALYTICS_TOP, LOGGED_IN_STATUS
+
+# Opciones del menú: (nombre del reporte, descripción).
+REPORT_OPTIONS = [
+    ('totals', 'Totals per account.'),
+    ('daily', 'Debit and credit per day.'),
+    ('monthly', 'Debit and credit per month.'),
+    ('balance', 'Running balance per day.'),
+    ('counterparties', f'Top {ANALYTICS_TOP} counterparties per currency.'),
+]
+
+
+class AnalyticsPlugin(plugins.BasePlugin):
+    plugin_name = 'Analytics'
+    plugin_description = 'Summaries of the movements of all accounts and credit cards. (!) Requires a session.'
+
+    def run(self):
+        if self.client.status != LOGGED_IN_STATUS:
+            self.out.error(
+                'You must have an active session. (Try using Sessions plugin).')
+            return
+
+        # Se importa acá porque carga NumPy (si está instalado).
+        from src.analytics import REPORTS, MovementFrame
+        from src.export import movement_row
+
+        # Los movimientos se piden igual que en el plugin Transactions.
+        transactions = plugins.get_plugin('Transactions')(self.client, self.out)
+        interval = transactions._get_interval()
+        if interval is None:
+            return
+
+        self.out.info('Requesting movements of all accounts to Prometeo...')
+        results = transactions.fetch_all_movements(*interval)
+        for result in results:
+            if result.error is not None:
+                _, account_number, currency = result.item
+                self.out.warning(
+                    f'{account_number} ({currency}): could not get movements.')
+
+        frame = MovementFrame.from_rows(
+            result.item[1:] + movement_row(movement)
+            for result in results if result.error is None
+            for movement in result.value)
+        if not len(frame):
+            self.out.warning('No movements found.')
+            return
+        self.out.success(
+            f'{len(frame)} movements of {len(frame.accounts)} accounts loaded.')
+
+        # Se pueden ver varios reportes sin volver a pedir los movimientos.
+        while True:
+            print('\nReports:\n')
+            for index, (_, description) in enumerate(REPORT_OPTIONS):
+                print(f'    [{index+1}] {description}')
+            print('')
+
+            option = self.utils.get_option(
+                required=False, input_prefix='Select a report (blank to exit) -> ')
+            if option is None:
+                return
+            if option < 1 or option > len(REPORT_OPTIONS):
+                self.out.yellow('Invalid option, try again.')
+                continue
+
+            fields, report = REPORTS[REPORT_OPTIONS[option-1][0]]
+            self.out.table(
+                (tuple(value.strftime('%d/%m/%Y') if isinstance(value, datetime.date) else value
+                       for value in row) for row in report(frame, ANALYTICS_TOP)),
+                [name for name, _ in fields])
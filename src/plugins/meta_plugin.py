@@ -1,5 +1,12 @@
+from typing import List
+
 import src.plugins as plugins
 from prometeo.exceptions import UnauthorizedError
+from src.concurrency import Result
+from src.pager import show_items
+
+# Opción para actualizar el cache de providers.
+REFRESH_COMMAND = '!refresh'
 
 class MetaPlugin(plugins.BasePlugin):
     plugin_name = 'Meta'
@@ -8,31 +15,24 @@ class MetaPlugin(plugins.BasePlugin):
     def run(self):
         self.out.info('Requesting provider list...')
         try:
-            providers = self.client.get_providers()
+            self.client.get_provider_index()
         except UnauthorizedError:
             self.out.error(
                 'Invalid API key. Are you in the correct environment?')
             return
 
-        # Ordenar por país.
-        providers.sort(key=lambda e: e.country)
-
         search_pattern = self.utils.get_option(
-            'str', False, 'Search pattern (leave blank to show all providers): ')
+            'str', False, f"Search pattern (leave blank to show all providers, '{REFRESH_COMMAND}' to update them): ")
 
-        print('')
+        # Actualizar el cache y mostrar todo.
+        if search_pattern is not None and search_pattern.strip() == REFRESH_COMMAND:
+            self.out.info('Refreshing provider list...')
+            self.client.refresh_providers()
+            search_pattern = None
 
-        # Mostrar todo.
-        if search_pattern is None:
-            search_results = providers
+        print('')
 
-        # Se busca alguna coincidencia en alguno de los campos
-        # de cada provider.
-        else:
-            search_results = []
-            for provider in providers:
-                if search_pattern.strip().lower() in [field.lower() for field in provider]:
-                    search_results.append(provider)
+        search_results = self.search(search_pattern)
 
         # No hay resultados.
         if len(search_results) == 0:
@@ -40,8 +40,8 @@ class MetaPlugin(plugins.BasePlugin):
             return
 
         # Mostrar la lista de los resultados de búsqueda.
-        for index, provider in enumerate(search_results):
-            print(f'[{index+1}] {provider.name} ({provider.country})')
+        show_items(self.out, enumerate(search_results, 1),
+                   lambda item: f'[{item[0]}] {item[1].name} ({item[1].country})')
 
         # Mostrar detalles de la opción elegida.
         option = self.utils.get_option(
@@ -52,17 +52,60 @@ class MetaPlugin(plugins.BasePlugin):
             self.out.yellow('Invalid option.')
             return
         if option == 0:
-            for provider in search_results:
-                self._show_provider_info(provider.code)
+            self._show_all_provider_info(
+                [provider.code for provider in search_results])
         else:
             self._show_provider_info(search_results[option-1].code)
 
+    def search(self, search_pattern):
+        """
+        Buscar providers por código, nombre o país (None para no
+        filtrar). Se usa el índice del cliente (ver src/search.py):
+        primero los que coinciden exacto, después por prefijo,
+        substring y por último los parecidos (errores de tipeo).
+        """
+        index = self.client.get_provider_index()
+
+        # Mostrar todo, ordenado por país.
+        if search_pattern is None:
+            return sorted(index.providers, key=lambda e: e.country)
+
+        return index.search(search_pattern)
+
+    def get_provider_detail(self, provider_code) -> dict:
+        return self.client.get_provider_detail(provider_code)['provider']
+
+    def get_provider_details(self, provider_codes) -> List[Result]:
+        """
+        Obtener los detalles de varios providers en paralelo.
+        Los resultados están en el mismo orden que provider_codes.
+        """
+        results = self.client.get_provider_details(provider_codes)
+        return [result._replace(value=result.value['provider'])
+                if result.error is None else result for result in results]
+
+    def _show_all_provider_info(self, provider_codes) -> None:
+        self.out.info(f'Requesting {len(provider_codes)} providers...')
+        results = self.get_provider_details(provider_codes)
+
+        failed = []
+        for result in results:
+            if result.error is not None:
+                failed.append(result.item)
+                continue
+            self._print_provider_info(result.value)
+
+        if failed:
+            self.out.warning(
+                f'Could not get details for {len(failed)} providers: {", ".join(failed)}.')
+
     def _show_provider_info(self, provider_code):
         """
         Obtener detalles del provider y mostrarlos.
         """
-        provider = self.client._banking.get_provider_detail(provider_code)['provider']
+        self._print_provider_info(self.get_provider_detail(provider_code))
 
+    def _print_provider_info(self, provider: dict) -> None:
         print(f"""
 --------------------------
 * Code: {provider['name']}
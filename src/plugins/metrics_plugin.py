@@ -0,0 +1,74 @@
+import src.plugins as plugins
+from src.metrics import dump_format
+
+HEADERS = ['Endpoint', 'Calls', 'Cached', 'Errors', 'Retries', 'Avg ms',
+           'p50 ms', 'p99 ms', 'Total s', 'Sent', 'Received']
+
+# Opción del menú: (formato de Metrics.dump, nombre, archivo por defecto).
+EXPORT_FORMATS = {1: ('prometheus', 'Prometheus text', 'metrics.prom'),
+                  2: ('json', 'JSON', 'metrics.json')}
+
+
+def _size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+class MetricsPlugin(plugins.BasePlugin):
+    plugin_name = 'Metrics'
+    plugin_description = 'Calls, latency, errors and retries of the requests made to Prometeo.'
+
+    def run(self):
+        metrics = self.client.metrics
+        snapshot = metrics.snapshot()
+        if not snapshot:
+            self.out.warning('No requests made yet.')
+            return
+
+        rows = []
+        for (method, name), endpoint in snapshot:
+            duration = endpoint.duration
+            average = duration.sum / duration.count if duration.count else 0.0
+            rows.append((f'{method} {name}', endpoint.calls, endpoint.cache_hits,
+                         sum(endpoint.errors.values()),
+                         sum(endpoint.retries.values()), f'{average * 1000:.1f}',
+                         f'{duration.quantile(0.5) * 1000:.1f}',
+                         f'{duration.quantile(0.99) * 1000:.1f}', f'{duration.sum:.2f}',
+                         _size(endpoint.bytes_sent), _size(endpoint.bytes_received)))
+        print('')
+        self.out.table(rows, HEADERS)
+
+        # Detalle de los errores y reintentos (por excepción o status).
+        for (method, name), endpoint in snapshot:
+            for label, counts in (('errors', endpoint.errors), ('retries', endpoint.retries)):
+                if counts:
+                    detail = ', '.join(f'{reason}: {count}' for reason, count in sorted(counts.items()))
+                    self.out.yellow(f'{method} {name} {label}: {detail}')
+        print(f'\nSince {metrics.started:%d/%m/%Y %H:%M:%S}. p50 and p99 are estimated from the histogram buckets.')
+
+        self.out.blue("""
+    >> [1] Save as Prometheus text.
+    >> [2] Save as JSON.
+    >> [3] Reset.
+        """)
+
+        option = self.utils.get_option(required=False)
+        if option in EXPORT_FORMATS:
+            format, name, default = EXPORT_FORMATS[option]
+            path = self.utils.get_option(
+                'str', required=False, input_prefix=f'File (blank for {default}): ') or default
+            # Se guarda en el formato elegido, aunque la extensión no coincida.
+            if dump_format(path) != format:
+                self.out.yellow(f'The file name does not match the format, it will be saved as {name}.')
+            try:
+                metrics.dump(path, format)
+            except OSError as e:
+                self.out.error(f'Could not save the metrics: {e}')
+                return
+            self.out.success(f'Metrics saved in {path}.')
+        elif option == 3:
+            metrics.reset()
+            self.out.success('Metrics cleared.')
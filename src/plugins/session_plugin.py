@@ -5,6 +5,7 @@ from src.config import (LOGGED_IN_STATUS, LOGGED_OUT_STATUS,
                         WRONG_CREDENTIALS_STATUS)
 
 from requests.exceptions import ConnectionError as RequestsConnError
+from requests.exceptions import Timeout as RequestsTimeout
 
 
 class SessionPlugin(plugins.BasePlugin):
@@ -46,9 +47,13 @@ class SessionPlugin(plugins.BasePlugin):
         except RequestsConnError:
             self.out.error('No internet connection.')
 
+        except RequestsTimeout:
+            self.out.error('Prometeo took too long to respond.')
+
     def close(self):
-        # Hacer logout directo (omitir lo de self._logout).
-        self.client.logout()
+        # Hacer logout directo (omitir lo de self._logout)
+        # de todas las sesiones abiertas, no solo la actual.
+        self.client.close_sessions()
 
     def _login(self) -> None:
 
@@ -69,11 +74,17 @@ class SessionPlugin(plugins.BasePlugin):
             username = self.utils.get_option('str', input_prefix='username: ')
             password = self.utils.get_password()
 
-        # Este login guarda la session en el objeto client.
-        self.client.login(provider, username, password)
-        self.client.status = LOGGED_IN_STATUS
+        self.login(provider, username, password)
         self.out.success('Login successful')
 
+    def login(self, provider, username, password, **kwargs) -> None:
+        """
+        Login sin pedirle nada al usuario (usado también en modo batch).
+        """
+        # Este login guarda la session en el objeto client.
+        self.client.login(provider, username, password, **kwargs)
+        self.client.status = LOGGED_IN_STATUS
+
     def _logout(self) -> None:
         logged_out = self.client.logout()
         self.client.status = LOGGED_OUT_STATUS
@@ -1,20 +1,36 @@
+import asyncio
 import datetime
+from collections import namedtuple
+from typing import List
 
 import src.plugins as plugins
 from prometeo.banking.exceptions import BankingClientError
-from src.config import LOGGED_IN_STATUS
+from src.concurrency import Result, gather_concurrently, map_concurrently
+from src.config import (LOGGED_IN_STATUS, MAX_WORKERS, SYNC_INITIAL_DAYS,
+                        SYNC_OVERLAP_DAYS)
 from src.exceptions import ValidationError
+from src.pager import show_items
+from src.store import AccountKey, MovementStore
 
 # Cambiar según lo requerido.
 AVAILABLE_CURRENCIES = ['UYU', 'USD']
 DEFAULT_DAY_INTERVAL = 30
 MIN_WARNING_INTERVAL = 31
 
+# Resultado de la sincronización de cada cuenta.
+SyncStats = namedtuple('SyncStats', ['start', 'end', 'fetched', 'new'])
+
 
 class TransactionsPlugin(plugins.BasePlugin):
     plugin_name = 'Transactions'
     plugin_description = 'Bank and credit card movements plugin. (!) Requires a session.'
 
+    # Opciones del menú (también usadas en modo batch).
+    BANK_ACCOUNT = 1
+    CREDIT_CARD = 2
+    ALL_ACCOUNTS = 3
+    SYNC = 4
+
     def run(self):
         if self.client.status != LOGGED_IN_STATUS:
             self.out.error(
@@ -26,12 +42,20 @@ Options:
 
     [1] Bank accounts.
     [2] Credit Cards.
+    [3] All accounts and credit cards.
+    [4] Sync all accounts and credit cards to the local store.
         """)
         option = self.utils.get_option(required=False)
-        if option == 1:
+        if option == self.BANK_ACCOUNT:
             accounts = self.get_bank_accounts()
-        elif option == 2:
+        elif option == self.CREDIT_CARD:
             accounts = self.get_credit_cards()
+        elif option == self.ALL_ACCOUNTS:
+            self._run_all()
+            return
+        elif option == self.SYNC:
+            self._run_sync()
+            return
         else:
             if option is not None:
                 self.out.yellow('Invalid option, try again.')
@@ -59,11 +83,75 @@ Options:
         currency_choice = self.utils.get_option(required=True)
         currency = AVAILABLE_CURRENCIES[currency_choice-1]
 
-        # Fecha de inicio y fin.
-        today = datetime.date.today()
-        default_start = self._date_to_str(
-            today - datetime.timedelta(days=DEFAULT_DAY_INTERVAL))
-        default_end = self._date_to_str(today)
+        # Fecha de inicio y fin.
+        interval = self._get_interval()
+        if interval is None:
+            return
+        start_date, end_date = interval
+
+        # Obtener movimientos desde Prometeo.
+        self.out.info('Requesting movements to Prometeo...')
+        try:
+            movements = self.fetch_movements(
+                option, account_number, currency, start_date, end_date)
+
+        except BankingClientError:
+            self.out.error('No account found with the selected currency.')
+            return
+
+        # Mostrar movimientos.
+        self._show_movements(movements, currency)
+
+    def _run_all(self) -> None:
+        """
+        Obtener los movimientos de todas las cuentas y tarjetas.
+        """
+        interval = self._get_interval()
+        if interval is None:
+            return
+
+        self.out.info('Requesting movements of all accounts to Prometeo...')
+        results = self.fetch_all_movements(*interval)
+
+        for result in results:
+            option, account_number, currency = result.item
+            kind = 'Account' if option == self.BANK_ACCOUNT else 'Credit card'
+
+            if result.error is not None:
+                self.out.warning(
+                    f'{kind} {account_number} ({currency}): could not get movements.')
+                continue
+
+            self.out.green(f'\n{kind} {account_number} ({currency}):')
+            self._show_movements(result.value, currency)
+
+    def _run_sync(self) -> None:
+        """
+        Sincronizar todas las cuentas y tarjetas con el store local.
+        """
+        self.out.info('Syncing movements of all accounts...')
+        with MovementStore() as store:
+            results = self.sync_movements(store, self.get_all_accounts())
+
+        for result in results:
+            _, account_number, currency = result.item
+            if result.error is not None:
+                self.out.warning(
+                    f'{account_number} ({currency}): could not sync movements.')
+                continue
+
+            stats = result.value
+            self.out.success(
+                f'{account_number} ({currency}): {stats.new} new movements '
+                f'({stats.fetched} requested from {self._date_to_str(stats.start)} to {self._date_to_str(stats.end)}).')
+
+    def _get_interval(self):
+        """
+        Pedir fecha de inicio y fin.
+        Devuelve None si el intervalo no es válido.
+        """
+        default_start, default_end = [
+            self._date_to_str(date) for date in self.default_interval()]
 
         start_date_str = self.utils.get_option(
             type='str',
@@ -84,48 +172,155 @@ Options:
 
         if start_date > end_date:
             self.out.error('Invalid date interval. Try again.')
-            return
+            return None
 
-        # Revisar que el intervalo no sea muy grande para evitar
-        # sobrecargar a Prometeo.
+        # Los intervalos grandes se piden en partes (ver
+        # PrometeoClient.window_days) para no sobrecargar a Prometeo.
         day_diff = end_date - start_date
         if day_diff.days >= MIN_WARNING_INTERVAL:
-            self.out.warning('You are requesting a broad time interval.')
-            question = self.utils.query_yes_no('Continue?', None)
-            if not question:
-                return
+            self.out.info(
+                f'Broad time interval: it will be requested in windows of {self.client.window_days} days.')
 
-        # Obtener movimientos desde Prometeo.
-        self.out.info('Requesting movements to Prometeo...')
-        try:
-            if option == 1:  # Cuenta de banco.
-                movements = self.client.get_movements(
-                    account_number, currency, start_date, end_date)
-            elif option == 2:  #  Tarjeta de crédito.
-                movements = self.client.get_credit_card_movements(
-                    account_number, currency, start_date, end_date)
+        return start_date, end_date
 
-        except BankingClientError:
-            self.out.error('No account found with the selected currency.')
-            return
+    def default_interval(self) -> tuple:
+        """
+        Intervalo por defecto: los últimos DEFAULT_DAY_INTERVAL días.
+        Son datetime, como las fechas de _str_to_date y de --from/--to,
+        para poder compararlas.
+        """
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        return today - datetime.timedelta(days=DEFAULT_DAY_INTERVAL), today
 
-        # Mostrar movimientos.
-        self._show_movements(movements, currency)
+    def fetch_movements(self, option, account_number, currency, start_date, end_date):
+        """
+        Obtener movimientos sin interacción con el usuario.
+        option: BANK_ACCOUNT o CREDIT_CARD.
+        """
+        if option == self.BANK_ACCOUNT:
+            return self.client.get_movements(
+                account_number, currency, start_date, end_date)
+        if option == self.CREDIT_CARD:
+            return self.client.get_credit_card_movements(
+                account_number, currency, start_date, end_date)
+        raise ValueError(f'Invalid option: {option}')
+
+    def fetch_all_movements(self, start_date, end_date, max_workers: int = MAX_WORKERS) -> List[Result]:
+        """
+        Obtener en paralelo los movimientos de todas las cuentas
+        (en su moneda) y tarjetas de crédito (en cada moneda de
+        AVAILABLE_CURRENCIES).
+        Cada Result tiene como item (option, account_number, currency).
+        """
+        jobs = self.get_all_accounts(max_workers)
+        return self._fetch_jobs(jobs, lambda job: (start_date, end_date), max_workers)
+
+    def _fetch_jobs(self, jobs: List[tuple], get_interval, max_workers: int) -> List[Result]:
+        """
+        fetch_movements de cada job en el intervalo get_interval(job), en
+        paralelo: con asyncio si el cliente lo tiene activado (use_async)
+        o si no con threads.
+        """
+        if self.client.use_async:
+            return asyncio.run(self._fetch_jobs_async(jobs, get_interval))
+
+        return map_concurrently(
+            lambda job: self.fetch_movements(*job, *get_interval(job)),
+            jobs, max_workers)
+
+    async def _fetch_jobs_async(self, jobs: List[tuple], get_interval) -> List[Result]:
+        async with self.client.get_async_client() as client:
+            async def fetch(job):
+                option, account_number, currency = job
+                if option == self.BANK_ACCOUNT:
+                    return await client.get_movements(
+                        account_number, currency, *get_interval(job))
+                return await client.get_credit_card_movements(
+                    account_number, currency, *get_interval(job))
+
+            return await gather_concurrently(fetch, jobs)
+
+    def get_all_accounts(self, max_workers: int = MAX_WORKERS) -> List[tuple]:
+        """
+        (option, account_number, currency) de cada cuenta (en su moneda)
+        y tarjeta de crédito (en cada moneda de AVAILABLE_CURRENCIES).
+        """
+        # Las cuentas y las tarjetas se piden en paralelo.
+        listings = map_concurrently(
+            lambda get_accounts: get_accounts(),
+            [self.client.get_bank_accounts, self.client.get_credit_cards],
+            max_workers)
+        for listing in listings:
+            if listing.error is not None:
+                raise listing.error
+        accounts, cards = [listing.value for listing in listings]
+
+        jobs = [(self.BANK_ACCOUNT, account.number, account.currency)
+                for account in accounts]
+        jobs += [(self.CREDIT_CARD, card.number, currency)
+                 for card in cards for currency in AVAILABLE_CURRENCIES]
+        return jobs
+
+    def sync_movements(self, store: MovementStore, jobs: List[tuple], end_date=None, max_workers: int = MAX_WORKERS) -> List[Result]:
+        """
+        Sincronización incremental: para cada (option, account_number, currency)
+        de jobs se piden solo los movimientos desde la última fecha sincronizada
+        (menos SYNC_OVERLAP_DAYS), o de los últimos SYNC_INITIAL_DAYS si es la
+        primera vez, y se guardan en store.
+        Cada Result tiene como value un SyncStats.
+        """
+        end_date = end_date or datetime.date.today()
+        if isinstance(end_date, datetime.datetime):
+            end_date = end_date.date()
+
+        intervals = {}
+        for job in jobs:
+            last_date = store.get_last_date(self._store_key(job))
+            if last_date is None:
+                start_date = end_date - datetime.timedelta(days=SYNC_INITIAL_DAYS)
+            else:
+                start_date = min(last_date, end_date) - \
+                    datetime.timedelta(days=SYNC_OVERLAP_DAYS)
+            intervals[job] = (start_date, end_date)
+
+        results = self._fetch_jobs(jobs, intervals.get, max_workers)
+
+        # SQLite se escribe desde un solo thread.
+        synced = []
+        for result in results:
+            if result.error is None:
+                key = self._store_key(result.item)
+                new = store.upsert(key, result.value)
+                store.set_last_date(key, end_date)
+                result = result._replace(value=SyncStats(
+                    *intervals[result.item], len(result.value), new))
+            synced.append(result)
+
+        return synced
+
+    def _store_key(self, job) -> AccountKey:
+        _, account_number, currency = job
+        return AccountKey(self.client.environment, self.client.provider, account_number, currency)
 
     def get_bank_accounts(self):
         # Get user accounts.
         self.out.info('Requesting accounts to Prometeo...')
         accounts = self.client.get_bank_accounts()
-        for index, account in enumerate(accounts):
-            print(f"""
+
+        # Los items son (index, account).
+        show_items(self.out, enumerate(accounts, 1), lambda item: f"""
 --------------------------
-[{index+1}]
-* Name: {account.name}
-* Id: {account.id}
-* Number: {account.number}
-* Currency: {account.currency}
-* Balance: {account.balance}
---------------------------""")
+[{item[0]}]
+* Name: {item[1].name}
+* Id: {item[1].id}
+* Number: {item[1].number}
+* Currency: {item[1].currency}
+* Balance: {item[1].balance}
+--------------------------""",
+                   lines_per_item=9,
+                   row=lambda item: (item[0], item[1].name, item[1].id, item[1].number,
+                                     item[1].currency, item[1].balance),
+                   headers=['#', 'Name', 'Id', 'Number', 'Currency', 'Balance'])
 
         return accounts
 
@@ -133,18 +328,25 @@ Options:
         # Get user accounts.
         self.out.info('Requesting credit cards to Prometeo...')
         accounts = self.client.get_credit_cards()
-        for index, account in enumerate(accounts):
-            print(f"""
+
+        # Los items son (index, card).
+        show_items(self.out, enumerate(accounts, 1), lambda item: f"""
 --------------------------
-[{index+1}]
-* Name: {account.name}
-* Id: {account.id}
-* Number: {account.number}
-* Close date: {self._date_to_str(account.close_date)}
-* Due date: {self._date_to_str(account.due_date)}
-* Balance local: {account.balance_local}
-* Balance (USD): {account.balance_dollar}
---------------------------""")
+[{item[0]}]
+* Name: {item[1].name}
+* Id: {item[1].id}
+* Number: {item[1].number}
+* Close date: {self._date_to_str(item[1].close_date)}
+* Due date: {self._date_to_str(item[1].due_date)}
+* Balance local: {item[1].balance_local}
+* Balance (USD): {item[1].balance_dollar}
+--------------------------""",
+                   lines_per_item=11,
+                   row=lambda item: (item[0], item[1].name, item[1].id, item[1].number,
+                                     self._date_to_str(item[1].close_date),
+                                     self._date_to_str(item[1].due_date),
+                                     item[1].balance_local, item[1].balance_dollar),
+                   headers=['#', 'Name', 'Id', 'Number', 'Close date', 'Due date', 'Balance local', 'Balance (USD)'])
 
         return accounts
 
@@ -167,13 +369,16 @@ Options:
         return datetime.datetime.strptime(string, "%d/%m/%Y")
 
     def _show_movements(self, movements, currency) -> None:
-        for movement in movements:
-            self.out.blue(f"""
+        show_items(self.out, movements, lambda movement: f"""
 --------------------------
 {movement.id} - {movement.reference} - {self._date_to_str(movement.date)}
 * Detail: {movement.detail}
 * Debit: ${currency} {movement.debit or 0}
-* Credit: ${currency} {movement.credit or 0}""")
-
-        # Close.
-        self.out.blue('--------------------------')
+* Credit: ${currency} {movement.credit or 0}
+--------------------------""",
+                   lines_per_item=7,
+                   row=lambda movement: (movement.id, movement.reference, self._date_to_str(movement.date),
+                                         movement.detail, movement.debit or 0, movement.credit or 0),
+                   headers=['Id', 'Reference', 'Date', 'Detail', f'Debit ({currency})', f'Credit ({currency})'],
+                   search_text=lambda movement: f'{movement.id} {movement.reference} {movement.detail}',
+                   color='blue')
@@ -0,0 +1,116 @@
+"""
+Perfil (cProfile) de cada plugin.run y de cada comando del modo batch
+(ver --profile y la opción 'f' del menú).
+"""
+import cProfile
+import datetime
+import os
+import pstats
+import sys
+import threading
+import time
+
+from src.config import CLI_ROOT_DIR, PROFILE_DIR, PROFILE_TOP
+from src.hooks import Observer
+
+# Eventos de src/hooks.py que se perfilan.
+PROFILED_EVENTS = ('plugin.run', 'command')
+
+
+def _location(filename: str, line: int, function: str) -> str:
+    """
+    Función como la muestra pstats, con el path acortado.
+    """
+    if filename == '~':
+        # Función de C (ej: <method 'recv_into' of '_socket.socket' objects>).
+        return function
+    root = str(CLI_ROOT_DIR)
+    if filename.startswith(root):
+        filename = os.path.relpath(filename, root)
+    else:
+        parts = filename.split(os.sep)
+        # De un paquete instalado o de la librería estándar: desde el paquete.
+        for marker in ('site-packages', 'dist-packages'):
+            if marker in parts:
+                parts = parts[parts.index(marker) + 1:]
+                break
+        else:
+            parts = parts[-2:]
+        filename = '/'.join(parts)
+    return f'{filename}:{line}({function})'
+
+
+class PluginProfiler(Observer):
+    """
+    Observer de src/hooks.py: perfila cada plugin.run (o comando), guarda
+    el perfil en directory (se abre con pstats o snakeviz) y muestra las
+    top funciones con más tiempo propio.
+
+    Solo se perfila el thread que ejecuta el plugin: los requests en
+    paralelo (map_concurrently) se ven como tiempo esperando los threads.
+    Si se anidan (ej: los comandos de un script) se perfila el de afuera.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, top: int = PROFILE_TOP, stream=None):
+        self.directory = directory
+        self.top = top
+        self.stream = stream or sys.stderr
+        # Archivos guardados, en orden.
+        self.paths = []
+        self._active = False
+        self._lock = threading.Lock()
+
+    def before(self, event: str, info: dict):
+        if event not in PROFILED_EVENTS:
+            return None
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        return profiler, start, info.get('plugin') or info.get('command')
+
+    def after(self, event: str, state, error: BaseException = None) -> None:
+        if state is None:
+            return
+        profiler, start, name = state
+        profiler.disable()
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._active = False
+
+        try:
+            path = self.save(profiler, name)
+        except OSError as e:
+            path = None
+            print(f'Could not save the profile of {name}: {e}', file=self.stream)
+        self.report(profiler, name, seconds, path)
+
+    def save(self, profiler: cProfile.Profile, name: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f'{name}-{stamp}.prof')
+        index = 1
+        while os.path.exists(path):
+            index += 1
+            path = os.path.join(self.directory, f'{name}-{stamp}-{index}.prof')
+        profiler.dump_stats(path)
+        self.paths.append(path)
+        return path
+
+    def report(self, profiler: cProfile.Profile, name: str, seconds: float, path: str = None) -> None:
+        """
+        Las top funciones por tiempo propio (tottime).
+        """
+        stats = pstats.Stats(profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+
+        lines = [f'\nProfile of {name}: {seconds:.3f} s'
+                 + (f', saved in {os.path.relpath(path)}' if path else '') + '.',
+                 f'{"calls":>10} {"own s":>9} {"total s":>9}  function']
+        for (filename, line, function), (_, calls, own, total, _) in rows:
+            lines.append(f'{calls:>10} {own:9.3f} {total:9.3f}  {_location(filename, line, function)}')
+        print('\n'.join(lines), file=self.stream)
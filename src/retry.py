@@ -0,0 +1,127 @@
+"""
+Reintentos con backoff exponencial y jitter para fallas transitorias.
+"""
+import asyncio
+import email.utils
+import random
+import time
+from typing import Callable
+
+from requests.exceptions import ConnectionError as RequestsConnError
+from requests.exceptions import Timeout as RequestsTimeout
+
+from src.config import (RETRY_ATTEMPTS, RETRY_BACKOFF, RETRY_MAX_DELAY,
+                        RETRY_STATUSES)
+
+# Solo se reintentan requests que no modifican nada.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def parse_retry_after(value: str):
+    """
+    Segundos a esperar según el header Retry-After
+    (en segundos o como fecha HTTP). None si no es válido.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+def retry_reason(reason) -> str:
+    """
+    Motivo de un reintento (lo que recibe on_retry): el status
+    de la respuesta o el nombre de la excepción.
+    """
+    if hasattr(reason, 'status_code'):
+        return str(reason.status_code)
+    return type(reason).__name__
+
+
+class RetryPolicy:
+    """
+    attempts: cantidad máxima de intentos (1 para no reintentar).
+    backoff: espera base en segundos, se duplica en cada reintento
+    (con "full jitter": se espera un tiempo al azar entre 0 y ese valor).
+    max_delay: espera máxima. Si Retry-After pide esperar más, no se reintenta.
+    """
+
+    def __init__(self, attempts: int = RETRY_ATTEMPTS, backoff: float = RETRY_BACKOFF, max_delay: float = RETRY_MAX_DELAY, statuses: tuple = RETRY_STATUSES):
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.statuses = statuses
+
+    def get_delay(self, attempt: int, response=None):
+        """
+        Segundos a esperar antes del reintento número attempt (desde 1),
+        o None si no se debe reintentar.
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_delay else None
+
+        return random.uniform(0, min(self.max_delay, self.backoff * 2 ** (attempt - 1)))
+
+    def call(self, request: Callable, on_retry: Callable = None):
+        """
+        Ejecutar request() reintentando si da error de conexión o
+        devuelve uno de los status de self.statuses.
+        on_retry(attempt, delay, error_or_response) se llama antes de cada reintento.
+        Si se terminan los intentos se devuelve la última respuesta
+        (o se levanta la última excepción).
+        """
+        for attempt in range(1, self.attempts + 1):
+            last_attempt = attempt == self.attempts
+            try:
+                response = request()
+            except (RequestsConnError, RequestsTimeout) as e:
+                if last_attempt:
+                    raise
+                delay = self.get_delay(attempt)
+                reason = e
+            else:
+                if response.status_code not in self.statuses or last_attempt:
+                    return response
+                delay = self.get_delay(attempt, response)
+                if delay is None:
+                    return response
+                reason = response
+
+            if on_retry is not None:
+                on_retry(attempt, delay, reason)
+            time.sleep(delay)
+
+    async def call_async(self, request: Callable, on_retry: Callable = None):
+        """
+        Igual que call, para un request async (await request()).
+        Las excepciones de conexión deben ser las de requests.
+        """
+        for attempt in range(1, self.attempts + 1):
+            last_attempt = attempt == self.attempts
+            try:
+                response = await request()
+            except (RequestsConnError, RequestsTimeout) as e:
+                if last_attempt:
+                    raise
+                delay = self.get_delay(attempt)
+                reason = e
+            else:
+                if response.status_code not in self.statuses or last_attempt:
+                    return response
+                delay = self.get_delay(attempt, response)
+                if delay is None:
+                    return response
+                reason = response
+
+            if on_retry is not None:
+                on_retry(attempt, delay, reason)
+            await asyncio.sleep(delay)
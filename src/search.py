@@ -0,0 +1,118 @@
+"""
+Búsqueda de providers por código, nombre y país.
+"""
+import bisect
+import difflib
+import unicodedata
+from typing import Iterable, List
+
+from prometeo.banking.models import Provider
+
+from src.config import SEARCH_FUZZY_CUTOFF
+
+# Orden de los resultados según cómo coinciden.
+EXACT = 0
+PREFIX = 1
+SUBSTRING = 2
+FUZZY = 3
+
+
+def normalize(text: str) -> str:
+    """
+    Minúsculas y sin tildes, para que 'republica' encuentre 'República'.
+    """
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+class ProviderIndex:
+    """
+    Índice en memoria de una lista de providers. Se arma una vez y
+    después las búsquedas no tienen que normalizar todos los campos:
+
+    - exacta: un diccionario de campo -> providers.
+    - prefijo: una lista ordenada de términos (los campos y cada
+      palabra del nombre), buscando con bisect.
+    - substring: un texto por provider con todos sus campos.
+    - fuzzy (errores de tipeo): difflib sobre los términos, solo si
+      no hay ninguna de las anteriores.
+
+    Los resultados se ordenan por tipo de coincidencia (ver EXACT, etc),
+    después por parecido y después por el orden de la lista original.
+    """
+
+    def __init__(self, providers: Iterable[Provider], fuzzy_cutoff: float = SEARCH_FUZZY_CUTOFF):
+        self.providers = list(providers)
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._exact = {}
+        self._by_term = {}
+        self._texts = []
+        for position, provider in enumerate(self.providers):
+            fields = [normalize(provider.code), normalize(provider.name),
+                      normalize(provider.country)]
+            for field in fields:
+                self._exact.setdefault(field, []).append(position)
+
+            terms = set(fields)
+            terms.update(fields[1].split())
+            for term in terms:
+                self._by_term.setdefault(term, []).append(position)
+
+            # Separados para que no coincida un pedazo de dos campos.
+            self._texts.append('\n'.join(fields))
+
+        self._terms = sorted(self._by_term)
+
+    def __len__(self):
+        return len(self.providers)
+
+    def search(self, query: str, limit: int = None) -> List[Provider]:
+        """
+        Providers que coinciden con query, del más al menos parecido.
+        Con query vacía devuelve todos.
+        """
+        query = normalize(query).strip()
+        if not query:
+            return self.providers[:limit]
+
+        # position -> (tipo de coincidencia, -parecido)
+        ranks = {}
+
+        def add(positions, kind, score=1.0):
+            for position in positions:
+                rank = (kind, -score)
+                if rank < ranks.get(position, (FUZZY + 1, 0)):
+                    ranks[position] = rank
+
+        add(self._exact.get(query, ()), EXACT)
+
+        start = bisect.bisect_left(self._terms, query)
+        for term in self._terms[start:]:
+            if not term.startswith(query):
+                break
+            add(self._by_term[term], PREFIX)
+
+        add((position for position, text in enumerate(self._texts)
+             if query in text), SUBSTRING)
+
+        # Los parecidos solo si no hay otras coincidencias, porque
+        # nombres como 'Banco X' y 'Banco Y' siempre se parecen.
+        if ranks:
+            return self._sorted(ranks, limit)
+
+        matcher = difflib.SequenceMatcher(b=query)
+        for term in self._terms:
+            # Mismo orden de chequeos que difflib.get_close_matches.
+            matcher.set_seq1(term)
+            if (matcher.real_quick_ratio() >= self.fuzzy_cutoff
+                    and matcher.quick_ratio() >= self.fuzzy_cutoff):
+                score = matcher.ratio()
+                if score >= self.fuzzy_cutoff:
+                    add(self._by_term[term], FUZZY, score)
+
+        return self._sorted(ranks, limit)
+
+    def _sorted(self, ranks: dict, limit: int = None) -> List[Provider]:
+        positions = sorted(ranks, key=lambda position: (ranks[position], position))
+        return [self.providers[position] for position in positions[:limit]]
@@ -0,0 +1,107 @@
+"""
+Cache encriptado de la sesión actual (requiere cryptography), para no
+hacer login cada vez que se ejecuta el CLI.
+"""
+import base64
+import json
+import os
+import time
+
+from src.config import (SESSION_CACHE_ITERATIONS, SESSION_CACHE_MAX_AGE,
+                        SESSION_CACHE_PATH)
+from src.exceptions import MissingDependency
+
+SALT_SIZE = 16
+
+
+class SessionCache:
+    """
+    Guarda la session key de cada environment encriptada con Fernet.
+    La clave se deriva de la API key (PBKDF2), así que sin la API key
+    el archivo no sirve, y al cambiar de API key el cache se ignora.
+
+    Formato del archivo: salt (SALT_SIZE bytes) + token de Fernet de
+        {environment: {provider, username, key, saved_at}}
+
+    PBKDF2 es lento a propósito (SESSION_CACHE_ITERATIONS), así que la
+    clave se deriva una sola vez por API key y salt, y al guardar se
+    reusa el salt del archivo.
+    """
+
+    def __init__(self, api_key: str, path: str = SESSION_CACHE_PATH, max_age: float = SESSION_CACHE_MAX_AGE):
+        try:
+            from cryptography.fernet import Fernet, InvalidToken
+            from cryptography.hazmat.primitives import hashes
+            from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        except ImportError:
+            raise MissingDependency(
+                'cryptography is required to remember sessions (pip3 install -r requirements-extras.txt)')
+        self._fernet_class = Fernet
+        self._invalid_token = InvalidToken
+        self._kdf = lambda salt: PBKDF2HMAC(
+            algorithm=hashes.SHA256(), length=32, salt=salt,
+            iterations=SESSION_CACHE_ITERATIONS)
+
+        self.api_key = api_key
+        self.path = path
+        self.max_age = max_age
+        # Salt del archivo (None hasta leerlo o guardarlo).
+        self._salt = None
+        # (api_key, salt) -> Fernet.
+        self._fernets = {}
+
+    def _fernet(self, salt: bytes):
+        fernet = self._fernets.get((self.api_key, salt))
+        if fernet is None:
+            key = self._kdf(salt).derive(self.api_key.encode())
+            fernet = self._fernet_class(base64.urlsafe_b64encode(key))
+            self._fernets[self.api_key, salt] = fernet
+        return fernet
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'rb') as file:
+                content = file.read()
+            salt = content[:SALT_SIZE]
+            if len(salt) == SALT_SIZE:
+                self._salt = salt
+            data = json.loads(self._fernet(salt).decrypt(content[SALT_SIZE:]))
+        except (OSError, ValueError, self._invalid_token):
+            # No existe, está corrupto o es de otra API key.
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, data: dict) -> None:
+        if self._salt is None:
+            self._salt = os.urandom(SALT_SIZE)
+        salt = self._salt
+        token = self._fernet(salt).encrypt(json.dumps(data).encode())
+        try:
+            # Solo el usuario puede leerlo (como .api_key debería).
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(salt + token)
+        except OSError:
+            # El cache es opcional, no debe romper el CLI.
+            pass
+
+    def get(self, environment: str):
+        """
+        Sesión guardada del environment (dict con provider,
+        username y key) o None si no hay o es muy vieja.
+        """
+        session = self._load().get(environment)
+        if not isinstance(session, dict) or time.time() - session.get('saved_at', 0) > self.max_age:
+            return None
+        return session
+
+    def set(self, environment: str, provider: str, username: str, session_key: str) -> None:
+        data = self._load()
+        data[environment] = {'provider': provider, 'username': username,
+                             'key': session_key, 'saved_at': time.time()}
+        self._save(data)
+
+    def clear(self, environment: str) -> None:
+        data = self._load()
+        if data.pop(environment, None) is not None:
+            self._save(data)
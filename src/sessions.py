@@ -0,0 +1,177 @@
+"""
+Pool de sesiones de Prometeo, para trabajar con muchas credenciales
+sin hacer login en cada operación.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+from prometeo.exceptions import PrometeoError
+
+from src.config import SESSION_POOL_SIZE
+
+# Identifica una sesión en el pool.
+SessionId = namedtuple('SessionId', ['environment', 'provider', 'username'])
+
+
+class SessionEntry:
+    """
+    Una sesión del pool, con las credenciales para renovarla.
+    """
+
+    def __init__(self, session_id: SessionId, password: str, login_fields: dict):
+        self.id = session_id
+        self.password = password
+        self.login_fields = login_fields
+        self.key = None
+        # Keys anteriores (renovadas), para reconocer los requests
+        # que se hicieron con una de ellas.
+        self.old_keys = set()
+        # Para que dos threads no hagan login de la misma sesión a la vez.
+        self.lock = threading.Lock()
+
+
+class SessionPool:
+    """
+    Hasta max_sessions sesiones abiertas a la vez, por
+    (environment, provider, username). El login se hace la primera vez
+    que se pide cada sesión y se renueva cuando Prometeo dice que la
+    session key venció (ver refresh). Si el pool está lleno se cierra
+    la sesión usada hace más tiempo.
+
+    get_banking(environment) debe devolver el ExtendedBankingClient
+    de ese environment.
+    """
+
+    def __init__(self, get_banking, max_sessions: int = SESSION_POOL_SIZE):
+        self.get_banking = get_banking
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def acquire(self, environment: str, provider: str, username: str, password: str, **kwargs) -> str:
+        """
+        Session key de esas credenciales, haciendo login solo
+        si no hay una sesión abierta.
+        """
+        session_id = SessionId(environment, provider, username)
+        evicted = []
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry.password is None:
+                # Sesión restaurada (ver adopt): se guardan las
+                # credenciales para poder renovarla.
+                entry.password = password
+                entry.login_fields = kwargs
+            elif entry is None or entry.password != password:
+                if entry is not None:
+                    # Otra contraseña: se cierra la sesión anterior,
+                    # que ya no se podría usar ni cerrar con close_all.
+                    evicted.append(entry)
+                entry = SessionEntry(session_id, password, kwargs)
+                self._sessions[session_id] = entry
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False)[1])
+
+        for old_entry in evicted:
+            self._logout(old_entry)
+
+        with entry.lock:
+            if entry.key is None:
+                try:
+                    entry.key = self._login(entry)
+                except Exception:
+                    # No dejar en el pool credenciales que no funcionan.
+                    self._discard(entry)
+                    raise
+            return entry.key
+
+    def adopt(self, environment: str, provider: str, username: str, session_key: str) -> None:
+        """
+        Agregar una sesión abierta en otro momento (ej: restaurada del
+        SessionCache). Sin las credenciales no se puede renovar hasta
+        que se pidan con acquire.
+        """
+        entry = SessionEntry(SessionId(environment, provider, username), None, {})
+        entry.key = session_key
+        with self._lock:
+            self._sessions[entry.id] = entry
+            self._sessions.move_to_end(entry.id)
+
+    def refresh(self, session_key: str) -> str:
+        """
+        Volver a hacer login de la sesión con esa key (que venció).
+        Devuelve la nueva key, o None si no es del pool.
+        """
+        entry = self._find(session_key)
+        if entry is None or entry.password is None:
+            return None
+
+        with entry.lock:
+            # Otro thread ya la renovó.
+            if entry.key != session_key:
+                return entry.key
+            entry.key = self._login(entry)
+            entry.old_keys.add(session_key)
+            return entry.key
+
+    def release(self, session_key: str) -> bool:
+        """
+        Logout de la sesión con esa key y sacarla del pool.
+        """
+        entry = self._find(session_key)
+        if entry is None:
+            return False
+        self._discard(entry)
+        self._logout(entry)
+        return True
+
+    def close_all(self, environment: str = None, keep: str = None) -> int:
+        """
+        Logout de todas las sesiones (o las de ese environment),
+        menos la que tiene la session key keep.
+        Devuelve la cantidad de sesiones cerradas.
+        """
+        with self._lock:
+            entries = [entry for entry in self._sessions.values()
+                       if (environment is None or entry.id.environment == environment)
+                       and (keep is None or entry.key != keep)]
+            for entry in entries:
+                del self._sessions[entry.id]
+
+        closed = 0
+        for entry in entries:
+            closed += self._logout(entry)
+        return closed
+
+    def _find(self, session_key: str):
+        with self._lock:
+            for entry in self._sessions.values():
+                if entry.key == session_key or session_key in entry.old_keys:
+                    return entry
+        return None
+
+    def _discard(self, entry: SessionEntry) -> None:
+        with self._lock:
+            if self._sessions.get(entry.id) is entry:
+                del self._sessions[entry.id]
+
+    def _login(self, entry: SessionEntry) -> str:
+        session = self.get_banking(entry.id.environment).login(
+            entry.id.provider, entry.id.username, entry.password, **entry.login_fields)
+        return session.get_session_key()
+
+    def _logout(self, entry: SessionEntry) -> bool:
+        if entry.key is None:
+            return False
+        try:
+            self.get_banking(entry.id.environment).logout(entry.key)
+        except (PrometeoError, OSError):
+            # Ya venció, sin conexión, etc: no hay nada más que hacer.
+            return False
+        finally:
+            entry.key = None
+        return True
@@ -0,0 +1,50 @@
+"""
+Tiempos de inicio del CLI (ver --profile-startup).
+"""
+import contextlib
+import sys
+import time
+from collections import namedtuple
+
+# seconds: duración de la fase.
+# modules: módulos importados durante la fase.
+Phase = namedtuple('Phase', ['name', 'seconds', 'modules'])
+
+
+class StartupProfile:
+    """
+    Registra cuánto tarda cada fase del inicio (imports, carga de
+    plugins, etc) y qué módulos se importaron en cada una.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        modules_before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append(Phase(
+                name, time.perf_counter() - start,
+                sorted(set(sys.modules) - modules_before)))
+
+    def report(self, stream=None) -> None:
+        stream = stream or sys.stderr
+        print('Startup profile:', file=stream)
+        for phase in self.phases:
+            # Solo los paquetes de primer nivel que no son de
+            # la librería estándar, para que se lea.
+            packages = sorted({module.split('.')[0] for module in phase.modules}
+                              - set(getattr(sys, 'stdlib_module_names', ())))
+            print(f'  {phase.name:<24} {phase.seconds * 1000:8.1f} ms {len(phase.modules):5} modules  {", ".join(packages)}',
+                  file=stream)
+        print(f'  {"total":<24} {(time.perf_counter() - self.start) * 1000:8.1f} ms',
+              file=stream)
+
+
+# Compartido por main.py y el cargador de plugins.
+profile = StartupProfile()
@@ -0,0 +1,175 @@
+"""
+Base de datos local (SQLite) de movimientos, para sincronizar
+solo lo nuevo en lugar de volver a pedir todo a Prometeo.
+"""
+import datetime
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Iterable, Iterator, List
+
+from prometeo.banking.models import Movement
+
+from src.config import MOVEMENT_STORE_PATH
+
+# Identifica una cuenta (o tarjeta) en una moneda.
+AccountKey = namedtuple(
+    'AccountKey', ['environment', 'provider', 'account', 'currency'])
+
+DATE_FORMAT = '%Y-%m-%d'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS movements (
+    environment TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    account TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    id TEXT NOT NULL,
+    reference TEXT,
+    date TEXT NOT NULL,
+    detail TEXT,
+    debit REAL,
+    credit REAL,
+    PRIMARY KEY (environment, provider, account, currency, id)
+);
+CREATE INDEX IF NOT EXISTS movements_date
+    ON movements (environment, provider, account, currency, date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    environment TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    account TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (environment, provider, account, currency)
+);
+'''
+
+
+def _movement_id(movement) -> str:
+    """
+    Algunos bancos no devuelven id: se arma uno con los demás campos.
+    """
+    if movement.id:
+        return str(movement.id)
+    return ':'.join(str(field) for field in (
+        movement.date.strftime(DATE_FORMAT), movement.reference,
+        movement.detail, movement.debit, movement.credit))
+
+
+def _amount(value):
+    # Prometeo devuelve '' cuando no hay débito/crédito.
+    return value if value not in ('', None) else None
+
+
+class MovementStore:
+    """
+    Movimientos guardados por (environment, provider, cuenta, moneda),
+    junto con la última fecha sincronizada de cada cuenta.
+    """
+
+    def __init__(self, path: str = MOVEMENT_STORE_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_last_date(self, key: AccountKey):
+        """
+        Última fecha sincronizada (datetime.date) o None.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT last_date FROM sync_state WHERE environment = ? AND provider = ? AND account = ? AND currency = ?',
+                tuple(key)).fetchone()
+        if row is None:
+            return None
+        return datetime.datetime.strptime(row[0], DATE_FORMAT).date()
+
+    def set_last_date(self, key: AccountKey, date) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?, ?)',
+                tuple(key) + (date.strftime(DATE_FORMAT), time.time()))
+
+    def count(self, key: AccountKey) -> int:
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM movements WHERE environment = ? AND provider = ? AND account = ? AND currency = ?',
+                tuple(key)).fetchone()[0]
+
+    def upsert(self, key: AccountKey, movements: Iterable[Movement]) -> int:
+        """
+        Insertar o actualizar (por id) los movimientos.
+        Devuelve la cantidad de movimientos nuevos.
+        """
+        before = self.count(key)
+        with self._lock, self._connection:
+            self._connection.executemany(
+                '''INSERT INTO movements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (environment, provider, account, currency, id) DO UPDATE SET
+                    reference = excluded.reference, date = excluded.date, detail = excluded.detail,
+                    debit = excluded.debit, credit = excluded.credit''',
+                (tuple(key) + (_movement_id(movement), movement.reference,
+                               movement.date.strftime(DATE_FORMAT), movement.detail,
+                               _amount(movement.debit), _amount(movement.credit))
+                 for movement in movements))
+        return self.count(key) - before
+
+    def get_movements(self, key: AccountKey, start=None, end=None) -> List[Movement]:
+        """
+        Movimientos guardados en [start, end], ordenados por fecha.
+        """
+        return list(self.iter_movements(key, start, end))
+
+    def iter_movements(self, key: AccountKey, start=None, end=None, batch_size: int = 1000) -> Iterator[Movement]:
+        """
+        Igual que get_movements pero de a batch_size filas,
+        sin cargar todos los movimientos en memoria.
+        """
+        query = 'SELECT id, reference, date, detail, debit, credit FROM movements WHERE environment = ? AND provider = ? AND account = ? AND currency = ?'
+        params = tuple(key)
+        if start is not None:
+            query += ' AND date >= ?'
+            params += (start.strftime(DATE_FORMAT),)
+        if end is not None:
+            query += ' AND date <= ?'
+            params += (end.strftime(DATE_FORMAT),)
+        query += ' ORDER BY date, rowid'
+
+        with self._lock:
+            cursor = self._connection.execute(query, params)
+
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for id, reference, date, detail, debit, credit in rows:
+                yield Movement(id=id, reference=reference,
+                               date=datetime.datetime.strptime(date, DATE_FORMAT),
+                               detail=detail, debit=debit, credit=credit)
+
+    def get_accounts(self, environment: str, provider: str = None) -> List[AccountKey]:
+        """
+        Cuentas con movimientos sincronizados.
+        """
+        query = 'SELECT environment, provider, account, currency FROM sync_state WHERE environment = ?'
+        params = (environment,)
+        if provider is not None:
+            query += ' AND provider = ?'
+            params += (provider,)
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [AccountKey(*row) for row in rows]
@@ -0,0 +1,146 @@
+"""
+Trazas de la ejecución (ver --trace): spans anidados de los plugins,
+las llamadas a la API y cada request HTTP, para ver cuánto del tiempo
+de una acción es red y cuánto es formateo o esperar al usuario.
+"""
+import abc
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import List
+
+from src.hooks import Observer
+
+
+class Span:
+    """
+    parent_id: el span que estaba activo cuando empezó (en el mismo
+    thread o tarea de asyncio), None si es de primer nivel.
+    lane: thread (y tarea de asyncio) donde se ejecutó.
+    end es None en los eventos instantáneos (ej: retry).
+    """
+
+    __slots__ = ('id', 'parent_id', 'name', 'category', 'start', 'end', 'lane', 'args')
+
+    def __init__(self, id: int, parent_id: int, name: str, category: str, start: float, lane: str, args: dict):
+        self.id = id
+        self.parent_id = parent_id
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end = None
+        self.lane = lane
+        self.args = args
+
+
+def _span_name(event: str, info: dict) -> str:
+    if 'plugin' in info:
+        return f'{info["plugin"]} {event.split(".")[-1]}'
+    if 'endpoint' in info:
+        prefix = {'http.request': 'HTTP ', 'retry': 'retry ', 'cache.hit': 'cached '}.get(event, '')
+        return f'{prefix}{info["method"]} {info["endpoint"]}'
+    if 'command' in info:
+        return f'command {info["command"]}'
+    return event
+
+
+def _lane() -> str:
+    name = threading.current_thread().name
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        # No hay un event loop corriendo.
+        task = None
+    return f'{name} / {task.get_name()}' if task is not None else name
+
+
+class TraceExporter(metaclass=abc.ABCMeta):
+    """
+    Guarda los spans terminados (se llama una vez, al cerrar el Tracer).
+    start: perf_counter del inicio de la traza.
+    """
+
+    @abc.abstractmethod
+    def export(self, spans: List[Span], start: float) -> None:
+        raise NotImplementedError
+
+
+class ChromeTraceExporter(TraceExporter):
+    """
+    Trace Event Format (JSON) de Chrome, se abre con https://ui.perfetto.dev
+    o chrome://tracing. Cada thread o tarea de asyncio es una fila.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span], start: float) -> None:
+        pid = os.getpid()
+        lanes = {}
+        events = []
+        for span in sorted(spans, key=lambda span: span.start):
+            tid = lanes.setdefault(span.lane, len(lanes) + 1)
+            event = {'name': span.name, 'cat': span.category, 'pid': pid, 'tid': tid,
+                     'ts': round((span.start - start) * 1e6, 3),
+                     'args': {'span_id': span.id, 'parent_id': span.parent_id, **span.args}}
+            if span.end is None:
+                event.update(ph='i', s='t')
+            else:
+                event.update(ph='X', dur=round((span.end - span.start) * 1e6, 3))
+            events.append(event)
+
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                       'args': {'name': 'prometeo-cli'}})
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                       'args': {'name': lane}} for lane, tid in lanes.items())
+
+        with open(self.path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file, default=str)
+
+
+class Tracer(Observer):
+    """
+    Observer de src/hooks.py que arma un span por evento. El span activo
+    se guarda en una ContextVar, así los spans de cada thread y de cada
+    tarea de asyncio tienen el padre correcto.
+    """
+
+    def __init__(self, exporter: TraceExporter):
+        self.exporter = exporter
+        self.spans = []
+        self.start = time.perf_counter()
+        self._current = contextvars.ContextVar('current_span', default=None)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _span(self, event: str, info: dict) -> Span:
+        parent = self._current.get()
+        return Span(next(self._ids), parent.id if parent is not None else None,
+                    _span_name(event, info), event, time.perf_counter(), _lane(), info)
+
+    def before(self, event: str, info: dict):
+        span = self._span(event, info)
+        return span, self._current.set(span)
+
+    def after(self, event: str, state, error: BaseException = None) -> None:
+        span, token = state
+        span.end = time.perf_counter()
+        if error is not None:
+            span.args['error'] = type(error).__name__
+        self._current.reset(token)
+        with self._lock:
+            self.spans.append(span)
+
+    def notify(self, event: str, info: dict) -> None:
+        span = self._span(event, info)
+        with self._lock:
+            self.spans.append(span)
+
+    def close(self) -> None:
+        with self._lock:
+            spans = list(self.spans)
+        self.exporter.export(spans, self.start)
@@ -0,0 +1,85 @@
+"""
+Sesión HTTP compartida por todos los requests a Prometeo.
+"""
+import threading
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.config import HTTP_CONNECT_TIMEOUT, HTTP_POOL_SIZE, HTTP_READ_TIMEOUT
+
+# requests: requests HTTP enviados.
+# connections: conexiones (TCP/TLS) abiertas para enviarlos.
+# reused: requests que reusaron una conexión abierta (keep-alive).
+ConnectionStats = namedtuple(
+    'ConnectionStats', ['requests', 'connections', 'reused'])
+
+
+class CountingAdapter(HTTPAdapter):
+    """
+    HTTPAdapter que cuenta los requests enviados y las conexiones
+    abiertas, para poder verificar que se reusan.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        adapter = self
+
+        # Los pools de urllib3 llaman a _new_conn cada vez que
+        # necesitan abrir una conexión.
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                adapter._count('connections')
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                adapter._count('connections')
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool
+        }
+
+    def send(self, *args, **kwargs):
+        self._count('requests')
+        return super().send(*args, **kwargs)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session con un pool de hasta pool_size conexiones
+    keep-alive por host y timeouts por defecto (connect, read).
+    Es thread-safe para el uso que le dan los plugins.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, timeout: tuple = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+        super().__init__()
+        self.timeout = timeout
+        self.adapter = CountingAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('https://', self.adapter)
+        self.mount('http://', self.adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+    def connection_stats(self) -> ConnectionStats:
+        requests_sent = self.adapter.requests
+        connections = self.adapter.connections
+        return ConnectionStats(requests_sent, connections, max(0, requests_sent - connections))
@@ -28,6 +28,7 @@ from typing import Any, Callable
 
 import src.exceptions as exceptions
 from src.config import AVAILABLE_DATATYPES, DEFAULT_INPUT_PREFIX
+from src.hooks import hooks
 
 
 class Utils:
@@ -59,7 +60,8 @@ class Utils:
 
         while True:
             sys.stdout.write(question + prompt)
-            choice = input().lower()
+            with hooks.around('prompt'):
+                choice = input().lower()
             if default is not None and choice == '':
                 return valid[default]
             elif choice in valid:
@@ -83,7 +85,8 @@ class Utils:
 
         # Ejecutar hasta conseguir un input válido.
         while True:
-            user_input = input(input_prefix)
+            with hooks.around('prompt'):
+                user_input = input(input_prefix)
             if user_input.strip() == '':
                 if required:
                     self.out.yellow('Input required.')
@@ -101,10 +104,11 @@ class Utils:
             return option
 
     def get_password(self, input_prefix: str = 'Password: ') -> str:
-        try:
-            password = getpass(input_prefix)
-        except GetPassWarning:
-            print('Unable to turn echo off for password input.')
-            password = input(input_prefix)
+        with hooks.around('prompt'):
+            try:
+                password = getpass(input_prefix)
+            except GetPassWarning:
+                print('Unable to turn echo off for password input.')
+                password = input(input_prefix)
 
         return password
@@ -0,0 +1,70 @@
+"""
+Fixtures compartidas: el servidor local de benchmarks/mock_server.py y
+clientes que apuntan a él, sin escribir caches en la carpeta del CLI.
+"""
+import socket
+
+import pytest
+
+import src.config as config
+from benchmarks.mock_server import MockPrometeo
+from src.client import PrometeoClient
+from src.retry import RetryPolicy
+
+# Environment que apunta al servidor local.
+ENVIRONMENT = 'mock'
+
+
+@pytest.fixture
+def server():
+    with MockPrometeo() as server:
+        yield server
+
+
+@pytest.fixture
+def environment(server, monkeypatch):
+    monkeypatch.setitem(config.ENVIRONMENTS, ENVIRONMENT, server.url)
+    return ENVIRONMENT
+
+
+@pytest.fixture
+def closed_url(monkeypatch):
+    """
+    Environment con una URL donde no escucha nadie (conexión rechazada).
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setitem(config.ENVIRONMENTS, 'closed', f'http://127.0.0.1:{port}/')
+    return 'closed'
+
+
+@pytest.fixture
+def make_client(server, environment):
+    """
+    make_client(**options) -> PrometeoClient del servidor local, sin cache
+    de providers en disco y con reintentos sin espera.
+    """
+    clients = []
+
+    def make_client(**options):
+        options.setdefault('retry_policy', RetryPolicy(attempts=3, backoff=0.001))
+        client = PrometeoClient(server.api_key, environment, **options)
+        client.provider_cache = None
+        clients.append(client)
+        return client
+
+    yield make_client
+    for client in clients:
+        client.close_sessions()
+
+
+@pytest.fixture
+def client(make_client):
+    """
+    Cliente con sesión (login en el provider 'test', como SessionPlugin.login).
+    """
+    client = make_client()
+    client.login('test', 'user', 'password')
+    client.status = config.LOGGED_IN_STATUS
+    return client
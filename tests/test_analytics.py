@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+
+import src.analytics as analytics
+from src.analytics import REPORTS, MovementFrame
+
+
+def day(number: int, month: int = 1) -> datetime.date:
+    return datetime.date(2022, month, number)
+
+
+ROWS = [
+    ('001', 'UYU', '1', 'r1', day(3), 'SUPERMERCADO', '100', ''),
+    ('001', 'UYU', '2', 'r2', day(3), 'SUELDO', '', '1000'),
+    ('001', 'UYU', '3', 'r3', day(5, 2), 'SUPERMERCADO', '50.25', None),
+    ('002', 'UYU', '4', 'r4', day(4), 'SUPERMERCADO', '30', ''),
+    ('003', 'USD', '5', 'r5', day(1), 'TRANSFERENCIA', '', '200'),
+]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def frame(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(analytics, 'np', None)
+    return MovementFrame.from_rows(ROWS)
+
+
+def test_totals(frame):
+    assert frame.totals() == [
+        ('001', 'UYU', 3, 150.25, 1000.0, 849.75, day(3), day(5, 2)),
+        ('002', 'UYU', 1, 30.0, 0.0, -30.0, day(4), day(4)),
+        ('003', 'USD', 1, 0.0, 200.0, 200.0, day(1), day(1)),
+    ]
+
+
+def test_monthly(frame):
+    assert [row[:4] for row in frame.monthly()] == [
+        ('001', 'UYU', '2022-01', 2), ('001', 'UYU', '2022-02', 1),
+        ('002', 'UYU', '2022-01', 1), ('003', 'USD', '2022-01', 1),
+    ]
+
+
+def test_balances_start_at_zero_for_each_account(frame):
+    assert [row[-1] for row in frame.balances()] == [900.0, 849.75, -30.0, 200.0]
+
+
+def test_counterparties_join_accounts_of_the_same_currency(frame):
+    assert frame.counterparties(top=1) == [
+        ('USD', 'TRANSFERENCIA', 1, 0.0, 200.0),
+        ('UYU', 'SUELDO', 1, 0.0, 1000.0),
+    ]
+    assert frame.counterparties()[2] == ('UYU', 'SUPERMERCADO', 3, 180.25, 0.0)
+
+
+def test_empty_frame(frame):
+    empty = MovementFrame.from_rows([])
+    for _, report in REPORTS.values():
+        assert report(empty, 10) == []
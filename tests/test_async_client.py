@@ -0,0 +1,190 @@
+import asyncio
+import datetime
+from urllib.parse import parse_qs
+
+import pytest
+from prometeo import exceptions
+from prometeo.banking.models import Movement
+from requests.exceptions import ConnectionError as RequestsConnError
+
+import src.config as config
+from src.async_client import AsyncPrometeoClient
+from src.client import PrometeoClient
+from src.retry import RetryPolicy
+
+httpx = pytest.importorskip('httpx')
+
+DATE_FORMAT = '%d/%m/%Y'
+
+
+def movements_data(start: datetime.datetime, end: datetime.datetime) -> list:
+    """
+    Dos movimientos por día y, en cada respuesta, el mismo
+    movimiento pendiente (se repite entre ventanas).
+    """
+    movements = [{'id': 'pending', 'reference': 'ref', 'date': start.strftime(DATE_FORMAT),
+                  'detail': 'PENDIENTE', 'debit': 1.0, 'credit': ''}]
+    day = start
+    while day <= end:
+        movements += [{'id': f'{day:%m%d}-{index}', 'reference': 'ref',
+                       'date': day.strftime(DATE_FORMAT), 'detail': 'COMPRA',
+                       'debit': 1.0, 'credit': ''} for index in range(2)]
+        day += datetime.timedelta(days=1)
+    return movements
+
+
+class FakePrometeo:
+    """
+    Handler de httpx.MockTransport con las respuestas de la API de banking.
+    fail: status con los que se responde a los próximos requests.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.fail = []
+        self.sessions = set()
+
+    def __call__(self, request):
+        path = request.url.path
+        self.requests.append((request.method, path))
+        if self.fail:
+            return httpx.Response(self.fail.pop(0), json={})
+
+        if path == '/login/':
+            form = parse_qs(request.content.decode())
+            if form['password'] == ['wrong']:
+                return httpx.Response(403, json={'status': 'wrong_credentials'})
+            key = f'key-{len(self.sessions)}'
+            self.sessions.add(key)
+            return httpx.Response(200, json={'status': 'logged_in', 'key': key})
+        if path == '/provider/':
+            return httpx.Response(200, json={'status': 'success', 'providers': [
+                {'code': 'test', 'country': 'UY', 'name': 'Test'}]})
+
+        params = request.url.params
+        if params.get('key') not in self.sessions:
+            return httpx.Response(200, json={'status': 'error', 'message': 'Invalid key'})
+        if path == '/logout/':
+            self.sessions.discard(params['key'])
+            return httpx.Response(200, json={'status': 'logged_out'})
+        if path == '/movement/':
+            start, end = (datetime.datetime.strptime(params[name], DATE_FORMAT)
+                          for name in ('date_start', 'date_end'))
+            return httpx.Response(200, json={'status': 'success', 'movements': movements_data(start, end)})
+        return httpx.Response(404, json={})
+
+
+@pytest.fixture
+def api():
+    return FakePrometeo()
+
+
+@pytest.fixture
+def make_client(api):
+    """
+    make_client(**options) -> AsyncPrometeoClient que le habla a api.
+    """
+    def make_client(**options):
+        options.setdefault('retry_policy', RetryPolicy(attempts=3, backoff=0.001))
+        client = AsyncPrometeoClient('key', 'sandbox', **options)
+        client.provider_cache = None
+        client._http = httpx.AsyncClient(
+            transport=httpx.MockTransport(api),
+            base_url=config.ENVIRONMENTS['sandbox'])
+        return client
+
+    return make_client
+
+
+def run(make_client, func, **options):
+    async def main():
+        async with make_client(**options) as client:
+            return await func(client)
+
+    return asyncio.run(main())
+
+
+def test_login_and_logout(make_client):
+    async def session(client):
+        await client.login('test', 'user', 'password')
+        key = client.get_session_key()
+        assert await client.logout()
+        return key, client.get_session_key()
+
+    assert run(make_client, session) == ('key-0', None)
+
+
+def test_wrong_credentials(make_client):
+    async def login(client):
+        await client.login('test', 'user', 'wrong')
+
+    with pytest.raises(exceptions.WrongCredentialsError):
+        run(make_client, login)
+
+
+def test_invalid_session_key(make_client):
+    async def accounts(client):
+        await client.get_bank_accounts()
+
+    with pytest.raises(exceptions.InvalidSessionKeyError):
+        run(make_client, accounts, session_key='expired')
+
+
+def test_retries_get_but_not_post(make_client, api):
+    async def requests(client):
+        api.fail = [503, 502]
+        assert [provider.code for provider in await client.get_providers()] == ['test']
+        api.fail = [503]
+        with pytest.raises(exceptions.ProviderUnavailableError):
+            await client.login('test', 'user', 'password')
+
+    run(make_client, requests)
+    assert api.requests == [('GET', '/provider/')] * 3 + [('POST', '/login/')]
+
+
+def test_method_case_does_not_change_retries(make_client, api):
+    async def requests(client):
+        api.fail = [503]
+        await client._call_api('get', '/provider/')
+        api.fail = [503]
+        with pytest.raises(exceptions.ProviderUnavailableError):
+            await client._call_api('post', '/login/', data={})
+
+    run(make_client, requests)
+    assert api.requests == [('GET', '/provider/')] * 2 + [('POST', '/login/')]
+
+
+def test_connection_errors_are_the_ones_of_requests(make_client, api):
+    def refuse(request):
+        raise httpx.ConnectError('refused')
+
+    async def providers(client):
+        await client._http.aclose()
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(refuse),
+                                         base_url='https://prometeo.test/')
+        await client.get_providers()
+
+    with pytest.raises(RequestsConnError):
+        run(make_client, providers)
+
+
+def test_windows_match_the_sync_client(make_client, monkeypatch):
+    start, end = datetime.datetime(2022, 1, 1), datetime.datetime(2022, 3, 3)
+
+    def fetch(session_key, account_number, currency_code, start, end):
+        return [Movement(**{**data, 'date': datetime.datetime.strptime(data['date'], DATE_FORMAT)})
+                for data in movements_data(start, end)]
+
+    sync_client = PrometeoClient('key', 'sandbox')
+    sync_client.window_days = 7
+    monkeypatch.setattr(sync_client._banking, 'get_movements', fetch)
+    expected = sync_client.get_movements('001', 'UYU', start, end)
+
+    async def movements(client):
+        await client.login('test', 'user', 'password')
+        client.window_days = 7
+        return await client.get_movements('001', 'UYU', start, end)
+
+    movements = run(make_client, movements)
+    assert len(movements) == 62 * 2 + 1
+    assert movements == expected
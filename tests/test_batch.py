@@ -0,0 +1,129 @@
+import argparse
+import datetime
+
+import pytest
+
+import src.config as config
+from src.batch import Batch
+from src.cache import ProviderCache
+from src.commands import add_batch_commands
+from src.output import Output
+from src.plugins.transactions_plugin import DEFAULT_DAY_INTERVAL
+from src.retry import RetryPolicy
+
+CREDENTIALS = ['--provider', 'test', '--username', 'user', '--password', 'password']
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """
+    Sin API key guardada ni en el entorno, y con el cache de
+    providers en una carpeta temporal.
+    """
+    monkeypatch.setattr(config, 'API_KEY_PATH', str(tmp_path / '.api_key'))
+    for name in ('PROMETEO_API_KEY', 'PROMETEO_PROVIDER', 'PROMETEO_USERNAME', 'PROMETEO_PASSWORD'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr('src.client.ProviderCache',
+                        lambda: ProviderCache(str(tmp_path / 'providers.json')))
+
+
+@pytest.fixture
+def run(server, environment):
+    """
+    run(*argv, api_key=..., environment=...) -> exit code del comando.
+    """
+    parser = argparse.ArgumentParser()
+    add_batch_commands(parser.add_subparsers(dest='command', required=True))
+
+    def run(*argv, api_key: str = server.api_key, environment: str = environment):
+        options = {'retry_policy': RetryPolicy(attempts=1)}
+        batch = Batch(Output(False, quiet=True), api_key, environment, options)
+        return batch.run(parser.parse_args(argv))
+
+    return run
+
+
+def test_ok(run, capsys):
+    assert run('accounts', 'list', *CREDENTIALS) == config.EXIT_OK
+    assert len(capsys.readouterr().out.splitlines()) == 4
+
+
+def test_usage_error(run):
+    assert run('movements', *CREDENTIALS) == config.EXIT_USAGE
+
+
+def test_missing_api_key(run):
+    assert run('accounts', 'list', *CREDENTIALS, api_key='') == config.EXIT_USAGE
+
+
+def test_invalid_api_key(run):
+    assert run('accounts', 'list', *CREDENTIALS, api_key='invalid') == config.EXIT_AUTH_ERROR
+
+
+def test_wrong_credentials(run):
+    assert run('accounts', 'list', '--provider', 'test', '--username', 'user',
+               '--password', 'wrong') == config.EXIT_AUTH_ERROR
+
+
+def test_missing_credentials(run):
+    assert run('accounts', 'list', '--provider', 'test') == config.EXIT_AUTH_ERROR
+
+
+def test_not_found(run):
+    assert run('providers', 'search', 'zzzzzz') == config.EXIT_NOT_FOUND
+
+
+def test_server_error(run, server):
+    server.error_rate = 1
+    assert run('accounts', 'list', *CREDENTIALS) == config.EXIT_ERROR
+
+
+def test_connection_error(run, closed_url):
+    assert run('providers', 'list', environment=closed_url) == config.EXIT_CONNECTION_ERROR
+
+
+def test_partial_failure(run, capsys):
+    assert run('providers', 'detail', 'test', 'missing') == config.EXIT_ERROR
+    assert capsys.readouterr().out.startswith('test\t')
+
+
+def test_script_returns_the_first_failure(run, tmp_path):
+    script = tmp_path / 'script.txt'
+    script.write_text('\n'.join([
+        '# comentario',
+        'accounts list ' + ' '.join(CREDENTIALS),
+        'providers search zzzzzz',
+        'movements --bad-option',
+        'cards list ' + ' '.join(CREDENTIALS),
+    ]))
+    assert run('script', str(script)) == config.EXIT_NOT_FOUND
+    assert run('script', str(script), '--stop-on-error') == config.EXIT_NOT_FOUND
+    assert run('script', str(tmp_path / 'missing.txt')) == config.EXIT_USAGE
+
+
+def days_ago(days: int) -> str:
+    return (datetime.date.today() - datetime.timedelta(days=days)).strftime('%d/%m/%Y')
+
+
+def test_movements_from_only(run, server, capsys):
+    # --to es hoy por defecto: 3 días más hoy.
+    assert run('movements', *CREDENTIALS, '--account', '00100000', '--currency', 'UYU',
+               '--from', days_ago(3)) == config.EXIT_OK
+    assert len(capsys.readouterr().out.splitlines()) == 4 * server.movements_per_day
+
+
+def test_movements_to_only(run, server, capsys):
+    # --from es DEFAULT_DAY_INTERVAL días antes de hoy por defecto.
+    assert run('movements', *CREDENTIALS, '--account', '00100000', '--currency', 'UYU',
+               '--to', days_ago(2)) == config.EXIT_OK
+    assert len(capsys.readouterr().out.splitlines()) == \
+        (DEFAULT_DAY_INTERVAL - 1) * server.movements_per_day
+
+
+def test_analytics_from_only(run):
+    assert run('analytics', 'totals', *CREDENTIALS, '--all', '--from', days_ago(3)) == config.EXIT_OK
+
+
+def test_invalid_interval(run):
+    assert run('movements', *CREDENTIALS, '--account', '00100000', '--currency', 'UYU',
+               '--from', days_ago(0), '--to', days_ago(3)) == config.EXIT_USAGE
@@ -0,0 +1,168 @@
+import json
+import time
+from collections import namedtuple
+
+import pytest
+
+from src.cache import ProviderCache, ResponseCache
+
+Response = namedtuple('Response', ['status_code', 'headers'])
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'providers.json')
+
+
+def wait_revalidation(cache: ProviderCache) -> None:
+    deadline = time.monotonic() + 1
+    while cache._revalidating and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fetch_only_calls_once_while_fresh(path):
+    cache = ProviderCache(path)
+    calls = []
+    fetch = lambda: calls.append(1) or len(calls)
+    assert cache.fetch('sandbox', 'providers', fetch) == 1
+    assert cache.fetch('sandbox', 'providers', fetch) == 1
+    assert cache.fetch('sandbox', 'providers', fetch, refresh=True) == 2
+    # Los environments no comparten datos.
+    assert cache.fetch('testing', 'providers', fetch) == 3
+
+
+def test_expired_value_is_returned_and_revalidated(path):
+    cache = ProviderCache(path, ttl=0)
+    cache.set('sandbox', 'providers', 'old')
+    assert cache.fetch('sandbox', 'providers', lambda: 'new') == 'old'
+    wait_revalidation(cache)
+    assert cache.get('sandbox', 'providers') == ('new', False)
+
+
+def test_failed_revalidation_keeps_the_old_value(path):
+    cache = ProviderCache(path, ttl=0)
+    cache.set('sandbox', 'providers', 'old')
+
+    def fetch():
+        raise OSError('sin conexión')
+
+    assert cache.fetch('sandbox', 'providers', fetch) == 'old'
+    wait_revalidation(cache)
+    assert cache.get('sandbox', 'providers') == ('old', False)
+
+
+def test_saved_between_instances(path):
+    ProviderCache(path).set('sandbox', 'provider/test', {'name': 'Test'})
+    assert ProviderCache(path).get('sandbox', 'provider/test') == ({'name': 'Test'}, True)
+
+
+def test_corrupt_file_starts_empty(path):
+    with open(path, 'w') as file:
+        file.write('{no es json')
+    cache = ProviderCache(path)
+    assert cache.get('sandbox', 'providers') is None
+    cache.set('sandbox', 'providers', [])
+    with open(path) as file:
+        assert 'providers' in json.load(file)['sandbox']
+
+
+def test_clear_by_prefix(path):
+    cache = ProviderCache(path)
+    for key in ('providers', 'provider/a', 'provider/b'):
+        cache.set('sandbox', key, key)
+    cache.clear('sandbox', 'provider/')
+    assert cache.get('sandbox', 'providers') is not None
+    assert cache.get('sandbox', 'provider/a') is None
+
+
+def response(etag: str = None) -> Response:
+    return Response(200, {'ETag': etag} if etag else {})
+
+
+def key(cache: ResponseCache, url: str = '/account/', session_key: str = 'key'):
+    return cache.key('sandbox', 'GET', url, {'key': session_key})
+
+
+def test_only_read_endpoints_are_cached():
+    cache = ResponseCache()
+    assert key(cache) is not None
+    assert key(cache, '/credit-card/4111/movements') is not None
+    assert cache.key('sandbox', 'POST', '/account/', {}) is None
+    assert cache.key('sandbox', 'GET', '/logout/', {}) is None
+
+
+def test_key_depends_on_environment_and_params():
+    cache = ResponseCache()
+    assert key(cache) == cache.key('sandbox', 'get', '/account', {'key': 'key'})
+    assert key(cache) != key(cache, session_key='other')
+    assert key(cache) != cache.key('testing', 'GET', '/account/', {'key': 'key'})
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl=0.05)
+    cache.set(key(cache), response())
+    assert cache.get(key(cache)) == (response(), True)
+    time.sleep(0.06)
+    # Sin ETag no se puede validar: se descarta.
+    assert cache.get(key(cache)) is None
+    assert len(cache) == 0
+
+
+def test_expired_entries_with_etag_are_kept_until_renewed():
+    cache = ResponseCache(ttl=0.05)
+    cache.set(key(cache), response('"v1"'))
+    time.sleep(0.06)
+    assert cache.get(key(cache)) == (response('"v1"'), False)
+    cache.renew(key(cache))
+    assert cache.get(key(cache)) == (response('"v1"'), True)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(size=2)
+    first, second, third = (key(cache, session_key=name) for name in ('a', 'b', 'c'))
+    cache.set(first, response())
+    cache.set(second, response())
+    cache.get(first)
+    cache.set(third, response())
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+
+
+def test_client_answers_repeated_requests_from_cache(client, server):
+    assert client.get_bank_accounts() == client.get_bank_accounts()
+    assert server.requests['account'] == 1
+
+
+def test_client_revalidates_with_etag(client, server):
+    server.etags = True
+    client.response_cache = ResponseCache(ttl=0.05)
+
+    accounts = client.get_bank_accounts()
+    time.sleep(0.06)
+    # Vencida: se pregunta si cambió (304) y se renueva.
+    assert client.get_bank_accounts() == accounts
+    assert client.get_bank_accounts() == accounts
+
+    assert server.requests['account'] == 2
+    statuses = {name: endpoint.statuses for (_, name), endpoint in client.metrics.snapshot()}
+    assert statuses['/account'] == {'200': 1, '304': 1}
+
+
+def test_client_clears_cache_on_logout(client):
+    client.get_bank_accounts()
+    assert len(client.response_cache) == 1
+    client.logout()
+    assert len(client.response_cache) == 0
+
+
+def test_client_clears_cache_on_environment_change(client):
+    client.get_bank_accounts()
+    client.environment = 'sandbox'
+    assert len(client.response_cache) == 0
+
+
+def test_client_clears_cache_on_api_key_change(client, server):
+    client.get_bank_accounts()
+    client.api_key = server.api_key
+    assert len(client.response_cache) == 0
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+from src.client import PrometeoClient
+from src.concurrency import (AsyncThrottle, Throttle, TokenBucket,
+                             gather_concurrently, map_concurrently)
+
+
+class TimedSession:
+    """
+    requests.Session que responde 200 y anota cuándo se envió cada request.
+    """
+
+    def __init__(self):
+        self.times = []
+
+    def request(self, method, url, *args, **kwargs):
+        self.times.append(time.monotonic())
+        response = requests.Response()
+        response.status_code = 200
+        response.request = requests.Request(method, url).prepare()
+        response._content = b'{}'
+        return response
+
+
+def test_map_concurrently_keeps_order_and_errors():
+    def func(item):
+        if item == 2:
+            raise ValueError(item)
+        return item * 10
+
+    results = map_concurrently(func, range(4), max_workers=4)
+    assert [result.item for result in results] == [0, 1, 2, 3]
+    assert [result.value for result in results] == [0, 10, None, 30]
+    assert isinstance(results[2].error, ValueError)
+
+
+def test_map_concurrently_uses_at_most_max_workers():
+    lock = threading.Lock()
+    threads = set()
+
+    def func(item):
+        with lock:
+            threads.add(threading.get_ident())
+        time.sleep(0.01)
+
+    map_concurrently(func, range(10), max_workers=3)
+    assert len(threads) <= 3
+    assert map_concurrently(func, [], max_workers=3) == []
+
+
+def test_token_bucket_without_rate_never_waits():
+    bucket = TokenBucket(rate=None)
+    assert [bucket.reserve() for _ in range(100)] == [0] * 100
+
+
+def test_token_bucket_allows_burst_then_spaces_calls():
+    bucket = TokenBucket(rate=10, burst=3)
+    delays = [bucket.reserve() for _ in range(5)]
+    assert delays[:3] == [0, 0, 0]
+    # Cada token de más es una "deuda" de 1 / rate segundos.
+    assert delays[3] == pytest.approx(0.1, abs=0.01)
+    assert delays[4] == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=100, burst=1)
+    assert bucket.reserve() == 0
+    time.sleep(0.02)
+    assert bucket.reserve() == 0
+
+
+def test_throttle_limits_requests_in_flight():
+    throttle = Throttle(max_in_flight=2)
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def request(_):
+        with throttle:
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+    map_concurrently(request, range(10), max_workers=8)
+    assert peak[0] == 2
+
+
+def test_throttle_limits_rate():
+    throttle = Throttle(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        with throttle:
+            pass
+    # El primero pasa de una, los otros 5 esperan 1 / 50 segundos cada uno.
+    assert time.monotonic() - start >= 0.09
+
+
+def test_async_throttle_limits_requests_in_flight():
+    throttle = AsyncThrottle(max_in_flight=2)
+    in_flight = [0]
+    peak = [0]
+
+    async def request(_):
+        async with throttle:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+
+    asyncio.run(gather_concurrently(request, range(10)))
+    assert peak[0] == 2
+
+
+def test_gather_concurrently_keeps_order_and_errors():
+    async def func(item):
+        await asyncio.sleep(0.01 * (4 - item))
+        if item == 2:
+            raise ValueError(item)
+        return item * 10
+
+    results = asyncio.run(gather_concurrently(func, range(4)))
+    assert [result.value for result in results] == [0, 10, None, 30]
+    assert isinstance(results[2].error, ValueError)
+
+
+def test_client_throttles_every_request():
+    client = PrometeoClient('key', 'sandbox', rate_limit={'rate': 50, 'burst': 1})
+    client._banking._client_session = session = TimedSession()
+    for _ in range(6):
+        client._banking.make_request('POST', '/login/')
+    assert session.times[-1] - session.times[0] >= 0.09
+
+
+def test_client_rate_limit_overrides_the_environment_limits():
+    client = PrometeoClient('key', 'sandbox', rate_limit={'rate': 50})
+    assert client.throttle.bucket.rate == 50
+    assert client.throttle.max_in_flight == 8
+
+    client.environment = 'production'
+    assert client.throttle.bucket.rate == 50
+    assert client.throttle.max_in_flight == 16
+    assert client._banking.throttle is client.throttle
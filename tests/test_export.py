@@ -0,0 +1,76 @@
+import csv
+import datetime
+import io
+import json
+import sys
+
+import pytest
+from prometeo.banking.models import Movement
+
+from src.exceptions import MissingDependency
+from src.export import MOVEMENT_FIELDS, export, movement_row
+
+ROWS = [('1', 'ref 1', datetime.datetime(2022, 1, 5), 'COMPRA, SUPERMERCADO', 10.5, None),
+        ('2', 'ref "2"', datetime.date(2022, 1, 6), 'DEPOSITO', None, 20)]
+
+
+def exported(format: str) -> str:
+    stream = io.StringIO()
+    assert export(ROWS, MOVEMENT_FIELDS, format, stream) == len(ROWS)
+    return stream.getvalue()
+
+
+def test_movement_row_without_amount():
+    movement = Movement('1', 'ref', datetime.datetime(2022, 1, 5), 'COMPRA', 10.5, '')
+    assert movement_row(movement) == ('1', 'ref', datetime.datetime(2022, 1, 5), 'COMPRA', 10.5, None)
+
+
+def test_tsv():
+    assert exported('tsv').splitlines() == [
+        '1\tref 1\t05/01/2022\tCOMPRA, SUPERMERCADO\t10.5\t',
+        '2\tref "2"\t06/01/2022\tDEPOSITO\t\t20',
+    ]
+
+
+def test_tsv_escapes_separators():
+    rows = [('1', 'ref\t1', datetime.date(2022, 1, 5), 'COMPRA\nSUPERMERCADO', 'C:\\tmp\r', None)]
+    stream = io.StringIO()
+    export(rows, MOVEMENT_FIELDS, 'tsv', stream)
+    assert stream.getvalue() == '1\tref\\t1\t05/01/2022\tCOMPRA\\nSUPERMERCADO\tC:\\\\tmp\\r\t\n'
+
+
+def test_csv_round_trip():
+    header, *rows = csv.reader(io.StringIO(exported('csv'), newline=''))
+    assert header == [name for name, _ in MOVEMENT_FIELDS]
+    assert rows == [['1', 'ref 1', '2022-01-05', 'COMPRA, SUPERMERCADO', '10.5', ''],
+                    ['2', 'ref "2"', '2022-01-06', 'DEPOSITO', '', '20']]
+
+
+def test_jsonl_dates_in_iso_format():
+    rows = [json.loads(line) for line in exported('jsonl').splitlines()]
+    assert rows[0]['date'] == '2022-01-05'
+    assert rows[0]['credit'] is None
+    assert rows[1]['credit'] == 20
+
+
+def test_rows_are_consumed_from_a_generator():
+    rows = (ROWS[index % 2] for index in range(1000))
+    stream = io.StringIO()
+    assert export(rows, MOVEMENT_FIELDS, 'jsonl', stream) == 1000
+    assert len(stream.getvalue().splitlines()) == 1000
+
+
+def test_parquet():
+    pq = pytest.importorskip('pyarrow.parquet')
+    stream = io.BytesIO()
+    assert export(ROWS, MOVEMENT_FIELDS, 'parquet', stream) == 2
+    table = pq.read_table(io.BytesIO(stream.getvalue()))
+    assert table.column('date').to_pylist() == [datetime.date(2022, 1, 5), datetime.date(2022, 1, 6)]
+    assert table.column('debit').to_pylist() == [10.5, None]
+
+
+def test_parquet_without_pyarrow(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(MissingDependency) as error:
+        export(ROWS, MOVEMENT_FIELDS, 'parquet', io.BytesIO())
+    assert 'requirements-extras.txt' in error.value.message
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from src.metrics import Metrics
+from src.output import Output
+from src.plugins.metrics_plugin import MetricsPlugin
+
+URL = 'https://banking.sandbox.prometeoapi.com/account/'
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    metrics.record_cache_hit('GET', URL)
+    return metrics
+
+
+def test_dump_format_follows_the_extension(metrics, tmp_path):
+    metrics.dump(str(tmp_path / 'metrics.json'))
+    metrics.dump(str(tmp_path / 'metrics.prom'))
+    assert json.loads((tmp_path / 'metrics.json').read_text())
+    assert (tmp_path / 'metrics.prom').read_text().startswith('# HELP')
+
+
+def test_dump_in_the_given_format(metrics, tmp_path):
+    metrics.dump(str(tmp_path / 'metrics.json'), 'prometheus')
+    assert (tmp_path / 'metrics.json').read_text() == metrics.to_prometheus()
+
+
+class FakeClient:
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+
+@pytest.mark.parametrize('option, file, format, warned', [
+    (1, 'metrics.json', 'prometheus', True),
+    (1, 'metrics.prom', 'prometheus', False),
+    (2, 'metrics.txt', 'json', True),
+    (2, 'metrics.json', 'json', False),
+])
+def test_plugin_saves_in_the_chosen_format(metrics, tmp_path, monkeypatch, option, file, format, warned):
+    path = str(tmp_path / file)
+    plugin = MetricsPlugin(FakeClient(metrics), Output(False, quiet=True))
+    answers = iter([option, path])
+    monkeypatch.setattr(plugin.utils, 'get_option', lambda *args, **kwargs: next(answers))
+    warnings = []
+    monkeypatch.setattr(plugin.out, 'yellow', warnings.append)
+
+    plugin.run()
+    expected = metrics.to_json() if format == 'json' else metrics.to_prometheus()
+    assert (tmp_path / file).read_text() == expected
+    assert any('does not match' in warning for warning in warnings) == warned
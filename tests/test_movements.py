@@ -0,0 +1,193 @@
+import datetime
+import math
+
+import pytest
+from prometeo.banking.models import Movement
+
+from src.client import PrometeoClient, split_interval
+from src.concurrency import Result
+from src.movements import MovementList, merge_windows
+
+
+def date(day: int, month: int = 1, year: int = 2022) -> datetime.datetime:
+    return datetime.datetime(year, month, day)
+
+
+def movement(id: str, day: int) -> Movement:
+    return Movement(id, f'ref-{id}', date(day), 'COMPRA', 1.5, '')
+
+
+def fetch_movements(session_key, account_number, currency_code, start, end):
+    """
+    Como BankingAPIClient.get_movements: dos movimientos por día y, en
+    cada respuesta, el mismo movimiento pendiente y uno sin id.
+    """
+    movements = [Movement('pending', 'ref', start, 'PENDIENTE', 1.0, ''),
+                 Movement('', 'ref', start, 'SIN ID', 1.0, '')]
+    day = start
+    while day <= end:
+        movements += [Movement(f'{day:%m%d}-{index}', 'ref', day, 'COMPRA', 1.0, '')
+                      for index in range(2)]
+        day += datetime.timedelta(days=1)
+    return movements
+
+
+def call_api(method, url, params=None, **kwargs):
+    """
+    Como ExtendedBankingClient.call_api para /movement/: la respuesta
+    JSON de fetch_movements.
+    """
+    start, end = (datetime.datetime.strptime(params[name], '%d/%m/%Y')
+                  for name in ('date_start', 'date_end'))
+    return {'status': 'success', 'movements': [
+        {'id': item.id, 'reference': item.reference, 'date': item.date.strftime('%d/%m/%Y'),
+         'detail': item.detail, 'debit': item.debit, 'credit': item.credit}
+        for item in fetch_movements(params['key'], params['account'], params['currency'], start, end)]}
+
+
+def test_split_interval_in_consecutive_windows():
+    assert split_interval(date(1), date(10), 4) == [
+        (date(1), date(4)), (date(5), date(8)), (date(9), date(10))]
+
+
+def test_split_interval_of_one_day():
+    assert split_interval(date(1), date(1), 30) == [(date(1), date(1))]
+
+
+def test_split_interval_disabled():
+    assert split_interval(date(1), date(31), 0) == [(date(1), date(31))]
+
+
+def test_merge_windows_dedupes_by_id_and_sorts_by_date():
+    windows = [Result(0, [movement('b', 3), movement('a', 1)], None),
+               Result(1, [movement('a', 1), movement('', 2), movement('', 2)], None)]
+    merged = merge_windows(windows)
+    # Los que no tienen id no se pueden comparar: quedan todos.
+    assert [(item.id, item.date.day) for item in merged] == [('a', 1), ('', 2), ('', 2), ('b', 3)]
+
+
+def test_merge_windows_keeps_the_order_of_each_day():
+    windows = [Result(0, [movement('x', 5), movement('y', 5), movement('z', 4)], None)]
+    assert [item.id for item in merge_windows(windows)] == ['z', 'x', 'y']
+
+
+def test_merge_windows_raises_the_first_error():
+    windows = [Result(0, [movement('a', 1)], None), Result(1, None, ValueError('window'))]
+    with pytest.raises(ValueError):
+        merge_windows(windows)
+
+
+def test_merge_windows_of_movement_lists():
+    windows = [Result(0, MovementList([movement('b', 3), movement('a', 1)]), None),
+               Result(1, MovementList([movement('a', 1), Movement('c', 'r', date(2), 'X', '7', '', {'x': 1})]), None)]
+    merged = merge_windows(windows)
+    assert isinstance(merged, MovementList)
+    assert list(merged) == [movement('a', 1), Movement('c', 'r', date(2), 'X', '7', '', {'x': 1}),
+                            movement('b', 3)]
+
+
+def test_windows_are_merged_without_repeated_ids():
+    client = PrometeoClient('key', 'sandbox')
+    client.window_days = 7
+    movements = client._get_movements_by_window(
+        fetch_movements, 'session', '001', 'UYU', date(1), date(31))
+
+    ids = [item.id for item in movements]
+    assert ids.count('pending') == 1
+    # Los que no tienen id no se pueden comparar: queda uno por ventana.
+    assert ids.count('') == 5
+    assert len(movements) == 31 * 2 + 1 + 5
+    assert [item.date for item in movements] == sorted(item.date for item in movements)
+    # sort es estable: se mantiene el orden de cada día.
+    assert ids[-2:] == ['0131-0', '0131-1']
+
+
+def test_short_interval_is_a_single_request():
+    calls = []
+
+    def fetch(*args):
+        calls.append(args[-2:])
+        return fetch_movements(*args)
+
+    client = PrometeoClient('key', 'sandbox')
+    client.window_days = 31
+    movements = client._get_movements_by_window(fetch, 'session', '001', 'UYU', date(1), date(31))
+    assert calls == [(date(1), date(31))]
+    assert len(movements) == 31 * 2 + 2
+
+
+def test_failed_window_raises_its_error():
+    def fetch(session_key, account_number, currency_code, start, end):
+        if start > date(10):
+            raise ValueError(start)
+        return fetch_movements(session_key, account_number, currency_code, start, end)
+
+    client = PrometeoClient('key', 'sandbox')
+    client.window_days = 7
+    with pytest.raises(ValueError):
+        client._get_movements_by_window(fetch, 'session', '001', 'UYU', date(1), date(31))
+
+
+def test_movement_list_round_trip():
+    movements = [Movement('a', 'r1', date(1), 'COMPRA', 1.5, ''),
+                 Movement('b', 'r2', date(2), 'SUELDO', '', 20.0),
+                 Movement('c', 'r1', date(2), 'COMPRA', 3.0, '')]
+    compact = MovementList(movements)
+    assert len(compact) == 3
+    assert list(compact) == movements
+    assert [compact[index] for index in range(-3, 3)] == movements * 2
+    assert compact[1:] == movements[1:]
+    with pytest.raises(IndexError):
+        compact[3]
+
+
+def test_movement_list_from_data():
+    data = [{'id': '1', 'reference': 'r', 'date': '02/01/2022', 'detail': 'UTE',
+             'debit': 10.0, 'credit': ''}]
+    assert list(MovementList.from_data(data)) == [Movement('1', 'r', date(2), 'UTE', 10.0, '')]
+
+
+def test_movement_list_stores_integer_amounts_in_columns():
+    movements = [Movement('a', 'r', date(1), 'X', 10, ''),
+                 Movement('b', 'r', date(2), 'X', '', 2500),
+                 Movement('c', 'r', date(3), 'X', True, '')]
+    compact = MovementList(movements)
+    assert [(item.debit, item.credit) for item in compact] == [(10.0, ''), ('', 2500.0), (True, '')]
+    assert type(compact[0].debit) is float
+    # Solo el bool se guarda aparte.
+    assert list(compact._other) == [(2, 'debit')]
+
+
+def test_movement_list_keeps_values_that_do_not_fit_in_columns():
+    movements = [
+        # Fecha con hora.
+        Movement('a', 'r', datetime.datetime(2022, 1, 1, 10, 30), 'X', 1.0, ''),
+        # Importes que no son float.
+        Movement('b', 'r', date(2), 'X', '12,50', None),
+        Movement('c', 'r', date(3), 'X', None, math.inf),
+        Movement('d', 'r', date(4), 'X', 1.0, '', extra_data={'category': 'food'}),
+    ]
+    compact = MovementList(movements)
+    assert list(compact) == movements
+    compact.sort(key=lambda item: item.id, reverse=True)
+    assert list(compact) == movements[::-1]
+
+
+def test_movement_list_sort_is_stable():
+    compact = MovementList(Movement(str(index), 'r', date(index % 3 + 1), 'X', 1.0, '')
+                           for index in range(9))
+    compact.sort(key=lambda item: item.date)
+    assert [item.id for item in compact] == ['0', '3', '6', '1', '4', '7', '2', '5', '8']
+
+
+def test_compact_client_returns_the_same_movements(monkeypatch):
+    results = {}
+    for compact in (False, True):
+        client = PrometeoClient('key', 'sandbox', compact_movements=compact)
+        client.window_days = 7
+        monkeypatch.setattr(client._banking, 'call_api', call_api)
+        results[compact] = client.get_movements('001', 'UYU', date(1), date(3, 3))
+
+    assert isinstance(results[True], MovementList)
+    assert len(results[True]) == 62 * 2 + 1 + 9
+    assert list(results[True]) == results[False]
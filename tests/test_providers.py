@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from src.cache import ProviderCache
+from src.client import PrometeoClient
+
+
+class Details:
+    """
+    get_provider_detail de ExtendedBankingClient, contando
+    cuántos pedidos hay en paralelo.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.peak = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, provider_code):
+        with self._lock:
+            self.calls.append(provider_code)
+            self._in_flight += 1
+            self.peak = max(self.peak, self._in_flight)
+        time.sleep(0.01)
+        with self._lock:
+            self._in_flight -= 1
+        if provider_code == 'missing':
+            raise KeyError(provider_code)
+        return {'name': provider_code}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    client = PrometeoClient('key', 'sandbox')
+    client.provider_cache = ProviderCache(str(tmp_path / 'providers.json'))
+    client.max_workers = 3
+    monkeypatch.setattr(client._banking, 'get_provider_detail', Details())
+    return client
+
+
+def test_details_are_fetched_in_parallel_and_in_order(client):
+    codes = [f'p{index}' for index in range(9)]
+    results = client.get_provider_details(codes)
+    assert [result.value['name'] for result in results] == codes
+    assert client._banking.get_provider_detail.peak == 3
+
+
+def test_failed_details_do_not_stop_the_others(client):
+    results = client.get_provider_details(['a', 'missing', 'b'])
+    assert [result.value for result in results] == [{'name': 'a'}, None, {'name': 'b'}]
+    assert isinstance(results[1].error, KeyError)
+
+
+def test_details_come_from_the_cache(client):
+    client.get_provider_details(['a', 'b'])
+    client.get_provider_details(['a', 'b', 'c'])
+    assert sorted(client._banking.get_provider_detail.calls) == ['a', 'b', 'c']
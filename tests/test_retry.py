@@ -0,0 +1,126 @@
+import asyncio
+from collections import namedtuple
+
+import pytest
+from requests.exceptions import ConnectionError as RequestsConnError
+
+from src.client import ExtendedBankingClient
+from src.retry import RetryPolicy, parse_retry_after
+
+Response = namedtuple('Response', ['status_code', 'headers'])
+
+
+def responses(*statuses, headers=None):
+    """
+    request() que devuelve una respuesta con cada status, en orden.
+    """
+    pending = [Response(status, headers or {}) for status in statuses]
+    calls = []
+
+    def request():
+        calls.append(pending[len(calls)])
+        return calls[-1]
+
+    return request, calls
+
+
+class RefusedSession:
+    """
+    requests.Session sin conexión: anota el método de cada request.
+    """
+
+    def __init__(self):
+        self.methods = []
+
+    def request(self, method, url, *args, **kwargs):
+        self.methods.append(method)
+        raise RequestsConnError('refused')
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_retries_transient_statuses_until_success():
+    request, calls = responses(503, 502, 200)
+    retries = []
+    response = RetryPolicy(attempts=3, backoff=0.001).call(
+        request, lambda attempt, delay, reason: retries.append((attempt, reason.status_code)))
+    assert response.status_code == 200
+    assert retries == [(1, 503), (2, 502)]
+
+
+def test_returns_last_response_when_attempts_run_out():
+    request, calls = responses(500, 500)
+    response = RetryPolicy(attempts=2, backoff=0.001).call(request)
+    assert response.status_code == 500
+    assert len(calls) == 2
+
+
+def test_does_not_retry_other_statuses():
+    request, calls = responses(404)
+    assert RetryPolicy(attempts=3, backoff=0.001).call(request).status_code == 404
+    assert len(calls) == 1
+
+
+def test_waits_what_retry_after_asks():
+    request, calls = responses(429, 200, headers={'Retry-After': '0.01'})
+    delays = []
+    RetryPolicy(attempts=3, backoff=5, max_delay=1).call(
+        request, lambda attempt, delay, reason: delays.append(delay))
+    assert delays == [0.01]
+
+
+def test_does_not_retry_when_retry_after_exceeds_max_delay():
+    request, calls = responses(429, 200, headers={'Retry-After': '120'})
+    response = RetryPolicy(attempts=3, max_delay=30).call(request)
+    assert response.status_code == 429
+    assert len(calls) == 1
+
+
+def test_backoff_is_capped_by_max_delay():
+    policy = RetryPolicy(backoff=10, max_delay=0.5)
+    delays = [policy.get_delay(attempt) for attempt in range(1, 10) for _ in range(50)]
+    assert max(delays) <= 0.5
+    assert min(delays) >= 0
+
+
+def test_retries_connection_errors_and_raises_the_last_one():
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise RequestsConnError('refused')
+
+    with pytest.raises(RequestsConnError):
+        RetryPolicy(attempts=3, backoff=0.001).call(request)
+    assert len(calls) == 3
+
+
+def test_call_async_retries_like_call():
+    request, calls = responses(503, 429, 200, headers={'Retry-After': '0'})
+    retries = []
+
+    async def request_async():
+        return request()
+
+    response = asyncio.run(RetryPolicy(attempts=3).call_async(
+        request_async, lambda attempt, delay, reason: retries.append((attempt, delay))))
+    assert response.status_code == 200
+    assert retries == [(1, 0.0), (2, 0.0)]
+
+
+def test_client_retries_only_idempotent_methods():
+    banking = ExtendedBankingClient('key', 'sandbox')
+    banking.retry_policy = RetryPolicy(attempts=3, backoff=0.001)
+    banking._client_session = RefusedSession()
+
+    with pytest.raises(RequestsConnError):
+        banking.make_request('get', '/account/')
+    with pytest.raises(RequestsConnError):
+        banking.make_request('POST', '/login/', data={})
+    assert banking._client_session.methods == ['get'] * 3 + ['POST']
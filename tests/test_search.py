@@ -0,0 +1,61 @@
+from prometeo.banking.models import Provider
+
+from src.search import ProviderIndex, normalize
+
+PROVIDERS = [
+    Provider('bancouy', 'UY', 'Banco República'),
+    Provider('santander_ar', 'AR', 'Santander'),
+    Provider('itau_br', 'BR', 'Itaú Unibanco'),
+    Provider('uyb', 'AR', 'Unión de Bancos'),
+    Provider('ar_buy', 'AR', 'Buy Bank'),
+]
+
+
+def codes(providers) -> list:
+    return [provider.code for provider in providers]
+
+
+def test_normalize():
+    assert normalize('República ITAÚ') == 'republica itau'
+
+
+def test_empty_query_returns_all():
+    index = ProviderIndex(PROVIDERS)
+    assert index.search('  ') == PROVIDERS
+    assert index.search('', limit=2) == PROVIDERS[:2]
+
+
+def test_exact_matches_first_then_prefix_then_substring():
+    index = ProviderIndex(PROVIDERS)
+    # Exacta: el país de bancouy. Prefijo: uyb. Substring: ar_buy.
+    assert codes(index.search('UY')) == ['bancouy', 'uyb', 'ar_buy']
+
+
+def test_same_kind_of_match_keeps_list_order():
+    index = ProviderIndex(PROVIDERS)
+    # Los tres primeros por prefijo, 'Unibanco' por substring.
+    assert codes(index.search('ban')) == ['bancouy', 'uyb', 'ar_buy', 'itau_br']
+
+
+def test_prefix_of_any_word_of_the_name():
+    index = ProviderIndex(PROVIDERS)
+    assert codes(index.search('unib')) == ['itau_br']
+    assert codes(index.search('republica')) == ['bancouy']
+
+
+def test_fuzzy_matches_typos():
+    index = ProviderIndex(PROVIDERS)
+    assert codes(index.search('santnder')) == ['santander_ar']
+    assert codes(index.search('republca')) == ['bancouy']
+    assert index.search('zzzzzz') == []
+
+
+def test_fuzzy_only_without_other_matches():
+    index = ProviderIndex(PROVIDERS)
+    # 'bank' también se parece a 'banco', pero hay coincidencias por prefijo.
+    assert codes(index.search('bank')) == ['ar_buy']
+
+
+def test_limit():
+    index = ProviderIndex(PROVIDERS)
+    assert codes(index.search('uy', limit=2)) == ['bancouy', 'uyb']
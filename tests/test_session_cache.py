@@ -0,0 +1,97 @@
+import pytest
+from prometeo.exceptions import InvalidSessionKeyError
+from requests.exceptions import ConnectionError as RequestsConnError
+from requests.exceptions import Timeout as RequestsTimeout
+
+from src.client import PrometeoClient
+from src.config import LOGGED_IN_STATUS, LOGGED_OUT_STATUS
+
+pytest.importorskip('cryptography')
+
+from src.session_cache import SessionCache  # noqa: E402
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'session')
+
+
+def count_derivations(cache: SessionCache) -> list:
+    calls = []
+    kdf = cache._kdf
+
+    def counted(salt):
+        calls.append(salt)
+        return kdf(salt)
+
+    cache._kdf = counted
+    return calls
+
+
+def test_round_trip(path):
+    SessionCache('api-key', path).set('sandbox', 'test', 'user', 'session-key')
+    session = SessionCache('api-key', path).get('sandbox')
+    assert (session['provider'], session['username'], session['key']) == \
+        ('test', 'user', 'session-key')
+
+
+def test_other_api_key_is_ignored(path):
+    SessionCache('api-key', path).set('sandbox', 'test', 'user', 'session-key')
+    assert SessionCache('other', path).get('sandbox') is None
+
+
+def test_old_session_is_ignored(path):
+    SessionCache('api-key', path, max_age=-1).set('sandbox', 'test', 'user', 'session-key')
+    assert SessionCache('api-key', path, max_age=-1).get('sandbox') is None
+
+
+def test_key_is_derived_once(path):
+    SessionCache('api-key', path).set('sandbox', 'test', 'user', 'session-key')
+
+    cache = SessionCache('api-key', path)
+    calls = count_derivations(cache)
+    cache.get('sandbox')
+    cache.set('production', 'test', 'user', 'other-key')
+    cache.clear('sandbox')
+    assert len(calls) == 1
+    assert SessionCache('api-key', path).get('production')['key'] == 'other-key'
+
+    # Con otra API key hay que derivarla de nuevo.
+    cache.api_key = 'other'
+    cache.get('production')
+    assert len(calls) == 2
+
+
+@pytest.fixture
+def client(path):
+    client = PrometeoClient('api-key', 'sandbox')
+    client.session_cache = SessionCache('api-key', path)
+    client.session_cache.set('sandbox', 'test', 'user', 'session-key')
+    return client
+
+
+def raising(error):
+    def get_clients(session_key):
+        raise error
+    return get_clients
+
+
+def test_restore_session(client, monkeypatch):
+    monkeypatch.setattr(client._banking, 'get_clients', lambda session_key: [])
+    assert client.restore_session('test', 'user')
+    assert client.status == LOGGED_IN_STATUS
+
+
+@pytest.mark.parametrize('error', [RequestsConnError('offline'), RequestsTimeout('slow')])
+def test_restore_session_offline_keeps_the_cache(client, monkeypatch, error):
+    monkeypatch.setattr(client._banking, 'get_clients', raising(error))
+    assert not client.restore_session()
+    assert client.status == LOGGED_OUT_STATUS
+    assert client.session_cache.get('sandbox')['key'] == 'session-key'
+
+
+def test_restore_expired_session_clears_the_cache(client, monkeypatch):
+    monkeypatch.setattr(client._banking, 'get_clients',
+                        raising(InvalidSessionKeyError('Invalid key')))
+    assert not client.restore_session()
+    assert client.session_cache.get('sandbox') is None
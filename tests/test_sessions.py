@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+from prometeo.exceptions import InvalidSessionKeyError, WrongCredentialsError
+
+from src.client import PrometeoClient
+from src.config import LOGGED_IN_STATUS
+from src.sessions import SessionPool
+
+
+class Session:
+    def __init__(self, key: str):
+        self.key = key
+
+    def get_session_key(self) -> str:
+        return self.key
+
+
+class FakeBanking:
+    """
+    Los métodos de ExtendedBankingClient que usan las sesiones.
+    open: session keys válidas.
+    """
+
+    def __init__(self):
+        self.logins = 0
+        self.open = set()
+
+    def login(self, provider, username, password, **kwargs):
+        if password == 'wrong':
+            raise WrongCredentialsError('wrong credentials')
+        self.logins += 1
+        key = f'{username}-{self.logins}'
+        self.open.add(key)
+        return Session(key)
+
+    def logout(self, session_key):
+        if session_key not in self.open:
+            raise InvalidSessionKeyError('Invalid key')
+        self.open.discard(session_key)
+
+    def get_accounts(self, session_key):
+        if session_key not in self.open:
+            raise InvalidSessionKeyError('Invalid key')
+        return [session_key]
+
+
+@pytest.fixture
+def banking():
+    return FakeBanking()
+
+
+@pytest.fixture
+def pool(banking):
+    return SessionPool(lambda environment: banking, max_sessions=2)
+
+
+def test_acquire_reuses_the_session(pool, banking):
+    key = pool.acquire('sandbox', 'test', 'user', 'password')
+    assert pool.acquire('sandbox', 'test', 'user', 'password') == key
+    assert banking.logins == 1
+    # Otro environment es otra sesión.
+    assert pool.acquire('testing', 'test', 'user', 'password') != key
+
+
+def test_full_pool_logs_out_the_least_recently_used_session(pool, banking):
+    first = pool.acquire('sandbox', 'test', 'a', 'password')
+    second = pool.acquire('sandbox', 'test', 'b', 'password')
+    pool.acquire('sandbox', 'test', 'a', 'password')
+    third = pool.acquire('sandbox', 'test', 'c', 'password')
+    assert banking.open == {first, third}
+    assert second not in banking.open
+    assert len(pool) == 2
+
+
+def test_acquire_with_another_password_logs_out_the_old_session(pool, banking):
+    old_key = pool.acquire('sandbox', 'test', 'user', 'password')
+    new_key = pool.acquire('sandbox', 'test', 'user', 'other')
+    assert new_key != old_key
+    assert banking.open == {new_key}
+    assert len(pool) == 1
+
+
+def test_failed_login_is_not_kept(pool):
+    with pytest.raises(WrongCredentialsError):
+        pool.acquire('sandbox', 'test', 'user', 'wrong')
+    assert len(pool) == 0
+
+
+def test_refresh_renews_the_session(pool, banking):
+    key = pool.acquire('sandbox', 'test', 'user', 'password')
+    new_key = pool.refresh(key)
+    assert new_key != key
+    assert pool.acquire('sandbox', 'test', 'user', 'password') == new_key
+    assert pool.refresh('unknown') is None
+
+
+def test_refresh_with_an_old_key_returns_the_new_one(pool, banking):
+    # Dos requests con la misma key vencida: el segundo usa la sesión
+    # que renovó el primero, sin otro login.
+    key = pool.acquire('sandbox', 'test', 'user', 'password')
+    new_key = pool.refresh(key)
+    assert pool.refresh(key) == new_key
+    assert banking.logins == 2
+
+
+def test_release_and_close_all(pool, banking):
+    key = pool.acquire('sandbox', 'test', 'a', 'password')
+    other = pool.acquire('testing', 'test', 'b', 'password')
+    assert pool.release(key)
+    assert not pool.release(key)
+    assert banking.open == {other}
+    assert pool.close_all('sandbox') == 0
+    assert pool.close_all() == 1
+    assert banking.open == set()
+
+
+def test_client_renews_an_expired_session(banking):
+    client = PrometeoClient('key', 'sandbox')
+    client._bankings['sandbox'] = banking
+    client.login('test', 'user', 'password')
+    client.status = LOGGED_IN_STATUS
+    old_key = client.get_session_key()
+
+    banking.open.clear()
+    assert client.get_bank_accounts() == [client.get_session_key()]
+    assert client.get_session_key() != old_key
+    assert banking.logins == 2
+
+
+def test_client_logout_releases_the_session(banking):
+    client = PrometeoClient('key', 'sandbox')
+    client._bankings['sandbox'] = banking
+    client.login('test', 'user', 'password')
+    client.status = LOGGED_IN_STATUS
+    assert client.logout()
+    assert banking.open == set()
+    assert client.get_session_key() is None
+
+
+def test_async_client_renews_an_expired_session(client, server):
+    pytest.importorskip('httpx')
+    old_key = client.get_session_key()
+
+    async def fetch():
+        async with client.get_async_client() as async_client:
+            server.sessions.clear()
+            return await async_client.get_bank_accounts()
+
+    assert len(asyncio.run(fetch())) == 4
+    # La sesión nueva también la usa el cliente sync.
+    assert client.get_session_key() != old_key
+    assert server.sessions == {client.get_session_key()}
@@ -0,0 +1,91 @@
+import datetime
+
+import pytest
+from prometeo.banking.models import Movement
+
+from src.client import PrometeoClient
+from src.config import SYNC_INITIAL_DAYS, SYNC_OVERLAP_DAYS
+from src.output import Output
+from src.plugins import get_plugin
+from src.store import AccountKey, MovementStore
+
+KEY = AccountKey('sandbox', 'test', '00100000', 'UYU')
+
+
+@pytest.fixture
+def store(tmp_path):
+    with MovementStore(str(tmp_path / 'movements.db')) as store:
+        yield store
+
+
+def movement(id, day: int, debit=10.0, detail: str = 'COMPRA') -> Movement:
+    return Movement(id, 'ref', datetime.datetime(2022, 1, day), detail, debit, '')
+
+
+def fetch_movements(session_key, account_number, currency_code, start, end):
+    """
+    Como BankingAPIClient.get_movements: cinco movimientos por día.
+    """
+    movements = []
+    day = start
+    while day <= end:
+        movements += [Movement(f'{day:%Y%m%d}-{index}', 'ref', day, 'COMPRA', 1.0, '')
+                      for index in range(5)]
+        day += datetime.timedelta(days=1)
+    return movements
+
+
+def test_upsert_counts_only_new_movements(store):
+    assert store.upsert(KEY, [movement('a', 1), movement('b', 2)]) == 2
+    assert store.upsert(KEY, [movement('b', 2, detail='CORREGIDO'), movement('c', 3)]) == 1
+    assert store.count(KEY) == 3
+    assert [item.detail for item in store.get_movements(KEY)] == ['COMPRA', 'CORREGIDO', 'COMPRA']
+
+
+def test_upsert_without_id_uses_the_other_fields(store):
+    assert store.upsert(KEY, [movement('', 1), movement('', 1), movement('', 1, debit=5.0)]) == 2
+
+
+def test_movements_are_kept_per_account(store):
+    other = KEY._replace(currency='USD')
+    store.upsert(KEY, [movement('a', 1)])
+    store.upsert(other, [movement('a', 1), movement('b', 2)])
+    assert store.count(KEY) == 1
+    assert store.count(other) == 2
+
+
+def test_get_movements_in_interval(store):
+    store.upsert(KEY, [movement(str(day), day) for day in (5, 1, 3, 2, 4)])
+    movements = store.get_movements(KEY, datetime.date(2022, 1, 2), datetime.date(2022, 1, 4))
+    assert [item.id for item in movements] == ['2', '3', '4']
+    assert [item.id for item in store.iter_movements(KEY, batch_size=2)] == ['1', '2', '3', '4', '5']
+
+
+def test_last_date(store):
+    assert store.get_last_date(KEY) is None
+    store.set_last_date(KEY, datetime.date(2022, 3, 1))
+    store.set_last_date(KEY, datetime.date(2022, 4, 1))
+    assert store.get_last_date(KEY) == datetime.date(2022, 4, 1)
+    assert store.get_accounts('sandbox') == [KEY]
+    assert store.get_accounts('sandbox', 'other') == []
+
+
+def test_sync_fetches_only_since_the_last_date(store, monkeypatch):
+    client = PrometeoClient('key', KEY.environment)
+    client.provider = KEY.provider
+    monkeypatch.setattr(client._banking, 'get_movements', fetch_movements)
+    transactions = get_plugin('Transactions')(client, Output(quiet=True))
+    job = (transactions.BANK_ACCOUNT, KEY.account, KEY.currency)
+    first_end = datetime.date(2022, 6, 30)
+
+    (result,) = transactions.sync_movements(store, [job], first_end)
+    assert result.value.start == first_end - datetime.timedelta(days=SYNC_INITIAL_DAYS)
+    assert result.value.new == result.value.fetched == (SYNC_INITIAL_DAYS + 1) * 5
+    assert store.get_last_date(KEY) == first_end
+
+    # Solo se piden los días nuevos, más SYNC_OVERLAP_DAYS (ya guardados).
+    (result,) = transactions.sync_movements(store, [job], first_end + datetime.timedelta(days=10))
+    assert result.value.start == first_end - datetime.timedelta(days=SYNC_OVERLAP_DAYS)
+    assert result.value.fetched == (SYNC_OVERLAP_DAYS + 11) * 5
+    assert result.value.new == 10 * 5
+    assert store.get_last_date(KEY) == first_end + datetime.timedelta(days=10)
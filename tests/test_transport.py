@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import src.config as config
+from src.client import PrometeoClient
+from src.transport import ConnectionStats, PooledSession
+
+PROVIDERS = {'status': 'success',
+             'providers': [{'code': 'test', 'country': 'UY', 'name': 'Test'}]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 para que las conexiones queden abiertas (keep-alive).
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps(PROVIDERS).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_the_connection(url):
+    session = PooledSession(pool_size=2)
+    for _ in range(3):
+        assert session.get(url).json() == PROVIDERS
+    assert session.connection_stats() == ConnectionStats(requests=3, connections=1, reused=2)
+
+
+def test_default_timeout(monkeypatch):
+    session = PooledSession(timeout=(1, 2))
+    sent = []
+
+    def send(request, **kwargs):
+        sent.append(kwargs['timeout'])
+        raise ConnectionError
+
+    monkeypatch.setattr(session.adapter, 'send', send)
+    with pytest.raises(ConnectionError):
+        session.get('http://127.0.0.1:1/')
+    with pytest.raises(ConnectionError):
+        session.get('http://127.0.0.1:1/', timeout=5)
+    assert sent == [(1, 2), 5]
+
+
+def test_client_sends_every_request_through_the_pool(url, monkeypatch):
+    monkeypatch.setitem(config.ENVIRONMENTS, 'local', url)
+    client = PrometeoClient('key', 'local')
+    client.provider_cache = None
+    for _ in range(3):
+        assert [provider.code for provider in client.get_providers()] == ['test']
+    assert client.connection_stats() == ConnectionStats(requests=3, connections=1, reused=2)